@@ -0,0 +1,76 @@
+"""
+Session backend benchmark: queries and time per authenticated page view.
+
+    USE_SQLITE=1 python benchmarks/bench_sessions.py [requests]
+
+Runs against a throwaway test database and logs a doctor in under each
+SESSION_MODE, then requests /doctor-view-patient repeatedly.
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospitalmanagement.settings')
+os.environ.setdefault('USE_SQLITE', '1')
+
+import django
+django.setup()
+
+from django.contrib.auth.models import Group, User
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+
+from hospital import models
+
+
+MODES = {
+    'db': {'SESSION_ENGINE': 'django.contrib.sessions.backends.db'},
+    'cached_db': {'SESSION_ENGINE': 'django.contrib.sessions.backends.cached_db', 'SESSION_CACHE_ALIAS': 'default'},
+    'signed_cookies': {'SESSION_ENGINE': 'hospital.sessions'},
+}
+PATH = '/doctor-view-patient'
+
+
+def make_doctor():
+    user = User.objects.create_user(username='benchdoctor', password='x', first_name='Bench', last_name='Doctor')
+    Group.objects.get_or_create(name='DOCTOR')[0].user_set.add(user)
+    models.Doctor.objects.create(user=user, status=True, mobile='1', address='x',
+                                 profile_pic='profile_pic/DoctorProfilePic/bench.jpg')
+    return user
+
+
+def run(mode, user, requests):
+    with override_settings(**MODES[mode]):
+        client = Client()
+        client.force_login(user)
+        client.get(PATH)
+        with CaptureQueriesContext(connection) as ctx:
+            client.get(PATH)
+        # read them now, every request_started signal clears the query log
+        queries = len(ctx.captured_queries)
+        session = sum('django_session' in q['sql'] for q in ctx.captured_queries)
+        start = time.perf_counter()
+        for _ in range(requests):
+            client.get(PATH)
+        elapsed = time.perf_counter() - start
+    return queries, session, elapsed * 1000 / requests
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0)
+    try:
+        user = make_doctor()
+        print('%-16s %8s %10s %10s' % ('mode', 'queries', 'session q', 'ms/req'))
+        for mode in MODES:
+            queries, session, ms = run(mode, user, requests)
+            print('%-16s %8d %10d %10.3f' % (mode, queries, session, ms))
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""
+SQLite concurrency benchmark: reads and writes per second from several worker
+processes sharing one database file.
+
+    python benchmarks/bench_sqlite.py [seconds] [workers...]
+
+Migrates and seeds a throwaway database, then for each worker count (default
+4 and 8) runs every profile on its own copy of it:
+
+* stock  - django.db.backends.sqlite3 with default pragmas,
+* tuned  - hospital.backends.sqlite3 (WAL, BEGIN IMMEDIATE, ...),
+* queued - tuned plus the SQLITE_WRITE_LOCK single-writer queue.
+
+Each worker loops over four reads (the admin patient list) and one write
+(booking an appointment in a transaction that first reads the doctor, the
+read-then-write pattern that fails to upgrade its lock under the stock
+backend). "errors" counts failed operations, nearly all "database is locked".
+"""
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROFILES = {
+    'stock': {'SQLITE_TUNED': '0'},
+    'tuned': {'SQLITE_TUNED': '1', 'SQLITE_WRITE_LOCK': '0'},
+    'queued': {'SQLITE_TUNED': '1', 'SQLITE_WRITE_LOCK': '1'},
+}
+
+
+def setup(path, profile):
+    sys.path.insert(0, ROOT)
+    os.environ.update(PROFILES[profile], USE_SQLITE='1', SQLITE_PATH=path,
+                      DJANGO_SETTINGS_MODULE='hospitalmanagement.settings',
+                      SLOW_QUERY_MS='', METRICS_ENABLE='0')
+    import django
+    django.setup()
+
+
+def prepare(path):
+    setup(path, 'stock')
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db import connection
+    from hospital import models
+    call_command('migrate', verbosity=0)
+    doctor = User.objects.create_user(username='benchdoctor', password='x', first_name='Bench', last_name='Doctor')
+    models.Doctor.objects.create(user=doctor, status=True, mobile='1', address='x')
+    for i in range(200):
+        user = User.objects.create(username='benchpatient%d' % i, first_name='Patient', last_name=str(i))
+        models.Patient.objects.create(user=user, status=True, mobile=str(i), address='x', symptoms='fever', assignedDoctorId=doctor.id)
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode = DELETE')
+    connection.close()
+
+
+def worker(path, profile, seconds, results):
+    setup(path, profile)
+    from django.db import DatabaseError, connection, transaction
+    from hospital import models
+    reads = writes = errors = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for _ in range(4):
+            try:
+                models.Patient.objects.filter(status=True).rows('id', 'mobile', 'symptoms')
+                reads += 1
+            except DatabaseError:
+                errors += 1
+        try:
+            with transaction.atomic():
+                doctor = models.Doctor.objects.select_related('user').get(user__username='benchdoctor')
+                models.Appointment.objects.create(doctorId=doctor.user_id, patientId=1, doctorName=doctor.user.first_name,
+                                                  patientName='Patient', description='benchmark', status=True)
+            writes += 1
+        except DatabaseError:
+            errors += 1
+    connection.close()
+    results.put((reads, writes, errors))
+
+
+def run(template, profile, workers, seconds):
+    directory = tempfile.mkdtemp(prefix='bench-sqlite-')
+    path = os.path.join(directory, 'db.sqlite3')
+    shutil.copy(template, path)
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    processes = [context.Process(target=worker, args=(path, profile, seconds, results)) for _ in range(workers)]
+    for process in processes:
+        process.start()
+    totals = [0, 0, 0]
+    for _ in processes:
+        for i, value in enumerate(results.get()):
+            totals[i] += value
+    for process in processes:
+        process.join()
+    shutil.rmtree(directory)
+    return totals
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    worker_counts = [int(n) for n in sys.argv[2:]] or [4, 8]
+    directory = tempfile.mkdtemp(prefix='bench-sqlite-')
+    template = os.path.join(directory, 'template.sqlite3')
+    context = multiprocessing.get_context('spawn')
+    process = context.Process(target=prepare, args=(template,))
+    process.start()
+    process.join()
+    print('%-8s %8s %10s %10s %8s' % ('profile', 'workers', 'reads/s', 'writes/s', 'errors'))
+    try:
+        for workers in worker_counts:
+            for profile in PROFILES:
+                reads, writes, errors = run(template, profile, workers, seconds)
+                print('%-8s %8d %10.0f %10.0f %8d' % (profile, workers, reads / seconds, writes / seconds, errors))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Row template benchmark: milliseconds to render 1000 table rows per engine.
+
+    python benchmarks/bench_templates.py [rows] [repeats]
+
+Renders each templates/hospital/*_rows.html and its hospital/jinja2/ twin over the
+same projected rows; no database is needed. Needs the jinja2 package.
+"""
+import datetime
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospitalmanagement.settings')
+os.environ.setdefault('USE_SQLITE', '1')
+
+import django
+django.setup()
+
+from django.template import loader
+
+
+def make_rows(n):
+    return {
+        'patients': [{'id': i, 'get_name': 'Patient %d' % i, 'thumbnail': '/media/profile_pic/PatientProfilePic/%d.jpg' % i,
+                      'symptoms': 'fever & cough', 'mobile': '555%04d' % i, 'address': '%d Main Street' % i} for i in range(n)],
+        'doctors': [{'id': i, 'get_name': 'Doctor %d' % i, 'thumbnail': '/media/profile_pic/DoctorProfilePic/%d.jpg' % i,
+                     'mobile': '555%04d' % i, 'address': '%d High Street' % i, 'department': 'Cardiologist'} for i in range(n)],
+        'appointments': [{'doctorName': 'Doctor %d' % i, 'patientName': 'Patient %d' % i, 'description': 'Checkup <%d>' % i,
+                          'appointmentDate': datetime.date(2024, 1, 1)} for i in range(n)],
+    }
+
+
+TEMPLATES = (
+    ('hospital/doctor_view_patient_rows.html', 'patients'),
+    ('hospital/admin_view_patient_rows.html', 'patients'),
+    ('hospital/admin_view_doctor_rows.html', 'doctors'),
+    ('hospital/admin_view_appointment_rows.html', 'appointments'),
+)
+
+
+def ms_per_1k(template, context, rows, repeats):
+    template.render(context)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        template.render(context)
+    elapsed = time.perf_counter() - start
+    return elapsed * 1000 / repeats * 1000 / rows
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    data = make_rows(rows)
+    print('%-45s %10s %10s %8s' % ('template (ms per 1k rows)', 'django', 'jinja2', 'speedup'))
+    for name, key in TEMPLATES:
+        context = {key: data[key]}
+        django_ms = ms_per_1k(loader.get_template(name, using='django'), context, rows, repeats)
+        jinja_ms = ms_per_1k(loader.get_template(name, using='jinja2'), context, rows, repeats)
+        print('%-45s %10.2f %10.2f %7.1fx' % (name, django_ms, jinja_ms, django_ms / jinja_ms))
+
+
+if __name__ == '__main__':
+    main()
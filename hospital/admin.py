@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Doctor,Patient,Appointment,PatientDischargeDetails
+from .models import Doctor,Patient,Appointment,PatientDischargeDetails,ArchivedDoctor,ArchivedPatient,ArchivedAppointment,AuditEvent,SlowQuery
 # Register your models here.
 class DoctorAdmin(admin.ModelAdmin):
     pass
@@ -16,3 +16,48 @@ admin.site.register(Appointment, AppointmentAdmin)
 class PatientDischargeDetailsAdmin(admin.ModelAdmin):
     pass
 admin.site.register(PatientDischargeDetails, PatientDischargeDetailsAdmin)
+
+class ArchivedDoctorAdmin(admin.ModelAdmin):
+    list_display=('name','department','deleted_at','archived_at')
+admin.site.register(ArchivedDoctor, ArchivedDoctorAdmin)
+
+class ArchivedPatientAdmin(admin.ModelAdmin):
+    list_display=('name','symptoms','deleted_at','archived_at')
+admin.site.register(ArchivedPatient, ArchivedPatientAdmin)
+
+class ArchivedAppointmentAdmin(admin.ModelAdmin):
+    list_display=('doctorName','patientName','appointmentDate','archived_at')
+admin.site.register(ArchivedAppointment, ArchivedAppointmentAdmin)
+
+
+class AuditEventAdmin(admin.ModelAdmin):
+    list_display=('created_at','actorName','action','targetType','targetId','detail')
+    list_filter=('action','targetType')
+    search_fields=('actorName',)
+    date_hierarchy='created_at'
+
+    #append-only, read here and never changed
+    def has_add_permission(self,request):
+        return False
+
+    def has_change_permission(self,request,obj=None):
+        return False
+
+    def has_delete_permission(self,request,obj=None):
+        return False
+admin.site.register(AuditEvent, AuditEventAdmin)
+
+
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display=('created_at','duration_ms','function','call_site','database')
+    list_filter=('database','function')
+    search_fields=('sql','call_site')
+    ordering=('-duration_ms',)
+    readonly_fields=('sql','duration_ms','database','function','call_site','plan','created_at')
+
+    def has_add_permission(self,request):
+        return False
+
+    def has_change_permission(self,request,obj=None):
+        return False
+admin.site.register(SlowQuery, SlowQueryAdmin)
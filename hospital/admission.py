@@ -0,0 +1,158 @@
+"""
+Admission control: keep doctor and admin work moving when the portal is
+overloaded.
+
+``AdmissionMiddleware`` counts the requests each worker process is running,
+per role (``ADMIN``, ``DOCTOR``, ``PATIENT``, or ``ANONYMOUS`` before login).
+Roles listed in ``ADMISSION_LIMITS`` may only have that many in flight; a
+request over the limit waits up to ``ADMISSION_QUEUE_SECONDS`` for a slot and
+is then shed with a 503 and ``Retry-After``. Views in ``ADMISSION_ALWAYS`` -
+the doctor dashboard, discharging, the staff logins - are let through
+whatever the counts.
+
+The limits shrink while requests are slow: every ``ADMISSION_ADJUST_SECONDS``
+the moving average of request latency is compared with
+``ADMISSION_TARGET_LATENCY``; above it all limits are cut by a quarter, below
+it they grow back by a tenth of their configured size (AIMD, as TCP does).
+Counts are per process, so this only queues anything with threaded workers;
+with one thread per worker it still sheds nothing and costs one lock.
+
+A login or signup that finds the password hashing pool full
+(``hospital.credentials.PoolBusy``) is shed the same way, whatever the role.
+"""
+import collections
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from . import metrics, sessions
+from .credentials import PoolBusy
+
+
+#weight of the newest request in the latency average
+SMOOTHING = 0.2
+DECREASE = 0.75
+INCREASE = 0.1
+#limits never drop below this share of their configured size (nor below 1)
+MIN_SCALE = 0.1
+
+
+class Controller:
+    def __init__(self):
+        self.lock=threading.Lock()
+        self.freed=threading.Condition(self.lock)
+        self.in_flight=collections.Counter()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.in_flight.clear()
+            self.scale=1.0
+            self.latency=None
+            self.adjusted=time.monotonic()
+
+    def limit(self, role):
+        maximum=settings.ADMISSION_LIMITS.get(role)
+        if maximum is None:
+            return None
+        return max(1, int(maximum*self.scale))
+
+    def acquire(self, role, timeout, always=False):
+        """Take a slot for ``role``; False if none came free within ``timeout``."""
+        deadline=time.monotonic()+timeout
+        with self.lock:
+            while not always:
+                limit=self.limit(role)
+                if limit is None or self.in_flight[role] < limit:
+                    break
+                remaining=deadline-time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.freed.wait(remaining)
+            self.in_flight[role]+=1
+            return True
+
+    def release(self, role, seconds):
+        with self.lock:
+            self.in_flight[role]-=1
+            self.observe(seconds)
+            self.freed.notify_all()
+
+    def observe(self, seconds):
+        #called with the lock held
+        self.latency=seconds if self.latency is None else self.latency+SMOOTHING*(seconds-self.latency)
+        now=time.monotonic()
+        if now-self.adjusted < settings.ADMISSION_ADJUST_SECONDS:
+            return
+        self.adjusted=now
+        if self.latency > settings.ADMISSION_TARGET_LATENCY:
+            self.scale=max(MIN_SCALE, self.scale*DECREASE)
+        else:
+            self.scale=min(1.0, self.scale+INCREASE)
+
+
+controller = Controller()
+
+
+def reset():
+    controller.reset()
+
+
+def request_role(request):
+    user=getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return 'ANONYMOUS'
+    role=getattr(user, 'hospital_role', None)
+    if role is None:
+        #SessionRoleMiddleware did not run; look it up once and keep it in the session
+        session=getattr(request, 'session', None)
+        if session is None:
+            role=sessions.role_of(user)
+        elif sessions.ROLE_KEY in session:
+            role=session[sessions.ROLE_KEY]
+        else:
+            role=sessions.remember_role(request, user)
+        if role:
+            user.hospital_role=role
+    return role or 'ANONYMOUS'
+
+
+def service_unavailable():
+    response=HttpResponse('The hospital portal is busy, please try again shortly.', status=503, content_type='text/plain')
+    response['Retry-After']=settings.ADMISSION_RETRY_AFTER
+    return response
+
+
+class AdmissionMiddleware:
+    """Goes after SessionRoleMiddleware, which puts the role on the user."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            return self.get_response(request)
+        finally:
+            slot=getattr(request, '_admission', None)
+            if slot is not None:
+                role, started = slot
+                controller.release(role, time.perf_counter()-started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        #here the URL is resolved, so the view decides what is always admitted
+        if not settings.ADMISSION_ENABLE:
+            return None
+        role=request_role(request)
+        always=metrics.view_label(request) in settings.ADMISSION_ALWAYS
+        if not controller.acquire(role, settings.ADMISSION_QUEUE_SECONDS, always):
+            metrics.inc('hospital_requests_shed_total', (role,))
+            return service_unavailable()
+        request._admission=(role, time.perf_counter())
+        return None
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, PoolBusy):
+            metrics.inc('hospital_requests_shed_total', (request_role(request),))
+            return service_unavailable()
+        return None
@@ -0,0 +1,230 @@
+"""
+Read-only JSON API (v1) over doctors, patients, appointments and discharges.
+
+Rows are serialized straight from ``values()`` so no model instances are built,
+pagination is keyset based on ``id`` (an opaque signed cursor) and every
+response carries a strong ETag so polling clients get ``304 Not Modified``.
+"""
+import hashlib
+import json
+
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from django.views.decorators.http import require_safe
+
+from . import models
+from .views import is_admin, is_doctor, is_patient
+
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+CURSOR_SALT = 'hospital.api.cursor'
+
+
+#public field name -> ORM lookup, the order here is the default field order
+DOCTOR_FIELDS = {
+    'id': 'id',
+    'user_id': 'user_id',
+    'first_name': 'user__first_name',
+    'last_name': 'user__last_name',
+    'address': 'address',
+    'mobile': 'mobile',
+    'department': 'department',
+    'status': 'status',
+}
+
+PATIENT_FIELDS = {
+    'id': 'id',
+    'user_id': 'user_id',
+    'first_name': 'user__first_name',
+    'last_name': 'user__last_name',
+    'address': 'address',
+    'mobile': 'mobile',
+    'symptoms': 'symptoms',
+    'assignedDoctorId': 'assignedDoctorId',
+    'admitDate': 'admitDate',
+    'status': 'status',
+}
+
+APPOINTMENT_FIELDS = {
+    'id': 'id',
+    'patientId': 'patientId',
+    'doctorId': 'doctorId',
+    'patientName': 'patientName',
+    'doctorName': 'doctorName',
+    'appointmentDate': 'appointmentDate',
+    'description': 'description',
+    'status': 'status',
+}
+
+DISCHARGE_FIELDS = {
+    'id': 'id',
+    'patientId': 'patientId',
+    'patientName': 'patientName',
+    'assignedDoctorName': 'assignedDoctorName',
+    'address': 'address',
+    'mobile': 'mobile',
+    'symptoms': 'symptoms',
+    'admitDate': 'admitDate',
+    'releaseDate': 'releaseDate',
+    'daySpent': 'daySpent',
+    'roomCharge': 'roomCharge',
+    'medicineCost': 'medicineCost',
+    'doctorFee': 'doctorFee',
+    'OtherCharge': 'OtherCharge',
+    'total': 'total',
+}
+
+
+#---------ROLE SCOPES, SAME RULES AS THE HTML VIEWS (None means forbidden)
+def doctor_scope(user):
+    if is_admin(user):
+        return models.Doctor.objects.all()
+    if is_doctor(user) or is_patient(user):
+        return models.Doctor.objects.all().filter(status=True)
+
+
+def patient_scope(user):
+    if is_admin(user):
+        return models.Patient.objects.all()
+    if is_doctor(user):
+        return models.Patient.objects.all().filter(status=True,assignedDoctorId=user.id)
+    if is_patient(user):
+        return models.Patient.objects.all().filter(user_id=user.id)
+
+
+def appointment_scope(user):
+    if is_admin(user):
+        return models.Appointment.objects.all()
+    if is_doctor(user):
+        return models.Appointment.objects.all().filter(status=True,doctorId=user.id)
+    if is_patient(user):
+        return models.Appointment.objects.all().filter(patientId=user.id)
+
+
+def discharge_scope(user):
+    if is_admin(user):
+        return models.PatientDischargeDetails.objects.all()
+    if is_doctor(user):
+        return models.PatientDischargeDetails.objects.all().filter(assignedDoctorName=user.first_name)
+    if is_patient(user):
+        patient_ids=models.Patient.objects.filter(user_id=user.id).values('id')
+        return models.PatientDischargeDetails.objects.all().filter(patientId__in=patient_ids)
+
+
+RESOURCES = {
+    'doctors': (DOCTOR_FIELDS, doctor_scope),
+    'patients': (PATIENT_FIELDS, patient_scope),
+    'appointments': (APPOINTMENT_FIELDS, appointment_scope),
+    'discharges': (DISCHARGE_FIELDS, discharge_scope),
+}
+
+
+class BadRequest(Exception):
+    pass
+
+
+def json_response(payload, status=200):
+    body=json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return HttpResponse(body, status=status, content_type='application/json')
+
+
+def encode_cursor(resource, last_id):
+    return signing.dumps([resource, last_id], salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(resource, cursor):
+    try:
+        cursor_resource, last_id = signing.loads(cursor, salt=CURSOR_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        raise BadRequest('invalid cursor')
+    if cursor_resource != resource or not isinstance(last_id, int):
+        raise BadRequest('invalid cursor')
+    return last_id
+
+
+def selected_fields(request, field_map):
+    #?fields=a,b,c picks columns, id is always fetched because the cursor needs it
+    requested=request.GET.get('fields')
+    if not requested:
+        return list(field_map)
+    fields=[f.strip() for f in requested.split(',') if f.strip()]
+    unknown=[f for f in fields if f not in field_map]
+    if unknown:
+        raise BadRequest('unknown field(s): ' + ', '.join(unknown))
+    return fields
+
+
+def page_limit(request):
+    try:
+        limit=int(request.GET.get('limit', DEFAULT_LIMIT))
+    except ValueError:
+        raise BadRequest('limit must be an integer')
+    if limit < 1:
+        raise BadRequest('limit must be positive')
+    return min(limit, MAX_LIMIT)
+
+
+def project(queryset, field_map, fields):
+    #only the selected columns are read, related names are pulled in through the join
+    plain=[]
+    aliased={}
+    for name in set(fields) | {'id'}:
+        lookup=field_map[name]
+        if lookup == name:
+            plain.append(name)
+        else:
+            aliased[name]=F(lookup)
+    return queryset.values(*plain, **aliased)
+
+
+def etag_for(body):
+    return '"%s"' % hashlib.sha1(body).hexdigest()
+
+
+def not_modified(request, etag):
+    if_none_match=request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    etags=parse_etags(if_none_match)
+    return '*' in etags or etag in etags
+
+
+@require_safe
+def list_view(request, resource):
+    if not request.user.is_authenticated:
+        return json_response({'detail': 'authentication required'}, status=401)
+    field_map, scope = RESOURCES[resource]
+    queryset=scope(request.user)
+    if queryset is None:
+        return json_response({'detail': 'permission denied'}, status=403)
+    try:
+        fields=selected_fields(request, field_map)
+        limit=page_limit(request)
+        cursor=request.GET.get('cursor')
+        if cursor:
+            queryset=queryset.filter(id__gt=decode_cursor(resource, cursor))
+    except BadRequest as e:
+        return json_response({'detail': str(e)}, status=400)
+
+    rows=list(project(queryset, field_map, fields).order_by('id')[:limit+1])
+    next_cursor=None
+    if len(rows) > limit:
+        rows=rows[:limit]
+        next_cursor=encode_cursor(resource, rows[-1]['id'])
+    payload={
+        'results': [{f: row[f] for f in fields} for row in rows],
+        'next': next_cursor,
+    }
+
+    response=json_response(payload)
+    etag=etag_for(response.content)
+    if not_modified(request, etag):
+        response=HttpResponseNotModified()
+    response['ETag']=etag
+    response['Cache-Control']='private, no-cache'
+    response['Vary']='Cookie'
+    return response
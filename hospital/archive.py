@@ -0,0 +1,115 @@
+"""
+Archival of soft-deleted doctors and patients.
+
+``delete_*_from_hospital_view`` only flag the profile, so the request returns
+at once. This job later copies flagged profiles and every appointment keyed to
+their user id into the archive tables and removes them (and their users) from
+the hot tables. Appointments go first, in id-ordered chunks of ``batch_size``
+each copied and deleted in its own transaction; then each batch of profiles
+in one more.
+"""
+from django.db import transaction
+
+from . import models
+
+
+def archive_appointment_chunk(appointments, after, batch_size):
+    with transaction.atomic():
+        chunk=list(appointments.filter(id__gt=after).order_by('id')[:batch_size])
+        if not chunk:
+            return after,0
+        models.ArchivedAppointment.objects.bulk_create([
+            models.ArchivedAppointment(
+                originalId=a.id,
+                patientId=a.patientId,
+                doctorId=a.doctorId,
+                patientName=a.patientName,
+                doctorName=a.doctorName,
+                appointmentDate=a.appointmentDate,
+                description=a.description,
+                status=a.status,
+            )
+            for a in chunk
+        ])
+        deleted,_=models.Appointment.objects.filter(id__in=[a.id for a in chunk]).delete()
+    return chunk[-1].id,deleted
+
+
+def archive_appointments(appointments, batch_size):
+    #batch_size rows in memory and in each transaction, however many there are
+    archived=0
+    after=0
+    while True:
+        last,deleted=archive_appointment_chunk(appointments,after,batch_size)
+        if last == after:
+            return archived
+        after=last
+        archived+=deleted
+
+
+def archive_doctor_batch(batch_size):
+    doctors=list(models.Doctor.all_objects.filter(is_deleted=True).select_related('user').order_by('id')[:batch_size])
+    if not doctors:
+        return 0,0
+    user_ids=[d.user_id for d in doctors]
+    appointments=archive_appointments(models.Appointment.objects.filter(doctorId__in=user_ids),batch_size)
+    with transaction.atomic():
+        models.ArchivedDoctor.objects.bulk_create([
+            models.ArchivedDoctor(
+                originalId=d.id,
+                userId=d.user_id,
+                username=d.user.username,
+                name=d.get_name,
+                address=d.address,
+                mobile=d.mobile,
+                department=d.department,
+                deleted_at=d.deleted_at,
+            )
+            for d in doctors
+        ])
+        #any booked while the chunks ran
+        appointments+=archive_appointments(models.Appointment.objects.filter(doctorId__in=user_ids),batch_size)
+        #cascades to the doctor rows
+        models.User.objects.filter(id__in=user_ids).delete()
+    return len(doctors),appointments
+
+
+def archive_patient_batch(batch_size):
+    patients=list(models.Patient.all_objects.filter(is_deleted=True).select_related('user').order_by('id')[:batch_size])
+    if not patients:
+        return 0,0
+    user_ids=[p.user_id for p in patients]
+    appointments=archive_appointments(models.Appointment.objects.filter(patientId__in=user_ids),batch_size)
+    with transaction.atomic():
+        models.ArchivedPatient.objects.bulk_create([
+            models.ArchivedPatient(
+                originalId=p.id,
+                userId=p.user_id,
+                username=p.user.username,
+                name=p.get_name,
+                address=p.address,
+                mobile=p.mobile,
+                symptoms=p.symptoms,
+                assignedDoctorId=p.assignedDoctorId,
+                admitDate=p.admitDate,
+                deleted_at=p.deleted_at,
+            )
+            for p in patients
+        ])
+        #any booked while the chunks ran
+        appointments+=archive_appointments(models.Appointment.objects.filter(patientId__in=user_ids),batch_size)
+        #cascades to the patient rows
+        models.User.objects.filter(id__in=user_ids).delete()
+    return len(patients),appointments
+
+
+def archive_deleted(batch_size=500):
+    counts={'doctors':0,'patients':0,'appointments':0}
+    for key,archive_batch in (('doctors',archive_doctor_batch),('patients',archive_patient_batch)):
+        while True:
+            profiles,appointments=archive_batch(batch_size)
+            if not profiles:
+                break
+            counts[key]+=profiles
+            counts['appointments']+=appointments
+    return counts
@@ -0,0 +1,128 @@
+"""
+Audit trail of who approved, rejected, discharged, updated or deleted what.
+
+``record()`` only appends an unsaved ``AuditEvent`` to a per-process buffer,
+once the surrounding transaction commits: an action that is rolled back is
+never logged.
+The buffer is written with one ``bulk_create`` once it holds
+``AUDIT_FLUSH_SIZE`` events, or at the end of a request when its oldest event
+is ``AUDIT_FLUSH_SECONDS`` old, so actions never wait on an INSERT of their
+own. Whatever is left is flushed when the process exits; servers that stop
+workers without running ``atexit`` should call ``flush()`` from their
+shutdown hook.
+
+``AuditMiddleware`` makes the requesting user the actor of every event
+recorded during the request, including those from model signals.
+"""
+import atexit
+import contextvars
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+
+logger = logging.getLogger(__name__)
+
+_actor = contextvars.ContextVar('hospital_audit_actor', default=None)
+_lock = threading.Lock()
+_buffer = []
+#monotonic time the oldest buffered event was recorded
+_oldest = [None]
+
+
+def current_actor():
+    return _actor.get()
+
+
+def record(action, target, detail='', actor=None):
+    """
+    Buffer one event. ``target`` is a model instance, or a
+    ``(targetType, targetId)`` pair when only the id is at hand.
+    """
+    from .models import AuditEvent
+    actor=actor if actor is not None else current_actor()
+    if isinstance(target, tuple):
+        target_type, target_id = target
+    else:
+        target_type, target_id = target._meta.model_name, target.pk
+    authenticated=actor is not None and actor.is_authenticated
+    event=AuditEvent(
+        actorId=actor.id if authenticated else None,
+        actorName=actor.username if authenticated else '',
+        action=action, targetType=target_type, targetId=target_id,
+        detail=detail[:255], created_at=timezone.now())
+    transaction.on_commit(lambda: append(event))
+
+
+def append(event):
+    with _lock:
+        if len(_buffer) >= settings.AUDIT_MAX_BUFFER:
+            #the database has been failing for a while, keep memory bounded
+            logger.error('Audit buffer full, dropping %s', event)
+            return
+        if not _buffer:
+            _oldest[0]=time.monotonic()
+        _buffer.append(event)
+        full=len(_buffer) >= settings.AUDIT_FLUSH_SIZE
+    if full:
+        #after the commit, so outside the caller's transaction
+        flush()
+
+
+def record_ids(action, model, ids, detail=''):
+    for pk in ids:
+        record(action, (model._meta.model_name, int(pk)), detail)
+
+
+def pending():
+    return len(_buffer)
+
+
+def flush():
+    with _lock:
+        events=_buffer[:]
+        del _buffer[:]
+        _oldest[0]=None
+    if not events:
+        return 0
+    from .models import AuditEvent
+    try:
+        AuditEvent.objects.bulk_create(events, batch_size=500)
+    except DatabaseError:
+        logger.exception('Could not write %d audit event(s), keeping them for the next flush', len(events))
+        with _lock:
+            _buffer[:0]=events[:settings.AUDIT_MAX_BUFFER-len(_buffer)]
+            _oldest[0]=_oldest[0] or time.monotonic()
+        return 0
+    return len(events)
+
+
+def flush_if_due():
+    oldest=_oldest[0]
+    if oldest is not None and time.monotonic()-oldest >= settings.AUDIT_FLUSH_SECONDS:
+        flush()
+
+
+def discard():
+    with _lock:
+        del _buffer[:]
+        _oldest[0]=None
+
+
+atexit.register(flush)
+
+
+class AuditMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token=_actor.set(request.user)
+        try:
+            return self.get_response(request)
+        finally:
+            _actor.reset(token)
@@ -0,0 +1,129 @@
+"""
+SQLite backend tuned for several workers sharing one database file.
+
+``get_new_connection`` applies ``SQLITE_PRAGMAS`` to every new connection:
+WAL journaling, so readers and the writer no longer block each other;
+``synchronous=NORMAL``, which is crash-safe under WAL; a memory map, a larger
+page cache and a busy timeout.
+
+With ``SQLITE_IMMEDIATE`` transactions start with ``BEGIN IMMEDIATE``. The
+write lock is taken up front, so two transactions that read and then write
+queue on the busy timeout instead of one of them failing with "database is
+locked" when it tries to upgrade its read lock. Read-only ``atomic()`` blocks
+take the write lock too.
+
+``SQLITE_WRITE_LOCK`` adds a single-writer queue: an exclusive ``flock`` on
+``<database>-writer.lock`` (a process-wide thread lock where ``fcntl`` is
+missing) is held for each transaction and for each write made outside one.
+Waiting workers sleep in the kernel's queue and are woken in turn, rather
+than polling with SQLite's busy handler.
+"""
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+WRITES = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+class WriterLock:
+    def __init__(self, path):
+        self.path=path
+        self.file=None
+
+    def acquire(self):
+        if fcntl is None:
+            with _thread_locks_guard:
+                lock=_thread_locks.setdefault(self.path, threading.Lock())
+            lock.acquire()
+            return
+        if self.file is None:
+            self.file=open(self.path, 'a')
+        fcntl.flock(self.file, fcntl.LOCK_EX)
+
+    def release(self):
+        if fcntl is None:
+            _thread_locks[self.path].release()
+        else:
+            fcntl.flock(self.file, fcntl.LOCK_UN)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file=None
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writer_lock=None
+        self.holds_writer_lock=False
+        self.execute_wrappers.append(self.queue_write)
+
+    def get_new_connection(self, conn_params):
+        conn=super().get_new_connection(conn_params)
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            conn.execute('PRAGMA %s = %s' % (name, value))
+        return conn
+
+    #---------SINGLE WRITER
+    def acquire_writer(self):
+        if not settings.SQLITE_WRITE_LOCK or self.holds_writer_lock or self.is_in_memory_db():
+            return
+        if self.writer_lock is None:
+            self.writer_lock=WriterLock(self.settings_dict['NAME']+'-writer.lock')
+        self.writer_lock.acquire()
+        self.holds_writer_lock=True
+
+    def release_writer(self):
+        if self.holds_writer_lock:
+            self.holds_writer_lock=False
+            self.writer_lock.release()
+
+    def queue_write(self, execute, sql, params, many, context):
+        #writes in autocommit mode, transactions hold the lock already
+        if self.in_atomic_block or self.holds_writer_lock or not sql.lstrip()[:7].upper().startswith(WRITES):
+            return execute(sql, params, many, context)
+        self.acquire_writer()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.release_writer()
+
+    #---------TRANSACTIONS
+    def _start_transaction_under_autocommit(self):
+        self.acquire_writer()
+        try:
+            self.cursor().execute('BEGIN IMMEDIATE' if settings.SQLITE_IMMEDIATE else 'BEGIN')
+        except Exception:
+            self.release_writer()
+            raise
+
+    def _commit(self):
+        try:
+            super()._commit()
+        finally:
+            self.release_writer()
+
+    def _rollback(self):
+        try:
+            super()._rollback()
+        finally:
+            self.release_writer()
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            self.release_writer()
+            if self.writer_lock is not None:
+                self.writer_lock.close()
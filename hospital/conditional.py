@@ -0,0 +1,51 @@
+"""
+Conditional GET for list and dashboard pages.
+
+Each page declares the querysets its content is built from. The data version
+of a scope is ``(max(updated_at), count)`` - one aggregate query - so an
+unchanged auto-refresh is answered with ``304 Not Modified`` before the page's
+own queries or template rendering run. The row count catches deletes, which
+``max(updated_at)`` alone would miss; for the same reason no Last-Modified
+validator is offered.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Count, Max
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from . import metrics
+
+
+def scope_version(queryset):
+    version=queryset.order_by().aggregate(last=Max('updated_at'), count=Count('id'))
+    return version['last'], version['count']
+
+
+def page_etag(request, scopes):
+    #the user is part of the key because sidebars and filters are per user
+    versions=[scope_version(queryset) for queryset in scopes]
+    key=repr((settings.RELEASE_ID, request.path, request.user.pk, versions))
+    return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+
+def data_versioned(scopes_func):
+    """
+    Decorate a view with an ETag built from the querysets returned by
+    ``scopes_func(request, *args, **kwargs)``. Put it below the login and
+    role checks so unauthorised requests never reach the version queries.
+    """
+    def etag_func(request, *args, **kwargs):
+        return page_etag(request, scopes_func(request, *args, **kwargs))
+    def decorator(view):
+        conditional_view=cache_control(private=True, no_cache=True)(condition(etag_func=etag_func)(view))
+        @wraps(view)
+        def counted(request, *args, **kwargs):
+            response=conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                metrics.cache_lookup('page-etag', response.status_code == 304)
+            return response
+        return counted
+    return decorator
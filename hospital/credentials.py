@@ -0,0 +1,101 @@
+"""
+Password hashing off the request threads.
+
+Every PBKDF2 encode and verify (``hospital.hashers``) runs on a small pool of
+``PASSWORD_HASH_WORKERS`` threads per process. ``hashlib`` releases the GIL
+while it hashes, so the pool uses real cores, but never more than its size:
+a burst of logins at shift change queues here instead of every request
+thread hashing at once and starving the rest of the site. At most
+``PASSWORD_HASH_QUEUE`` more hashes may wait; beyond that ``PoolBusy`` is
+raised, and ``AdmissionMiddleware`` turns it into a 503.
+
+Coroutines use ``amake_password()`` and ``acheck_password()``, which await
+the pool without blocking the event loop.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+
+class PoolBusy(Exception):
+    pass
+
+
+_local = threading.local()
+
+
+def in_pool():
+    return getattr(_local, 'active', False)
+
+
+class HashPool:
+    def __init__(self):
+        self.lock=threading.Lock()
+        self.executor=None
+        self.pid=None
+
+    def reset(self):
+        with self.lock:
+            if self.executor is not None and self.pid == os.getpid():
+                self.executor.shutdown(wait=False)
+            self.executor=None
+
+    def get_executor(self):
+        with self.lock:
+            #a forked worker must not use its parent's (dead) threads
+            if self.executor is None or self.pid != os.getpid():
+                self.executor=ThreadPoolExecutor(settings.PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+                self.slots=threading.BoundedSemaphore(settings.PASSWORD_HASH_WORKERS+settings.PASSWORD_HASH_QUEUE)
+                self.pid=os.getpid()
+            return self.executor, self.slots
+
+    def submit(self, func, *args):
+        executor, slots = self.get_executor()
+        if not slots.acquire(blocking=False):
+            raise PoolBusy()
+        try:
+            future=executor.submit(call_in_pool, func, *args)
+        except BaseException:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+
+def call_in_pool(func, *args):
+    _local.active=True
+    try:
+        return func(*args)
+    finally:
+        _local.active=False
+
+
+pool = HashPool()
+
+
+def reset():
+    pool.reset()
+
+
+def run(func, *args):
+    """Call ``func(*args)`` on the pool and wait for it."""
+    if in_pool():
+        return func(*args)
+    return pool.submit(func, *args).result()
+
+
+async def arun(func, *args):
+    return await asyncio.wrap_future(pool.submit(func, *args))
+
+
+async def amake_password(password):
+    return await arun(make_password, password)
+
+
+async def acheck_password(password, encoded):
+    #no rehash here, that needs a database write; User.check_password does it
+    return await arun(check_password, password, encoded)
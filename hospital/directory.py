@@ -0,0 +1,70 @@
+"""
+Approved-doctor directory shown to patients.
+
+The directory only changes when an admin approves, updates or deletes a doctor,
+so it is kept in the ``directory`` cache as a list of small dicts and rebuilt
+lazily after ``Doctor``/``User`` change signals drop it (see ``signals.py``)
+once the change has committed.
+Searching runs over the cached list, so a warm directory costs no queries.
+"""
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from . import metrics, models
+
+
+CACHE_ALIAS = 'directory'
+CACHE_KEY = 'hospital:doctor-directory'
+
+
+def build_directory():
+    rows=models.Doctor.objects.all().filter(status=True).order_by('id').values_list(
+        'id','user_id','user__first_name','user__last_name','department','mobile','address','profile_pic')
+    return [
+        {
+            'id':pk,
+            'user_id':user_id,
+            'first_name':first_name,
+            'last_name':last_name,
+            'get_name':first_name+" "+last_name,
+            'department':department,
+            'mobile':mobile,
+            'address':address,
+            'thumbnail':default_storage.url(profile_pic) if profile_pic else '',
+        }
+        for pk,user_id,first_name,last_name,department,mobile,address,profile_pic in rows
+    ]
+
+
+def get_directory():
+    cache=caches[CACHE_ALIAS]
+    directory=cache.get(CACHE_KEY)
+    metrics.cache_lookup(CACHE_ALIAS, directory is not None)
+    if directory is None:
+        directory=build_directory()
+        cache.set(CACHE_KEY, directory, None)
+    return directory
+
+
+def delete_directory():
+    caches[CACHE_ALIAS].delete(CACHE_KEY)
+
+
+def invalidate_directory():
+    #after the commit: a request rebuilding it earlier would cache what it read
+    #before the change, and keep it until the next invalidation
+    transaction.on_commit(delete_directory)
+
+
+def search_directory(query):
+    #department matches anywhere, names match on prefix (first or last name)
+    query=query.strip().lower()
+    if not query:
+        return get_directory()
+    return [
+        d for d in get_directory()
+        if query in d['department'].lower()
+        or d['first_name'].lower().startswith(query)
+        or d['last_name'].lower().startswith(query)
+    ]
@@ -0,0 +1,303 @@
+"""
+Server-sent events for the admin approval queues.
+
+Model signals call ``queue_changed()``; once the transaction commits it
+publishes the pending doctor/patient/appointment counts, plus the new item
+for a fresh sign-up or booking, on ``APPROVAL_EVENTS_CHANNEL``:
+
+* ``hospital.events.LocalChannel`` (default) reaches the clients connected to
+  this process only, enough for a single ASGI worker;
+* ``hospital.events.PostgresChannel`` goes through ``NOTIFY``/``LISTEN`` so
+  every worker on the database sees every change. A worker with connected
+  admins holds a shared advisory lock; publishers look for it at most every
+  ``LISTENER_CHECK_SECONDS`` and skip the counts and the ``NOTIFY`` when no
+  worker holds it.
+
+``EventStreamRouter`` wraps the Django ASGI application and answers
+``EVENTS_PATH`` itself. A connection is a coroutine and a small queue, no
+thread, so idle admins cost next to nothing; they get a comment line every
+``APPROVAL_EVENTS_HEARTBEAT`` seconds to keep proxies from closing them.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections, transaction
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PATH = '/admin-approval-events'
+NOTIFY_CHANNEL = 'hospital_approvals'
+#a client further behind than this misses item events, the next counts event catches it up
+QUEUE_SIZE = 100
+#advisory lock key held (shared) by every worker with a connected admin, 'hosp'
+LISTENER_LOCK = 0x686f7370
+#how long a publisher trusts its last look for listeners, and how often listeners update the lock
+LISTENER_CHECK_SECONDS = 1
+
+
+#---------IN-PROCESS PUB/SUB
+class Broker:
+    def __init__(self):
+        self.lock=threading.Lock()
+        #event loop -> set of subscriber queues
+        self.subscribers={}
+        self.last_counts=None
+
+    def subscribe(self):
+        loop=asyncio.get_event_loop()
+        queue=asyncio.Queue(QUEUE_SIZE)
+        with self.lock:
+            if not self.subscribers:
+                #nothing was published while nobody listened
+                self.last_counts=None
+            self.subscribers.setdefault(loop, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        with self.lock:
+            for loop, queues in list(self.subscribers.items()):
+                queues.discard(queue)
+                if not queues:
+                    del self.subscribers[loop]
+
+    def has_subscribers(self):
+        return bool(self.subscribers)
+
+    def publish(self, event):
+        #called from any thread, every queue is fed on its own loop
+        if event['type'] == 'counts':
+            self.last_counts=event
+        with self.lock:
+            targets=[(loop, list(queues)) for loop, queues in self.subscribers.items()]
+        for loop, queues in targets:
+            try:
+                loop.call_soon_threadsafe(deliver, queues, event)
+            except RuntimeError:
+                #loop already closed
+                pass
+
+
+def deliver(queues, event):
+    for queue in queues:
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            pass
+
+
+broker = Broker()
+
+
+#---------CHANNELS BETWEEN PUBLISHERS AND THE BROKER
+class LocalChannel:
+    def wanted(self):
+        return broker.has_subscribers()
+
+    def publish(self, event):
+        broker.publish(event)
+
+    def start(self):
+        pass
+
+
+class PostgresChannel:
+    """
+    Events travel as NOTIFY payloads, so they reach the clients of every
+    worker on the database. One listener thread per process feeds the local
+    broker.
+    """
+    def __init__(self):
+        self.thread=None
+        self.lock=threading.Lock()
+        #monotonic time of the last look, and what it found
+        self.checked=None
+        self.listening=False
+
+    def wanted(self):
+        #subscribers may be in any process, their listeners hold LISTENER_LOCK
+        now=time.monotonic()
+        if self.checked is None or now-self.checked >= LISTENER_CHECK_SECONDS:
+            with connections['default'].cursor() as cursor:
+                cursor.execute(
+                    "SELECT EXISTS (SELECT 1 FROM pg_locks WHERE locktype = 'advisory' "
+                    "AND classid = 0 AND objid = %s AND objsubid = 1 AND granted)", [LISTENER_LOCK])
+                self.listening=cursor.fetchone()[0]
+            self.checked=now
+        return self.listening
+
+    def publish(self, event):
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [NOTIFY_CHANNEL, json.dumps(event)])
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.thread=threading.Thread(target=self.listen, name='approval-events', daemon=True)
+                self.thread.start()
+
+    def listen(self):
+        import psycopg2
+        while True:
+            try:
+                conn=psycopg2.connect(**connections['default'].get_connection_params())
+                conn.autocommit=True
+                held=False
+                with conn.cursor() as cursor:
+                    cursor.execute('LISTEN %s' % NOTIFY_CHANNEL)
+                while True:
+                    #held only while this process has admins connected
+                    if broker.has_subscribers() != held:
+                        held=not held
+                        with conn.cursor() as cursor:
+                            cursor.execute('SELECT %s(%%s)' % ('pg_advisory_lock_shared' if held else 'pg_advisory_unlock_shared'),
+                                           [LISTENER_LOCK])
+                    if select.select([conn], [], [], LISTENER_CHECK_SECONDS) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        broker.publish(json.loads(conn.notifies.pop(0).payload))
+            except Exception:
+                logger.exception('Approval event listener lost its connection, reconnecting')
+                time.sleep(5)
+
+
+_channel = None
+
+
+def get_channel():
+    global _channel
+    if _channel is None:
+        _channel=import_string(settings.APPROVAL_EVENTS_CHANNEL)()
+    return _channel
+
+
+#---------EVENTS PUBLISHED ON MODEL CHANGES
+def pending_counts():
+    from . import models
+    return {
+        'type': 'counts',
+        'doctors': models.Doctor.objects.filter(status=False).count(),
+        'patients': models.Patient.objects.filter(status=False).count(),
+        'appointments': models.Appointment.objects.filter(status=False).count(),
+    }
+
+
+def queue_item(instance):
+    from . import models
+    if isinstance(instance, models.Doctor):
+        return {'type': 'item', 'kind': 'doctor', 'id': instance.id, 'name': instance.get_name,
+                'department': instance.department, 'mobile': instance.mobile}
+    if isinstance(instance, models.Patient):
+        return {'type': 'item', 'kind': 'patient', 'id': instance.id, 'name': instance.get_name,
+                'symptoms': instance.symptoms, 'mobile': instance.mobile}
+    return {'type': 'item', 'kind': 'appointment', 'id': instance.id, 'patientName': instance.patientName,
+            'doctorName': instance.doctorName, 'description': instance.description}
+
+
+def queue_changed(instance=None):
+    """
+    Publish fresh counts (and ``instance`` as a new queue item) after the
+    current transaction commits. Skipped when nobody can be listening.
+    """
+    channel=get_channel()
+    if not channel.wanted():
+        return
+    item=queue_item(instance) if instance is not None else None
+
+    def publish():
+        if item is not None:
+            channel.publish(item)
+        channel.publish(pending_counts())
+    transaction.on_commit(publish)
+
+
+#---------THE SSE ENDPOINT
+def is_admin_session(headers):
+    from django.contrib.auth import get_user
+    from .sessions import ROLE_KEY
+    from .views import is_admin
+    cookie=SimpleCookie()
+    cookie.load(headers.get(b'cookie', b'').decode('latin-1'))
+    morsel=cookie.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return False
+    session=import_module(settings.SESSION_ENGINE).SessionStore(morsel.value)
+    user=get_user(SimpleNamespace(session=session))
+    if not user.is_authenticated:
+        return False
+    if session.get(ROLE_KEY):
+        user.hospital_role=session[ROLE_KEY]
+    return is_admin(user)
+
+
+def encode(event):
+    return ('event: %s\ndata: %s\n\n' % (event['type'], json.dumps(event))).encode()
+
+
+async def approval_events(scope, receive, send):
+    headers=dict(scope['headers'])
+    if not await sync_to_async(is_admin_session)(headers):
+        await send({'type': 'http.response.start', 'status': 403, 'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'Forbidden'})
+        return
+    channel=get_channel()
+    channel.start()
+    queue=broker.subscribe()
+    try:
+        first=broker.last_counts or await sync_to_async(pending_counts)()
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            #nginx would otherwise hold the events back in its buffer
+            (b'x-accel-buffering', b'no'),
+        ]})
+        await send({'type': 'http.response.body', 'body': encode(first), 'more_body': True})
+
+        async def wait_for_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+            deliver([queue], None)
+        watcher=asyncio.ensure_future(wait_for_disconnect())
+        try:
+            while True:
+                try:
+                    event=await asyncio.wait_for(queue.get(), settings.APPROVAL_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    body=b': ping\n\n'
+                else:
+                    body=encode(event) if event is not None else None
+                if body is None or watcher.done():
+                    break
+                await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+        finally:
+            watcher.cancel()
+    finally:
+        broker.unsubscribe(queue)
+
+
+def events_unavailable(request):
+    #reached under WSGI, 204 tells EventSource not to reconnect
+    return HttpResponse(status=204)
+
+
+class EventStreamRouter:
+    """ASGI application answering ``EVENTS_PATH`` and passing the rest to Django."""
+    def __init__(self, application):
+        self.application=application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == EVENTS_PATH and scope['method'] == 'GET':
+            return await approval_events(scope, receive, send)
+        return await self.application(scope, receive, send)
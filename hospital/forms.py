@@ -4,8 +4,19 @@ from . import models
 
 
 
+#hashes the password before the first save, so a new user is a single INSERT
+class UserPasswordForm(forms.ModelForm):
+    def save(self, commit=True):
+        user=super().save(commit=False)
+        user.set_password(self.cleaned_data['password'])
+        if commit:
+            user.save()
+            self._save_m2m()
+        return user
+
+
 #for admin signup
-class AdminSigupForm(forms.ModelForm):
+class AdminSigupForm(UserPasswordForm):
     class Meta:
         model=User
         fields=['first_name','last_name','username','password']
@@ -15,7 +26,7 @@ class AdminSigupForm(forms.ModelForm):
 
 
 #for student related form
-class DoctorUserForm(forms.ModelForm):
+class DoctorUserForm(UserPasswordForm):
     class Meta:
         model=User
         fields=['first_name','last_name','username','password']
@@ -30,7 +41,7 @@ class DoctorForm(forms.ModelForm):
 
 
 #for teacher related form
-class PatientUserForm(forms.ModelForm):
+class PatientUserForm(UserPasswordForm):
     class Meta:
         model=User
         fields=['first_name','last_name','username','password']
@@ -0,0 +1,50 @@
+"""
+Password hashers used by ``PASSWORD_HASHERS``.
+
+Hashing is the most expensive thing a login or signup does, so it is timed
+for ``/metrics`` and run on the bounded pool of ``hospital.credentials``. The
+algorithm name is unchanged, existing hashes verify as before. The work factor
+is ``PASSWORD_ITERATIONS``; after it changes, each user's hash is redone with
+the new count the next time they log in (Django's ``must_update``).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+from . import credentials, metrics
+
+
+#set while verify() runs, its internal encode() is part of the verify timing
+_verifying = threading.local()
+
+
+class TimedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_ITERATIONS
+
+    def encode(self, password, salt, iterations=None):
+        if getattr(_verifying, 'active', False):
+            return super().encode(password, salt, iterations)
+        return credentials.run(self.timed_encode, password, salt, iterations)
+
+    def timed_encode(self, password, salt, iterations):
+        started=time.perf_counter()
+        try:
+            return super().encode(password, salt, iterations)
+        finally:
+            metrics.observe('hospital_password_hash_seconds', time.perf_counter()-started, ('encode',))
+
+    def verify(self, password, encoded):
+        return credentials.run(self.timed_verify, password, encoded)
+
+    def timed_verify(self, password, encoded):
+        started=time.perf_counter()
+        _verifying.active=True
+        try:
+            return super().verify(password, encoded)
+        finally:
+            _verifying.active=False
+            metrics.observe('hospital_password_hash_seconds', time.perf_counter()-started, ('verify',))
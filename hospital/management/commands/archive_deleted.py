@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from hospital.archive import archive_deleted
+
+
+class Command(BaseCommand):
+    help = 'Move soft-deleted doctors and patients, with their appointments, into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Profiles archived per transaction (default: 500)')
+
+    def handle(self, *args, **options):
+        counts = archive_deleted(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            'Archived {doctors} doctor(s), {patients} patient(s) and {appointments} appointment(s)'.format(**counts)))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from hospital import partitions
+
+
+class Command(BaseCommand):
+    help = 'Pre-create future monthly appointment/discharge partitions and detach old ones (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Months after the current one to pre-create (default: 3)')
+        parser.add_argument('--backfill', action='store_true',
+                            help='Give months still in the default partition their own partition')
+        parser.add_argument('--detach-older-than', type=int, metavar='MONTHS',
+                            help='Detach partitions that ended more than MONTHS months ago')
+
+    def handle(self, *args, **options):
+        if not partitions.is_supported():
+            self.stdout.write('Database is not PostgreSQL, nothing to do.')
+            return
+        created = partitions.ensure_future_partitions(options['months_ahead'])
+        if options['backfill']:
+            created += partitions.backfill_partitions()
+        for name in created:
+            self.stdout.write('Created %s' % name)
+        if options['detach_older_than'] is not None:
+            for name in partitions.detach_old_partitions(options['detach_older_than']):
+                self.stdout.write('Detached %s' % name)
+        self.stdout.write(self.style.SUCCESS('Partitions up to date'))
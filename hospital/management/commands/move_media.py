@@ -0,0 +1,33 @@
+import os
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+#where uploads were written while MEDIA_ROOT pointed at the static sources
+OLD_MEDIA_DIR = 'profile_pic'
+
+
+class Command(BaseCommand):
+    help = 'Move profile pictures uploaded under the static directory into MEDIA_ROOT'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default=os.path.join(settings.BASE_DIR, 'static'),
+                            help='Old media root (default: the static directory)')
+
+    def handle(self, *args, **options):
+        source=os.path.join(options['source'], OLD_MEDIA_DIR)
+        if not os.path.isdir(source):
+            raise CommandError('Nothing to move, %s does not exist' % source)
+        moved=0
+        for dirpath, _, filenames in os.walk(source):
+            for filename in filenames:
+                old=os.path.join(dirpath, filename)
+                new=os.path.join(settings.MEDIA_ROOT, os.path.relpath(old, options['source']))
+                if os.path.exists(new):
+                    continue
+                os.makedirs(os.path.dirname(new), exist_ok=True)
+                shutil.move(old, new)
+                moved+=1
+        self.stdout.write(self.style.SUCCESS('Moved %d file(s) to %s' % (moved, settings.MEDIA_ROOT)))
@@ -0,0 +1,12 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from hospital.profiling import make_token
+
+
+class Command(BaseCommand):
+    help = 'Print a token that makes ProfilingMiddleware profile requests sent with it in an X-Profile-Token header'
+
+    def handle(self, *args, **options):
+        self.stdout.write(make_token())
+        self.stderr.write('Valid for %d seconds, e.g. curl -H "X-Profile-Token: <token>" ...' % settings.PROFILE_TOKEN_MAX_AGE)
@@ -0,0 +1,136 @@
+import importlib.util
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from hospital import audit, metrics, slowqueries, warmup
+
+
+WSGI_APP = 'hospitalmanagement.wsgi.application'
+ASGI_APP = 'hospitalmanagement.asgi.application'
+ASGI_WORKER = 'uvicorn.workers.UvicornWorker'
+
+
+def cgroup_cores():
+    """CPU quota of the container in cores, None when unlimited."""
+    try:
+        #cgroup v2: "<quota> <period>" or "max <period>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period=f.read().split()[:2]
+        if quota == 'max':
+            return None
+        return int(quota)/int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_quota_us') as f:
+            quota=int(f.read())
+        with open('/sys/fs/cgroup/cpu/cpu.cfs_period_us') as f:
+            period=int(f.read())
+    except (OSError, ValueError):
+        return None
+    return quota/period if quota > 0 and period > 0 else None
+
+
+def available_cores():
+    try:
+        cores=len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores=os.cpu_count() or 1
+    quota=cgroup_cores()
+    if quota is not None:
+        cores=min(cores, quota)
+    return max(1, int(cores+0.5))
+
+
+def default_workers(cores, asgi=False):
+    #sync workers wait on the database, an event loop does not
+    workers=cores if asgi else 2*cores+1
+    return max(1, min(workers, settings.SERVE_MAX_WORKERS))
+
+
+def post_fork(server, worker):
+    #inherited from the master, they were recorded (and are written) there
+    metrics.reset()
+    audit.discard()
+
+
+def worker_exit(server, worker):
+    audit.flush()
+    slowqueries.drain(5)
+    metrics.write()
+
+
+def gunicorn_application(target, options, warm):
+    from gunicorn.app.base import BaseApplication
+
+    class HospitalApplication(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            #runs once in the master because of preload_app
+            application=import_string(target)
+            if warm:
+                warmup.warm()
+            return application
+
+    return HospitalApplication()
+
+
+class Command(BaseCommand):
+    help = ('Serve the site with gunicorn: workers and threads sized from the available cores, '
+            'the app loaded and warmed once before forking')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bind', default=settings.SERVE_BIND,
+                            help='Address to listen on (default: %s)' % settings.SERVE_BIND)
+        parser.add_argument('--workers', type=int, default=settings.SERVE_WORKERS or None,
+                            help='Worker processes (default: WEB_CONCURRENCY, else from the available cores)')
+        parser.add_argument('--threads', type=int, default=settings.SERVE_THREADS,
+                            help='Threads per WSGI worker (default: %d)' % settings.SERVE_THREADS)
+        parser.add_argument('--asgi', action='store_true',
+                            help='Run the ASGI app, with server-sent approval events, on uvicorn workers')
+        parser.add_argument('--no-warm', action='store_false', dest='warm',
+                            help='Skip warming URL resolvers, templates and the doctor directory')
+        parser.add_argument('--check', action='store_true',
+                            help='Print the server configuration and exit')
+
+    def server_options(self, bind, workers, threads, asgi):
+        cores=available_cores()
+        options={
+            'bind': bind,
+            'workers': workers or default_workers(cores, asgi),
+            'preload_app': True,
+            'timeout': settings.SERVE_TIMEOUT,
+            'accesslog': '-',
+            'post_fork': post_fork,
+            'worker_exit': worker_exit,
+        }
+        if asgi:
+            options['worker_class']=ASGI_WORKER
+        elif threads > 1:
+            options.update(worker_class='gthread', threads=threads)
+        return cores, options
+
+    def handle(self, *args, **options):
+        cores, config=self.server_options(options['bind'], options['workers'], options['threads'], options['asgi'])
+        target=ASGI_APP if options['asgi'] else WSGI_APP
+        if options['check']:
+            self.stdout.write('cores: %d' % cores)
+            self.stdout.write('app: %s' % target)
+            self.stdout.write('warm: %s' % ('yes' if options['warm'] else 'no'))
+            for key in ('bind', 'workers', 'worker_class', 'threads', 'timeout', 'preload_app'):
+                if key in config:
+                    self.stdout.write('%s: %s' % (key, config[key]))
+            return
+        if importlib.util.find_spec('gunicorn') is None:
+            raise CommandError('gunicorn is not installed')
+        if options['asgi'] and importlib.util.find_spec('uvicorn') is None:
+            raise CommandError('--asgi needs uvicorn, pip install uvicorn')
+        #read by the workers, e.g. to split the rate limits between them
+        os.environ['WEB_CONCURRENCY']=str(config['workers'])
+        gunicorn_application(target, config, options['warm']).run()
@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+#what a worker imports before it can serve its first request
+BOOT_CODE = (
+    'import django; django.setup(); '
+    'from django.urls import get_resolver; get_resolver().url_patterns'
+)
+
+
+def parse_importtime(stderr):
+    """
+    Parse ``-X importtime`` output into (module, self_us, cumulative_us)
+    tuples. Nested imports are indented under their parent.
+    """
+    rows=[]
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|', 2)
+        rows.append((module.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def top_level_package(module):
+    return module.strip().split('.')[0]
+
+
+class Command(BaseCommand):
+    help = 'Report an import-time breakdown of a cold worker start (python -X importtime)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25,
+                            help='Number of modules to list (default: 25)')
+        parser.add_argument('--sort', choices=['cumulative', 'self'], default='cumulative',
+                            help='Order modules by cumulative or self time (default: cumulative)')
+        parser.add_argument('--packages', action='store_true',
+                            help='Sum self time per top-level package instead of listing modules')
+
+    def handle(self, *args, **options):
+        env=dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'hospitalmanagement.settings'))
+        process=subprocess.run([sys.executable, '-X', 'importtime', '-c', BOOT_CODE],
+                               cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+        if process.returncode != 0:
+            lines=process.stderr.strip().splitlines()
+            raise CommandError(lines[-1] if lines else 'Worker start-up failed with exit status %d' % process.returncode)
+        rows=parse_importtime(process.stderr)
+        if not rows:
+            raise CommandError('No -X importtime output to report')
+        total=sum(self_us for _, self_us, _ in rows)
+        self.stdout.write('Cold start imports: %d modules, %.1f ms' % (len(rows), total/1000))
+
+        if options['packages']:
+            packages={}
+            for module, self_us, _ in rows:
+                package=top_level_package(module)
+                packages[package]=packages.get(package, 0)+self_us
+            ranked=sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options['limit']]
+            self.stdout.write('%10s %6s  %s' % ('self ms', '%', 'package'))
+            for package, self_us in ranked:
+                self.stdout.write('%10.1f %5.1f%%  %s' % (self_us/1000, 100.0*self_us/(total or 1), package))
+            return
+
+        key=2 if options['sort'] == 'cumulative' else 1
+        ranked=sorted(rows, key=lambda row: row[key], reverse=True)[:options['limit']]
+        self.stdout.write('%10s %10s  %s' % ('self ms', 'cumul ms', 'module'))
+        for module, self_us, cumulative_us in ranked:
+            self.stdout.write('%10.1f %10.1f  %s' % (self_us/1000, cumulative_us/1000, module.strip()))
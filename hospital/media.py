@@ -0,0 +1,152 @@
+"""
+Access-checked serving of uploaded files (profile pictures) from MEDIA_ROOT.
+
+Every file belongs to a Doctor or Patient row. Doctor pictures are visible to
+any signed-in hospital user, a patient's picture only to admins, the patient
+and the doctors treating them. Files are streamed with Range, ETag and
+conditional request support, or handed to the front-end server when
+``MEDIA_SENDFILE`` is ``'x-accel-redirect'`` (nginx, serving an ``internal``
+location at ``MEDIA_ACCEL_PREFIX``) or ``'x-sendfile'`` (Apache, lighttpd).
+"""
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from . import models
+from .views import is_admin, is_doctor, is_patient
+
+
+CHUNK_SIZE = 64*1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def can_view(user, name):
+    if not user.is_authenticated:
+        return False
+    if is_admin(user):
+        return True
+    if models.Doctor.objects.filter(profile_pic=name).exists():
+        return is_doctor(user) or is_patient(user)
+    patient=models.Patient.objects.filter(profile_pic=name).values('user_id', 'assignedDoctorId').first()
+    if patient is None:
+        return False
+    if is_patient(user):
+        return patient['user_id'] == user.id
+    if is_doctor(user):
+        return patient['assignedDoctorId'] == user.id or models.Appointment.objects.filter(
+            doctorId=user.id, patientId=patient['user_id']).exists()
+    return False
+
+
+def parse_range(header, size):
+    """
+    (start, end) inclusive for a single ``bytes=`` range, None to send the
+    whole file, or False when the range cannot be satisfied.
+    """
+    match=RANGE_RE.match(header.replace(' ', ''))
+    if not match or match.groups() == ('', ''):
+        #multiple or malformed ranges, the whole file is a valid answer
+        return None
+    first, last = match.groups()
+    if first:
+        start=int(first)
+        end=min(int(last), size-1) if last else size-1
+        if start > end:
+            return False
+    else:
+        suffix=int(last)
+        if not suffix:
+            return False
+        start, end = max(size-suffix, 0), size-1
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk=f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length-=len(chunk)
+            yield chunk
+
+
+def offload(name, path):
+    mode=getattr(settings, 'MEDIA_SENDFILE', '')
+    response=HttpResponse()
+    if mode == 'x-accel-redirect':
+        #nginx answers Range and conditional headers itself
+        response['X-Accel-Redirect']=settings.MEDIA_ACCEL_PREFIX+name
+    elif mode == 'x-sendfile':
+        response['X-Sendfile']=path
+    else:
+        return None
+    #let the front-end server fill in the type from the file
+    del response['Content-Type']
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    name=path.replace('\\', '/')
+    try:
+        full_path=safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not can_view(request.user, name):
+        if not request.user.is_authenticated:
+            raise Http404
+        return HttpResponseForbidden()
+    try:
+        stat=os.stat(full_path)
+    except OSError:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    response=offload(name, full_path)
+    if response is not None:
+        response['Cache-Control']='private, max-age=3600'
+        return response
+
+    size=stat.st_size
+    etag='"%x-%x"' % (int(stat.st_mtime), size)
+    last_modified=int(stat.st_mtime)
+    response=get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        byte_range=None
+        range_header=request.META.get('HTTP_RANGE')
+        if_range=request.META.get('HTTP_IF_RANGE', '').strip()
+        if range_header and (not if_range or if_range == etag or parse_http_date_safe(if_range) == last_modified):
+            byte_range=parse_range(range_header, size)
+        if byte_range is False:
+            response=HttpResponse(status=416)
+            response['Content-Range']='bytes */%d' % size
+        elif byte_range:
+            start, end = byte_range
+            response=StreamingHttpResponse(read_range(full_path, start, end-start+1), status=206)
+            response['Content-Range']='bytes %d-%d/%d' % (start, end, size)
+            response['Content-Length']=end-start+1
+        elif request.method == 'HEAD':
+            response=HttpResponse()
+            response['Content-Length']=size
+        else:
+            #wsgi.file_wrapper lets the server use sendfile() for the body
+            response=FileResponse(open(full_path, 'rb'))
+        content_type, _ = mimetypes.guess_type(full_path)
+        if response.status_code != 416:
+            response['Content-Type']=content_type or 'application/octet-stream'
+    response['Accept-Ranges']='bytes'
+    response['ETag']=etag
+    response['Last-Modified']=http_date(last_modified)
+    response['Cache-Control']='private, max-age=3600'
+    return response
@@ -0,0 +1,338 @@
+"""
+Prometheus metrics without a client library.
+
+Each process keeps its histograms and counters in memory (one uncontended
+lock per update) and, at most every ``METRICS_WRITE_INTERVAL`` seconds after a
+response has gone out, writes them to ``METRICS_DIR/<pid>-<random>.json``.
+The random part keeps a later worker that gets a reused pid from overwriting a
+dead one's numbers. ``/metrics`` sums every file, so any gunicorn worker can
+answer the scrape. Each process holds an ``flock`` on a matching ``.lock``
+file while it lives; a scrape folds the files of processes whose lock is free
+into ``archive.json``, so counters never go backwards and the directory does
+not grow with every restart. Clear ``METRICS_DIR`` on deploy.
+
+What is measured:
+
+* request latency per URL name (``MetricsMiddleware``),
+* every database query, labelled with the URL name it ran under,
+* template rendering (``InstrumentedDjangoTemplates``), ``render_to_pdf``,
+* password hashing and checking (``hospital.hashers``),
+* cache lookups by result, for hit ratios (directory cache, ETag revalidation),
+* requests shed by admission control (``hospital.admission``),
+* views cut short by a statement timeout (``hospital.timeouts``).
+"""
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import DjangoTemplates
+from django.utils.crypto import constant_time_compare
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+#name -> (help, label names)
+HISTOGRAMS = {
+    'hospital_request_duration_seconds': ('Request latency by URL name', ('view', 'method')),
+    'hospital_db_query_duration_seconds': ('Database query time by URL name', ('view',)),
+    'hospital_template_render_seconds': ('Template render time', ('template',)),
+    'hospital_pdf_render_seconds': ('render_to_pdf duration', ()),
+    'hospital_password_hash_seconds': ('Password hashing time', ('operation',)),
+}
+COUNTERS = {
+    'hospital_cache_requests_total': ('Cache lookups by cache and result (hit/miss)', ('cache', 'result')),
+    'hospital_requests_shed_total': ('Requests turned away by admission control, by role', ('role',)),
+    'hospital_statement_timeouts_total': ('Views ended by a database statement timeout, by URL name', ('view',)),
+}
+
+_lock = threading.Lock()
+#(name, label values) -> [count per bucket..., +Inf count, sum]
+_histograms = {}
+#(name, label values) -> value
+_counters = {}
+_last_write = [0.0]
+#pid, directory, file name without extension, fd of the held .lock file
+_process = {'pid': None, 'dir': None, 'name': None, 'lock': None}
+
+ARCHIVE = 'archive'
+
+
+def observe(name, seconds, labels=()):
+    index=bisect.bisect_left(BUCKETS, seconds)
+    key=(name, labels)
+    with _lock:
+        values=_histograms.get(key)
+        if values is None:
+            values=_histograms[key]=[0]*(len(BUCKETS)+2)
+        values[index]+=1
+        values[-1]+=seconds
+
+
+def inc(name, labels=(), amount=1):
+    key=(name, labels)
+    with _lock:
+        _counters[key]=_counters.get(key, 0)+amount
+
+
+def cache_lookup(cache, hit):
+    inc('hospital_cache_requests_total', (cache, 'hit' if hit else 'miss'))
+
+
+def timed(name, labels=()):
+    def decorator(func):
+        @wraps(func)
+        def wrapped(*args, **kwargs):
+            started=time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, time.perf_counter()-started, labels)
+        return wrapped
+    return decorator
+
+
+#---------PER-PROCESS FILES
+def snapshot():
+    with _lock:
+        return {
+            'histograms': [[name, list(labels), list(values)] for (name, labels), values in _histograms.items()],
+            'counters': [[name, list(labels), value] for (name, labels), value in _counters.items()],
+        }
+
+
+def process_name():
+    pid=os.getpid()
+    directory=settings.METRICS_DIR
+    if _process['pid'] != pid or _process['dir'] != directory:
+        os.makedirs(directory, exist_ok=True)
+        #closing a forked child's copy leaves the parent's lock held
+        if _process['lock'] is not None:
+            os.close(_process['lock'])
+        name='%d-%s' % (pid, uuid.uuid4().hex[:12])
+        lock=None
+        if fcntl is not None:
+            #locked before it gets its name, so a scrape never sees it free
+            path=os.path.join(directory, name+'.lock')
+            lock=os.open(path+'.tmp', os.O_CREAT | os.O_RDWR, 0o644)
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            os.replace(path+'.tmp', path)
+        _process.update(pid=pid, dir=directory, name=name, lock=lock)
+    return _process['name']
+
+
+def write_file(name, data):
+    path=os.path.join(settings.METRICS_DIR, name+'.json')
+    #rename is atomic, a scrape never reads half a file
+    with open(path+'.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(path+'.tmp', path)
+
+
+def read_file(name):
+    try:
+        with open(os.path.join(settings.METRICS_DIR, name+'.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write():
+    if not settings.METRICS_ENABLE:
+        return
+    write_file(process_name(), snapshot())
+    _last_write[0]=time.monotonic()
+
+
+def write_if_due():
+    if time.monotonic()-_last_write[0] >= settings.METRICS_WRITE_INTERVAL:
+        write()
+
+
+def reset():
+    #a forked worker starts from zero, its parent's numbers are in the parent's file
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+atexit.register(write)
+
+
+def add(histograms, counters, data):
+    for metric, labels, values in data['histograms']:
+        total=histograms.setdefault((metric, tuple(labels)), [0]*len(values))
+        for i, value in enumerate(values):
+            total[i]+=value
+    for metric, labels, value in data['counters']:
+        key=(metric, tuple(labels))
+        counters[key]=counters.get(key, 0)+value
+
+
+def is_dead(name):
+    try:
+        fd=os.open(os.path.join(settings.METRICS_DIR, name+'.lock'), os.O_RDWR)
+    except OSError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+    finally:
+        os.close(fd)
+
+
+def fold_dead():
+    """Add the files of exited processes to ``archive.json`` and remove them."""
+    if fcntl is None:
+        return
+    directory=settings.METRICS_DIR
+    with open(os.path.join(directory, ARCHIVE+'.lock'), 'a') as guard:
+        fcntl.flock(guard, fcntl.LOCK_EX)
+        names={n[:-len('.lock')] for n in os.listdir(directory) if n.endswith('.lock')}-{ARCHIVE}
+        dead=[name for name in sorted(names) if is_dead(name)]
+        if not dead:
+            return
+        archive=read_file(ARCHIVE) or {'histograms': [], 'counters': [], 'folded': []}
+        #names already in the archive, left behind by a fold that stopped half way
+        folded=set(archive['folded'])
+        histograms, counters = {}, {}
+        add(histograms, counters, archive)
+        for name in dead:
+            data=read_file(name)
+            if data is not None and name not in folded:
+                add(histograms, counters, data)
+        write_file(ARCHIVE, {
+            'histograms': [[name, list(labels), values] for (name, labels), values in histograms.items()],
+            'counters': [[name, list(labels), value] for (name, labels), value in counters.items()],
+            'folded': dead,
+        })
+        for name in dead:
+            for extension in ('.json', '.lock'):
+                try:
+                    os.remove(os.path.join(directory, name+extension))
+                except FileNotFoundError:
+                    pass
+
+
+def aggregate():
+    write()
+    histograms, counters = {}, {}
+    try:
+        fold_dead()
+        names=os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        #nothing written yet, or METRICS_ENABLE is off
+        return histograms, counters
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        data=read_file(name[:-len('.json')])
+        if data is not None:
+            add(histograms, counters, data)
+    return histograms, counters
+
+
+def format_labels(names, values, extra=()):
+    pairs=list(zip(names, values))+list(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"')) for k, v in pairs)
+
+
+def render_metrics():
+    histograms, counters = aggregate()
+    lines=[]
+    for name, (help_text, label_names) in HISTOGRAMS.items():
+        lines.append('# HELP %s %s' % (name, help_text))
+        lines.append('# TYPE %s histogram' % name)
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative=0
+            for bound, count in zip(BUCKETS+('+Inf',), values[:-1]):
+                cumulative+=count
+                lines.append('%s_bucket%s %d' % (name, format_labels(label_names, labels, [('le', bound)]), cumulative))
+            lines.append('%s_sum%s %r' % (name, format_labels(label_names, labels), values[-1]))
+            lines.append('%s_count%s %d' % (name, format_labels(label_names, labels), cumulative))
+    for name, (help_text, label_names) in COUNTERS.items():
+        lines.append('# HELP %s %s' % (name, help_text))
+        lines.append('# TYPE %s counter' % name)
+        for (metric, labels), value in sorted(counters.items()):
+            if metric == name:
+                lines.append('%s%s %d' % (name, format_labels(label_names, labels), value))
+    return '\n'.join(lines)+'\n'
+
+
+def metrics_view(request):
+    token=settings.METRICS_TOKEN
+    #closed unless a token is configured
+    if not token or not constant_time_compare(request.META.get('HTTP_AUTHORIZATION', ''), 'Bearer '+token):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+#---------COLLECTION
+def view_label(request):
+    match=request.resolver_match
+    if match is None:
+        return 'unresolved'
+    return match.url_name or match.route
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.METRICS_ENABLE:
+            return self.get_response(request)
+
+        def time_query(execute, sql, params, many, context):
+            started=time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                observe('hospital_db_query_duration_seconds', time.perf_counter()-started, (view_label(request),))
+
+        started=time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(time_query))
+            response=self.get_response(request)
+        observe('hospital_request_duration_seconds', time.perf_counter()-started, (view_label(request), request.method))
+        return response
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template=template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        started=time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            observe('hospital_template_render_seconds', time.perf_counter()-started, (self.template.origin.template_name,))
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
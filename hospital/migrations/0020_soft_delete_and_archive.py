@@ -0,0 +1,88 @@
+# Generated by Django 3.0.5 on 2026-10-19 09:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0019_modification_timestamps'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAppointment',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('originalId', models.PositiveIntegerField()),
+                ('patientId', models.PositiveIntegerField(null=True)),
+                ('doctorId', models.PositiveIntegerField(null=True)),
+                ('patientName', models.CharField(max_length=40, null=True)),
+                ('doctorName', models.CharField(max_length=40, null=True)),
+                ('appointmentDate', models.DateField()),
+                ('description', models.TextField(max_length=500)),
+                ('status', models.BooleanField(default=False)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedDoctor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('originalId', models.PositiveIntegerField()),
+                ('userId', models.PositiveIntegerField()),
+                ('username', models.CharField(max_length=150)),
+                ('name', models.CharField(max_length=300)),
+                ('address', models.CharField(max_length=40)),
+                ('mobile', models.CharField(max_length=20, null=True)),
+                ('department', models.CharField(max_length=50)),
+                ('deleted_at', models.DateTimeField(null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedPatient',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('originalId', models.PositiveIntegerField()),
+                ('userId', models.PositiveIntegerField()),
+                ('username', models.CharField(max_length=150)),
+                ('name', models.CharField(max_length=300)),
+                ('address', models.CharField(max_length=40)),
+                ('mobile', models.CharField(max_length=20)),
+                ('symptoms', models.CharField(max_length=100)),
+                ('assignedDoctorId', models.PositiveIntegerField(null=True)),
+                ('admitDate', models.DateField()),
+                ('deleted_at', models.DateTimeField(null=True)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='doctor',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='patient',
+            name='is_deleted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='doctor',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['status'], name='doctor_active_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(condition=models.Q(is_deleted=False), fields=['status'], name='patient_active_status_idx'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+from hospital import partitions
+
+
+def partition_tables(apps, schema_editor):
+    conn = schema_editor.connection
+    if not partitions.is_supported(conn):
+        return
+    for table, column in partitions.PARTITIONED_TABLES.items():
+        partitions.partition_table(table, column, conn)
+    partitions.backfill_partitions(conn)
+    partitions.ensure_future_partitions(3, conn=conn)
+
+
+def unpartition_tables(apps, schema_editor):
+    conn = schema_editor.connection
+    if not partitions.is_supported(conn):
+        return
+    for table, column in partitions.PARTITIONED_TABLES.items():
+        partitions.unpartition_table(table, column, conn)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0020_soft_delete_and_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_tables, unpartition_tables),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 3.0.5 on 2026-10-19 10:02
+
+from django.db import migrations, models
+
+
+#the database itself refuses to change or remove audit rows on PostgreSQL
+APPEND_ONLY_SQL = '''
+CREATE FUNCTION hospital_auditevent_append_only() RETURNS trigger AS $$
+BEGIN
+    RAISE EXCEPTION 'hospital_auditevent is append-only';
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER hospital_auditevent_append_only BEFORE UPDATE OR DELETE ON hospital_auditevent
+    FOR EACH ROW EXECUTE PROCEDURE hospital_auditevent_append_only();
+'''
+
+DROP_APPEND_ONLY_SQL = '''
+DROP TRIGGER hospital_auditevent_append_only ON hospital_auditevent;
+DROP FUNCTION hospital_auditevent_append_only();
+'''
+
+
+def add_append_only_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(APPEND_ONLY_SQL)
+
+
+def drop_append_only_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_APPEND_ONLY_SQL)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0021_partition_appointment_and_discharge'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actorId', models.PositiveIntegerField(null=True)),
+                ('actorName', models.CharField(blank=True, max_length=150)),
+                ('action', models.CharField(max_length=20)),
+                ('targetType', models.CharField(max_length=40)),
+                ('targetId', models.PositiveIntegerField()),
+                ('detail', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['actorId', 'created_at'], name='audit_actor_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['targetType', 'targetId', 'created_at'], name='audit_target_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditevent',
+            index=models.Index(fields=['created_at'], name='audit_time_idx'),
+        ),
+        migrations.RunPython(add_append_only_trigger, drop_append_only_trigger),
+    ]
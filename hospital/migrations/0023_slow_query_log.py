@@ -0,0 +1,26 @@
+# Generated by Django 3.0.5 on 2026-10-19 10:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0022_audit_log'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SlowQuery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sql', models.TextField()),
+                ('duration_ms', models.FloatField()),
+                ('database', models.CharField(max_length=30)),
+                ('function', models.CharField(blank=True, max_length=100)),
+                ('call_site', models.CharField(blank=True, max_length=255)),
+                ('plan', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
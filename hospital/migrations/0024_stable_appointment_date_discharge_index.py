@@ -0,0 +1,22 @@
+# Generated by Django 3.0.5 on 2026-10-19 10:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospital', '0023_slow_query_log'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='appointmentDate',
+            field=models.DateField(auto_now_add=True),
+        ),
+        migrations.AddIndex(
+            model_name='patientdischargedetails',
+            index=models.Index(fields=['patientId', 'releaseDate', 'id'], name='discharge_patient_release_idx'),
+        ),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.db.models import Value
+from django.db.models.functions import Concat
 
 
 
@@ -10,6 +13,29 @@ departments=[('Cardiologist','Cardiologist'),
 ('Anesthesiologists','Anesthesiologists'),
 ('Colon and Rectal Surgeons','Colon and Rectal Surgeons')
 ]
+class ProfileQuerySet(models.QuerySet):
+    def rows(self,*fields):
+        """
+        One dict per row holding only ``fields``, plus ``get_name`` joined in
+        SQL and, when ``profile_pic`` is asked for, its URL as ``thumbnail``.
+        For list pages: one query and no model instances, however many rows.
+        """
+        rows=self.values(*fields,get_name=Concat('user__first_name',Value(' '),'user__last_name',output_field=models.CharField()))
+        if 'profile_pic' not in fields:
+            return list(rows)
+        result=[]
+        for row in rows:
+            row['thumbnail']=default_storage.url(row['profile_pic']) if row['profile_pic'] else ''
+            result.append(row)
+        return result
+
+
+#default manager hides soft-deleted doctors/patients, all_objects sees everything
+class ActiveManager(models.Manager.from_queryset(ProfileQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().filter(is_deleted=False)
+
+
 class Doctor(models.Model):
     user=models.OneToOneField(User,on_delete=models.CASCADE)
     profile_pic= models.ImageField(upload_to='profile_pic/DoctorProfilePic/',null=True,blank=True)
@@ -17,6 +43,13 @@ class Doctor(models.Model):
     mobile = models.CharField(max_length=20,null=True)
     department= models.CharField(max_length=50,choices=departments,default='Cardiologist')
     status=models.BooleanField(default=False)
+    updated_at=models.DateTimeField(auto_now=True)
+    is_deleted=models.BooleanField(default=False)
+    deleted_at=models.DateTimeField(null=True,blank=True)
+    objects=ActiveManager()
+    all_objects=models.Manager()
+    class Meta:
+        indexes=[models.Index(fields=['status'],name='doctor_active_status_idx',condition=models.Q(is_deleted=False))]
     @property
     def get_name(self):
         return self.user.first_name+" "+self.user.last_name
@@ -37,6 +70,16 @@ class Patient(models.Model):
     assignedDoctorId = models.PositiveIntegerField(null=True)
     admitDate=models.DateField(auto_now=True)
     status=models.BooleanField(default=False)
+    updated_at=models.DateTimeField(auto_now=True)
+    is_deleted=models.BooleanField(default=False)
+    deleted_at=models.DateTimeField(null=True,blank=True)
+    objects=ActiveManager()
+    all_objects=models.Manager()
+    class Meta:
+        indexes=[
+            models.Index(fields=['assignedDoctorId','status'],name='patient_doctor_status_idx'),
+            models.Index(fields=['status'],name='patient_active_status_idx',condition=models.Q(is_deleted=False)),
+        ]
     @property
     def get_name(self):
         return self.user.first_name+" "+self.user.last_name
@@ -47,14 +90,26 @@ class Patient(models.Model):
         return self.user.first_name+" ("+self.symptoms+")"
 
 
+#on PostgreSQL discharges are range partitioned by releaseDate (see partitions.py)
+class DischargeQuerySet(models.QuerySet):
+    def latest_for_patient(self,patientId):
+        #one query on discharge_patient_release_idx; it has no date bound, so
+        #every partition's index is probed
+        return list(self.filter(patientId=patientId).order_by('-releaseDate','-id')[:1])
+
+
 class Appointment(models.Model):
     patientId=models.PositiveIntegerField(null=True)
     doctorId=models.PositiveIntegerField(null=True)
     patientName=models.CharField(max_length=40,null=True)
     doctorName=models.CharField(max_length=40,null=True)
-    appointmentDate=models.DateField(auto_now=True)
+    #the booking date, never changed afterwards: it is the partition key
+    appointmentDate=models.DateField(auto_now_add=True)
     description=models.TextField(max_length=500)
     status=models.BooleanField(default=False)
+    updated_at=models.DateTimeField(auto_now=True)
+    class Meta:
+        indexes=[models.Index(fields=['doctorId','status'],name='appointment_doctor_status_idx')]
 
 
 
@@ -75,6 +130,112 @@ class PatientDischargeDetails(models.Model):
     doctorFee=models.PositiveIntegerField(null=False)
     OtherCharge=models.PositiveIntegerField(null=False)
     total=models.PositiveIntegerField(null=False)
+    updated_at=models.DateTimeField(auto_now=True)
+    objects=DischargeQuerySet.as_manager()
+    class Meta:
+        indexes=[models.Index(fields=['patientId','releaseDate','id'],name='discharge_patient_release_idx')]
+
+
+
+#---------ARCHIVE TABLES, FILLED BY THE archive_deleted COMMAND
+#plain copies keyed by the original ids, nothing here points back at live rows
+class ArchivedDoctor(models.Model):
+    originalId=models.PositiveIntegerField()
+    userId=models.PositiveIntegerField()
+    username=models.CharField(max_length=150)
+    name=models.CharField(max_length=300)
+    address = models.CharField(max_length=40)
+    mobile = models.CharField(max_length=20,null=True)
+    department= models.CharField(max_length=50)
+    deleted_at=models.DateTimeField(null=True)
+    archived_at=models.DateTimeField(auto_now_add=True)
+
+
+class ArchivedPatient(models.Model):
+    originalId=models.PositiveIntegerField()
+    userId=models.PositiveIntegerField()
+    username=models.CharField(max_length=150)
+    name=models.CharField(max_length=300)
+    address = models.CharField(max_length=40)
+    mobile = models.CharField(max_length=20)
+    symptoms = models.CharField(max_length=100)
+    assignedDoctorId = models.PositiveIntegerField(null=True)
+    admitDate=models.DateField()
+    deleted_at=models.DateTimeField(null=True)
+    archived_at=models.DateTimeField(auto_now_add=True)
+
+
+class ArchivedAppointment(models.Model):
+    originalId=models.PositiveIntegerField()
+    patientId=models.PositiveIntegerField(null=True)
+    doctorId=models.PositiveIntegerField(null=True)
+    patientName=models.CharField(max_length=40,null=True)
+    doctorName=models.CharField(max_length=40,null=True)
+    appointmentDate=models.DateField()
+    description=models.TextField(max_length=500)
+    status=models.BooleanField(default=False)
+    archived_at=models.DateTimeField(auto_now_add=True)
+
+
+#---------AUDIT LOG, WRITTEN IN BATCHES BY hospital.audit
+#append-only: rows are only ever inserted, never updated or deleted
+class AuditQuerySet(models.QuerySet):
+    def by_actor(self,actorId):
+        return self.filter(actorId=actorId)
+
+    def for_target(self,targetType,targetId):
+        return self.filter(targetType=targetType,targetId=targetId)
+
+    def between(self,start,end):
+        return self.filter(created_at__gte=start,created_at__lt=end)
+
+    def update(self,**kwargs):
+        raise TypeError('The audit log is append-only')
+
+    def delete(self):
+        raise TypeError('The audit log is append-only')
+
+
+class AuditEvent(models.Model):
+    actorId=models.PositiveIntegerField(null=True)
+    actorName=models.CharField(max_length=150,blank=True)
+    action=models.CharField(max_length=20)
+    targetType=models.CharField(max_length=40)
+    targetId=models.PositiveIntegerField()
+    detail=models.CharField(max_length=255,blank=True)
+    created_at=models.DateTimeField()
+    objects=AuditQuerySet.as_manager()
+    class Meta:
+        indexes=[
+            models.Index(fields=['actorId','created_at'],name='audit_actor_time_idx'),
+            models.Index(fields=['targetType','targetId','created_at'],name='audit_target_time_idx'),
+            models.Index(fields=['created_at'],name='audit_time_idx'),
+        ]
+
+    def save(self,*args,**kwargs):
+        if not self._state.adding:
+            raise TypeError('The audit log is append-only')
+        super().save(*args,**kwargs)
+
+    def delete(self,*args,**kwargs):
+        raise TypeError('The audit log is append-only')
+
+    def __str__(self):
+        return '%s %s %s#%s' % (self.actorName or '-',self.action,self.targetType,self.targetId)
+
+
+#---------SLOW QUERY LOG, FILLED BY hospital.slowqueries, newest SLOW_QUERY_KEEP rows only
+class SlowQuery(models.Model):
+    sql=models.TextField()
+    duration_ms=models.FloatField()
+    database=models.CharField(max_length=30)
+    function=models.CharField(max_length=100,blank=True)
+    call_site=models.CharField(max_length=255,blank=True)
+    plan=models.TextField(blank=True)
+    created_at=models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return '%.1f ms %s' % (self.duration_ms,self.call_site)
 
 
 #Developed By : sumit kumar
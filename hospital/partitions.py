@@ -0,0 +1,163 @@
+"""
+Monthly range partitioning of the appointment and discharge tables on PostgreSQL.
+
+``Appointment`` is partitioned by ``appointmentDate`` (the booking date, set
+once, so updates never move a row between partitions) and
+``PatientDischargeDetails`` by ``releaseDate``. No view filters on either
+date, so queries are not pruned to a few partitions; what partitioning gives
+is small per-month indexes and old months that can be detached. Each table
+has a DEFAULT partition catching rows outside the monthly ones; creating a
+month moves its rows out of the default partition first, so it is safe on a
+live table.
+Every function here is a no-op on other database vendors, which keeps SQLite
+development mode unpartitioned.
+"""
+from datetime import date
+
+from django.db import connection, transaction
+
+
+#table -> partition key column
+PARTITIONED_TABLES = {
+    'hospital_appointment': 'appointmentDate',
+    'hospital_patientdischargedetails': 'releaseDate',
+}
+
+
+def is_supported(conn=connection):
+    return conn.vendor == 'postgresql'
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    index=day.year*12+day.month-1+months
+    return date(index//12, index%12+1, 1)
+
+
+def partition_name(table, month):
+    return '%s_p%04d_%02d' % (table, month.year, month.month)
+
+
+def partition_table(table, column, conn=connection):
+    """
+    Turn an ordinary table into a range partitioned one with a DEFAULT
+    partition. The primary key becomes (id, column) as PostgreSQL requires.
+    """
+    old=table+'_unpartitioned'
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT indexdef, indexname FROM pg_indexes WHERE tablename = %s AND indexname NOT LIKE %s',
+                       [table, '%_pkey'])
+        indexes=cursor.fetchall()
+        cursor.execute('ALTER TABLE "%s" RENAME TO "%s"' % (table, old))
+        cursor.execute('ALTER TABLE "%s" RENAME CONSTRAINT "%s_pkey" TO "%s_pkey"' % (old, table, old))
+        for _, indexname in indexes:
+            cursor.execute('DROP INDEX "%s"' % indexname)
+        cursor.execute('CREATE TABLE "%s" (LIKE "%s" INCLUDING DEFAULTS) PARTITION BY RANGE ("%s")' % (table, old, column))
+        cursor.execute('ALTER TABLE "%s" ADD PRIMARY KEY ("id", "%s")' % (table, column))
+        cursor.execute('CREATE TABLE "%s_default" PARTITION OF "%s" DEFAULT' % (table, table))
+        cursor.execute('INSERT INTO "%s" SELECT * FROM "%s"' % (table, old))
+        cursor.execute('ALTER SEQUENCE "%s_id_seq" OWNED BY "%s"."id"' % (table, table))
+        cursor.execute('DROP TABLE "%s"' % old)
+        for indexdef, _ in indexes:
+            cursor.execute(indexdef.replace('ON ONLY', 'ON'))
+
+
+def unpartition_table(table, column, conn=connection):
+    old=table+'_partitioned'
+    with conn.cursor() as cursor:
+        cursor.execute('SELECT indexdef, indexname FROM pg_indexes WHERE tablename = %s AND indexname NOT LIKE %s',
+                       [table, '%_pkey'])
+        indexes=cursor.fetchall()
+        cursor.execute('ALTER TABLE "%s" RENAME TO "%s"' % (table, old))
+        cursor.execute('ALTER TABLE "%s" RENAME CONSTRAINT "%s_pkey" TO "%s_pkey"' % (old, table, old))
+        for _, indexname in indexes:
+            cursor.execute('DROP INDEX "%s"' % indexname)
+        cursor.execute('CREATE TABLE "%s" (LIKE "%s" INCLUDING DEFAULTS)' % (table, old))
+        cursor.execute('ALTER TABLE "%s" ADD PRIMARY KEY ("id")' % table)
+        cursor.execute('INSERT INTO "%s" SELECT * FROM "%s"' % (table, old))
+        cursor.execute('ALTER SEQUENCE "%s_id_seq" OWNED BY "%s"."id"' % (table, table))
+        cursor.execute('DROP TABLE "%s" CASCADE' % old)
+        for indexdef, _ in indexes:
+            cursor.execute(indexdef.replace('ON ONLY', 'ON'))
+
+
+def attached_partitions(table, conn=connection):
+    with conn.cursor() as cursor:
+        cursor.execute(
+            'SELECT c.relname FROM pg_inherits i '
+            'JOIN pg_class c ON c.oid = i.inhrelid '
+            'JOIN pg_class p ON p.oid = i.inhparent '
+            'WHERE p.relname = %s', [table])
+        return {row[0] for row in cursor.fetchall()}
+
+
+def create_partition(table, column, month, conn=connection):
+    """
+    Create and attach the partition for ``month``, moving any rows for that
+    month out of the default partition. Returns False if it already exists.
+    """
+    name=partition_name(table, month)
+    if name in attached_partitions(table, conn):
+        return False
+    start, end = month, add_months(month, 1)
+    with transaction.atomic(using=conn.alias), conn.cursor() as cursor:
+        cursor.execute('CREATE TABLE "%s" (LIKE "%s" INCLUDING DEFAULTS)' % (name, table))
+        cursor.execute('INSERT INTO "%s" SELECT * FROM "%s_default" WHERE "%s" >= %%s AND "%s" < %%s'
+                       % (name, table, column, column), [start, end])
+        cursor.execute('DELETE FROM "%s_default" WHERE "%s" >= %%s AND "%s" < %%s'
+                       % (table, column, column), [start, end])
+        cursor.execute('ALTER TABLE "%s" ATTACH PARTITION "%s" FOR VALUES FROM (%%s) TO (%%s)'
+                       % (table, name), [start, end])
+    return True
+
+
+def ensure_future_partitions(months_ahead, today=None, conn=connection):
+    created=[]
+    if not is_supported(conn):
+        return created
+    first=month_start(today or date.today())
+    for table, column in PARTITIONED_TABLES.items():
+        for offset in range(months_ahead+1):
+            month=add_months(first, offset)
+            if create_partition(table, column, month, conn):
+                created.append(partition_name(table, month))
+    return created
+
+
+def backfill_partitions(conn=connection):
+    #give every month still sitting in the default partition its own partition
+    created=[]
+    if not is_supported(conn):
+        return created
+    for table, column in PARTITIONED_TABLES.items():
+        with conn.cursor() as cursor:
+            cursor.execute('SELECT DISTINCT date_trunc(\'month\', "%s")::date FROM "%s_default"' % (column, table))
+            months=sorted(row[0] for row in cursor.fetchall())
+        for month in months:
+            if create_partition(table, column, month, conn):
+                created.append(partition_name(table, month))
+    return created
+
+
+def detach_old_partitions(keep_months, today=None, conn=connection):
+    """
+    Detach monthly partitions that end before ``keep_months`` ago. Detached
+    tables keep their rows (for dumping or dropping) but leave every query.
+    """
+    detached=[]
+    if not is_supported(conn):
+        return detached
+    cutoff=add_months(month_start(today or date.today()), -keep_months)
+    for table in PARTITIONED_TABLES:
+        for name in sorted(attached_partitions(table, conn)):
+            if name == table+'_default':
+                continue
+            year, month = name[len(table)+2:].split('_')
+            if add_months(date(int(year), int(month), 1), 1) <= cutoff:
+                with conn.cursor() as cursor:
+                    cursor.execute('ALTER TABLE "%s" DETACH PARTITION "%s"' % (table, name))
+                detached.append(name)
+    return detached
@@ -0,0 +1,207 @@
+"""
+Opt-in request profiling for production.
+
+``ProfilingMiddleware`` profiles a ``PROFILE_SAMPLE_RATE`` fraction of
+requests, plus any request whose ``X-Profile-Token`` header holds a token from
+``manage.py profile_token``. ``PROFILE_MODE`` picks the profiler:
+
+* ``'cprofile'`` writes a ``.prof`` file (``python -m pstats``, snakeviz);
+* ``'sampler'`` samples the request thread's stack every
+  ``PROFILE_SAMPLE_INTERVAL`` seconds and writes collapsed stacks
+  (``.collapsed``, one ``frame;frame;frame count`` line per stack) for
+  flamegraph.pl or speedscope. Cheaper, and its timings are not skewed by
+  the instrumentation.
+
+Captures go to ``PROFILE_DIR`` next to a small JSON summary; only the newest
+``PROFILE_KEEP`` are kept. Admins list the slowest at ``/admin-profiles``.
+"""
+import cProfile
+import collections
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.core import signing
+from django.http import FileResponse, Http404
+from django.shortcuts import render
+
+from .views import is_admin
+
+
+TOKEN_HEADER = 'HTTP_X_PROFILE_TOKEN'
+TOKEN_SALT = 'hospital.profiling'
+EXTENSIONS = {'cprofile': '.prof', 'sampler': '.collapsed'}
+
+
+def make_token():
+    return signing.TimestampSigner(salt=TOKEN_SALT).sign('profile')
+
+
+def valid_token(token):
+    try:
+        signing.TimestampSigner(salt=TOKEN_SALT).unsign(token, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def wants_profile(request):
+    token=request.META.get(TOKEN_HEADER)
+    if token:
+        return valid_token(token)
+    rate=settings.PROFILE_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+#---------PROFILERS
+class StackSampler:
+    def __init__(self, interval):
+        self.interval=interval
+        self.thread_id=threading.get_ident()
+        self.stacks=collections.Counter()
+        self.stop_event=threading.Event()
+        self.thread=threading.Thread(target=self.run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            frame=sys._current_frames().get(self.thread_id)
+            stack=[]
+            while frame is not None:
+                code=frame.f_code
+                stack.append('%s (%s:%d)' % (code.co_name, code.co_filename, code.co_firstlineno))
+                frame=frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))]+=1
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write('%s %d\n' % (stack, count))
+
+
+class CProfiler:
+    def __init__(self):
+        self.profile=cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def write(self, path):
+        self.profile.dump_stats(path)
+
+
+def make_profiler(mode):
+    if mode == 'sampler':
+        return StackSampler(settings.PROFILE_SAMPLE_INTERVAL)
+    return CProfiler()
+
+
+#---------THE ON-DISK RING
+def profile_dir():
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    return settings.PROFILE_DIR
+
+
+def save_capture(profiler, summary):
+    directory=profile_dir()
+    #time first, so names sort oldest to newest
+    capture_id='%d-%d-%d' % (time.time()*1000, os.getpid(), threading.get_ident() % 100000)
+    summary.update(id=capture_id, file=capture_id+EXTENSIONS[summary['mode']])
+    profiler.write(os.path.join(directory, summary['file']))
+    with open(os.path.join(directory, capture_id+'.json'), 'w') as f:
+        json.dump(summary, f)
+    prune(directory)
+
+
+def prune(directory):
+    summaries=sorted(name for name in os.listdir(directory) if name.endswith('.json'))
+    for name in summaries[:max(0, len(summaries)-settings.PROFILE_KEEP)]:
+        capture_id=name[:-len('.json')]
+        for extension in ('.json',)+tuple(EXTENSIONS.values()):
+            try:
+                os.remove(os.path.join(directory, capture_id+extension))
+            except FileNotFoundError:
+                pass
+
+
+def captures():
+    directory=profile_dir()
+    result=[]
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                result.append(json.load(f))
+        except (OSError, ValueError):
+            #pruned or still being written by another worker
+            continue
+    return result
+
+
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not wants_profile(request):
+            return self.get_response(request)
+        mode=settings.PROFILE_MODE
+        profiler=make_profiler(mode)
+        started=time.perf_counter()
+        try:
+            profiler.start()
+        except ValueError:
+            #another thread of this worker is being profiled by cProfile
+            return self.get_response(request)
+        try:
+            response=self.get_response(request)
+        finally:
+            profiler.stop()
+        duration=time.perf_counter()-started
+        match=request.resolver_match
+        save_capture(profiler, {
+            'mode': mode,
+            'path': request.path,
+            'view': match.view_name if match else '',
+            'method': request.method,
+            'status': response.status_code,
+            'duration_ms': round(duration*1000, 2),
+            'user_id': request.user.id if hasattr(request, 'user') and request.user.is_authenticated else None,
+            'time': time.time(),
+        })
+        return response
+
+
+#---------ADMIN PAGES
+@login_required(login_url='adminlogin')
+@user_passes_test(is_admin)
+def admin_profiles_view(request):
+    slowest=sorted(captures(), key=lambda c: c['duration_ms'], reverse=True)[:100]
+    return render(request, 'hospital/admin_profiles.html', {'captures': slowest})
+
+
+@login_required(login_url='adminlogin')
+@user_passes_test(is_admin)
+def admin_profile_download_view(request, capture_id):
+    for capture in captures():
+        if capture['id'] == capture_id:
+            path=os.path.join(profile_dir(), capture['file'])
+            if os.path.exists(path):
+                return FileResponse(open(path, 'rb'), as_attachment=True, filename=capture['file'])
+    raise Http404
@@ -0,0 +1,203 @@
+"""
+Token-bucket rate limiting for the login, signup, search and contact views.
+
+Each policy in ``RATE_LIMITS`` gives a refill rate (``'10/m'``), a bucket
+size (``burst``), the methods it counts and what it is keyed by: ``'ip'``
+(``REMOTE_ADDR``, or the ``RATELIMIT_IP_META`` key behind a proxy) and/or
+``'user'`` (the signed-in user, or the username being tried on a login
+form). A request needs a token from every bucket it maps to; when one is
+empty it gets a 429 with ``Retry-After`` and the tokens it already took from
+the others are given back, so refused guesses at one account do not also
+use up the address's allowance.
+
+A bucket is stored as a single timestamp, the time it will be full again
+(the GCRA form of a token bucket), so a check is one read and one write
+under a thread lock. ``LocalBackend`` keeps them in process memory and is the
+default. With ``WEB_CONCURRENCY`` worker processes each one refills at
+``rate/WEB_CONCURRENCY`` and holds ``burst/WEB_CONCURRENCY`` tokens (at least
+one), so together they admit about the configured rate while a check stays a
+dictionary lookup.
+
+``CacheBackend`` is for several hosts behind one balancer: it counts requests
+per fixed window of ``burst`` tokens in the ``RATELIMIT_CACHE`` cache with
+``add`` and ``incr``, which are atomic on memcached. Each check is a round
+trip to the cache.
+"""
+import math
+import os
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.module_loading import import_string
+
+
+UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+class Policy:
+    def __init__(self, name, rate, burst, methods=('GET', 'POST'), keys=('ip',)):
+        count, _, unit = rate.partition('/')
+        self.name=name
+        #seconds for one token to come back, and how far ahead a full bucket may run
+        self.interval=UNITS[unit]/float(count)
+        self.capacity=self.interval*burst
+        self.methods=frozenset(methods)
+        self.keys=tuple(keys)
+
+
+#---------BUCKET STORAGE
+class LocalBackend:
+    #past this many buckets, drop the ones that are full again anyway
+    max_entries = 10000
+
+    def __init__(self, workers=None):
+        self.lock=threading.Lock()
+        self.buckets={}
+        #this process's share of every policy
+        self.workers=workers or int(os.environ.get('WEB_CONCURRENCY') or 1)
+
+    def limits(self, policy):
+        interval=policy.interval*self.workers
+        return interval, max(policy.capacity, interval)
+
+    def take(self, key, policy, now):
+        """Take a token; return 0 or the seconds until one is available."""
+        interval, capacity = self.limits(policy)
+        with self.lock:
+            tat=max(self.buckets.get(key, now), now)+interval
+            wait=tat-now-capacity
+            if wait > 0:
+                return wait
+            if len(self.buckets) >= self.max_entries and key not in self.buckets:
+                self.prune(now)
+            self.buckets[key]=tat
+            return 0
+
+    def refund(self, key, policy, now):
+        interval, _ = self.limits(policy)
+        with self.lock:
+            if key in self.buckets:
+                self.buckets[key]=max(self.buckets[key]-interval, now)
+
+    def prune(self, now):
+        self.buckets={k: tat for k, tat in self.buckets.items() if tat > now}
+
+    def reset(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+class CacheBackend:
+    def __init__(self):
+        self.cache=caches[settings.RATELIMIT_CACHE]
+
+    def window(self, key, policy, now):
+        #burst tokens per window of burst*interval seconds
+        index=int(now//policy.capacity)
+        return 'ratelimit:%s:%d' % (key, index), (index+1)*policy.capacity-now
+
+    def take(self, key, policy, now):
+        key, remaining = self.window(key, policy, now)
+        self.cache.add(key, 0, timeout=math.ceil(remaining)+1)
+        try:
+            if self.cache.incr(key) <= round(policy.capacity/policy.interval):
+                return 0
+            #refused, so it took nothing
+            self.cache.decr(key)
+        except ValueError:
+            #expired between the calls, the window is over anyway
+            return 0
+        return remaining
+
+    def refund(self, key, policy, now):
+        key, _ = self.window(key, policy, now)
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            pass
+
+    def reset(self):
+        self.cache.clear()
+
+
+_state = {}
+
+
+def get_policy(name):
+    policies=_state.get('policies')
+    if policies is None:
+        policies=_state['policies']={name: Policy(name, **options) for name, options in settings.RATE_LIMITS.items()}
+    return policies[name]
+
+
+def get_backend():
+    backend=_state.get('backend')
+    if backend is None:
+        backend=_state['backend']=import_string(settings.RATELIMIT_BACKEND)()
+    return backend
+
+
+def reset():
+    if 'backend' in _state:
+        _state['backend'].reset()
+
+
+@receiver(setting_changed)
+def settings_changed(setting, **kwargs):
+    if setting in ('RATE_LIMITS', 'RATELIMIT_BACKEND', 'RATELIMIT_CACHE'):
+        _state.clear()
+
+
+#---------CHECKING REQUESTS
+def request_keys(request, policy):
+    for kind in policy.keys:
+        if kind == 'ip':
+            yield 'ip:'+request.META.get(settings.RATELIMIT_IP_META, '')
+        elif request.user.is_authenticated:
+            yield 'user:%d' % request.user.id
+        elif request.method == 'POST' and request.POST.get('username'):
+            #a login attempt, limit it per account whichever address it comes from
+            yield 'user:'+request.POST['username'].lower()
+
+
+def check(request, policy_name):
+    """Seconds the request must wait, or 0 if it may go ahead."""
+    policy=get_policy(policy_name)
+    if not settings.RATELIMIT_ENABLE or request.method not in policy.methods:
+        return 0
+    backend=get_backend()
+    now=time.monotonic() if isinstance(backend, LocalBackend) else time.time()
+    taken=[]
+    for key in request_keys(request, policy):
+        key=policy.name+':'+key
+        wait=backend.take(key, policy, now)
+        if wait:
+            for other in taken:
+                backend.refund(other, policy, now)
+            return wait
+        taken.append(key)
+    return 0
+
+
+def too_many_requests(wait):
+    response=HttpResponse('Too many requests, please try again later.', status=429, content_type='text/plain')
+    response['Retry-After']=max(1, math.ceil(wait))
+    return response
+
+
+def ratelimit(policy_name):
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            wait=check(request, policy_name)
+            if wait:
+                return too_many_requests(wait)
+            return view_func(request, *args, **kwargs)
+        return wrapped
+    return decorator
@@ -0,0 +1,112 @@
+"""
+Primary/replica database routing.
+
+``ReplicaRoutingMiddleware`` marks safe (GET/HEAD) requests as read-only and
+``PrimaryReplicaRouter`` sends their reads to ``settings.DATABASE_REPLICA_ALIAS``.
+Everything else - writes, unsafe requests, management commands - uses the
+primary. Reads go back to the primary:
+
+* for the rest of a request once it has written anything,
+* for ``REPLICA_STICKY_SECONDS`` after a user's write (read-your-writes),
+  remembered in a cookie so it works across workers,
+* while the replica lags more than ``REPLICA_MAX_LAG_SECONDS`` behind or
+  cannot be reached; the lag is checked at most every
+  ``REPLICA_LAG_CHECK_SECONDS`` per process.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+STICKY_COOKIE = 'hm_primary_until'
+
+#None outside requests, otherwise a dict for the current request
+_state = contextvars.ContextVar('hospital_replica_state', default=None)
+_lag_cache = {'checked': 0.0, 'healthy': False}
+
+
+def replica_alias():
+    return getattr(settings, 'DATABASE_REPLICA_ALIAS', None)
+
+
+def measure_lag(alias):
+    #seconds behind the primary, 0 for databases without streaming replication
+    connection=connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT CASE WHEN pg_is_in_recovery() '
+                       'THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) '
+                       'ELSE 0 END')
+        return float(cursor.fetchone()[0])
+
+
+def replica_healthy(alias):
+    now=time.monotonic()
+    if now - _lag_cache['checked'] >= settings.REPLICA_LAG_CHECK_SECONDS:
+        try:
+            healthy=measure_lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS
+        except DatabaseError:
+            healthy=False
+        _lag_cache.update(checked=now, healthy=healthy)
+    return _lag_cache['healthy']
+
+
+@contextmanager
+def read_from_replica():
+    """Route reads in this block to the replica (for commands and jobs)."""
+    token=_state.set({'read_only': True, 'wrote': False})
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state=_state.get()
+        alias=replica_alias()
+        if alias and state and state['read_only'] and not state['wrote'] and replica_healthy(alias):
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        state=_state.get()
+        if state is not None:
+            state['wrote']=True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        #both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Must come before SessionMiddleware so that session and user lookups are
+    routed too.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sticky_until=request.COOKIES.get(STICKY_COOKIE, '')
+        sticky=sticky_until.isdigit() and int(sticky_until) > time.time()
+        read_only=request.method in ('GET', 'HEAD') and not sticky
+        state={'read_only': read_only, 'wrote': False}
+        token=_state.set(state)
+        try:
+            response=self.get_response(request)
+        finally:
+            _state.reset(token)
+        if replica_alias() and (state['wrote'] or request.method not in ('GET', 'HEAD')):
+            seconds=settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(STICKY_COOKIE, str(int(time.time()) + seconds), max_age=seconds,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,92 @@
+"""
+Signed-cookie session backend with key rotation, plus the role data every
+session carries.
+
+The session lives entirely in the cookie, so loading it costs no query. It is
+signed with ``SESSION_SIGNING_KEY`` rather than ``SECRET_KEY``; to rotate, put
+the old key first in ``SESSION_SIGNING_FALLBACK_KEYS`` and set a new
+``SESSION_SIGNING_KEY``. Cookies signed with a fallback key still load and are
+re-signed with the current key on the same response.
+"""
+from django.conf import settings
+from django.contrib.sessions.backends import signed_cookies
+from django.core import signing
+
+
+SALT = 'django.contrib.sessions.backends.signed_cookies'
+
+ROLE_KEY = 'hospital_role'
+PROFILE_KEY = 'hospital_profile_id'
+
+
+class SessionStore(signed_cookies.SessionStore):
+    def load(self):
+        keys=[settings.SESSION_SIGNING_KEY]+list(settings.SESSION_SIGNING_FALLBACK_KEYS)
+        for i, key in enumerate(keys):
+            try:
+                data=signing.loads(self.session_key, key=key, salt=SALT, serializer=self.serializer,
+                                   max_age=self.get_session_cookie_age())
+            except Exception:
+                continue
+            if i:
+                #signed with an old key, send it back signed with the current one
+                self.modified=True
+            return data
+        self.create()
+        return {}
+
+    def _get_session_key(self):
+        return signing.dumps(self._session, key=settings.SESSION_SIGNING_KEY, compress=True,
+                             salt=SALT, serializer=self.serializer)
+
+
+#---------ROLE AND PROFILE ID STORED ON LOGIN, whatever the session backend
+def role_of(user):
+    names=set(user.groups.values_list('name', flat=True))
+    for role in ('ADMIN', 'DOCTOR', 'PATIENT'):
+        if role in names:
+            return role
+
+
+def remember_role(request, user):
+    from . import models
+    role=role_of(user)
+    profile_id=None
+    if role == 'DOCTOR':
+        profile_id=models.Doctor.objects.filter(user_id=user.id).values_list('id', flat=True).first()
+    elif role == 'PATIENT':
+        profile_id=models.Patient.objects.filter(user_id=user.id).values_list('id', flat=True).first()
+    request.session[ROLE_KEY]=role
+    request.session[PROFILE_KEY]=profile_id
+    return role
+
+
+def own_profile(request, model):
+    """The logged-in doctor's or patient's profile, by the id stored at login."""
+    profile_id=request.session.get(PROFILE_KEY)
+    if profile_id is not None and getattr(request.user, 'hospital_role', None) == model.__name__.upper():
+        return model.objects.get(id=profile_id)
+    return model.objects.get(user_id=request.user.id)
+
+
+class SessionRoleMiddleware:
+    """
+    Copy the role stored in the session onto ``request.user`` so the
+    ``is_admin``/``is_doctor``/``is_patient`` checks skip their group query.
+    Goes after AuthenticationMiddleware. Roles are fixed at signup, a changed
+    group membership shows up on the next login. Sessions from before roles
+    were stored get theirs looked up and saved on their first request.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.user.is_authenticated:
+            if ROLE_KEY in request.session:
+                role=request.session[ROLE_KEY]
+            else:
+                #logged in before roles were stored, look it up once
+                role=remember_role(request, request.user)
+            if role:
+                request.user.hospital_role=role
+        return self.get_response(request)
@@ -0,0 +1,76 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
+from django.core.signals import request_finished
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import audit, metrics, models, slowqueries
+from .directory import invalidate_directory
+from .events import queue_changed
+from .sessions import remember_role
+
+
+#---------DOCTOR DIRECTORY CACHE INVALIDATION
+@receiver(post_save, sender=models.Doctor)
+@receiver(post_delete, sender=models.Doctor)
+def doctor_changed(sender, **kwargs):
+    invalidate_directory()
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, update_fields=None, **kwargs):
+    #every login saves last_login, which never shows up in the directory
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_directory()
+
+
+#---------ROLE AND PROFILE ID KEPT IN THE SESSION
+@receiver(user_logged_in)
+def user_logged_in_handler(sender, request, user, **kwargs):
+    remember_role(request, user)
+
+
+#---------APPROVAL QUEUE EVENTS
+@receiver(post_save, sender=models.Doctor)
+@receiver(post_save, sender=models.Patient)
+@receiver(post_save, sender=models.Appointment)
+def queue_entry_saved(sender, instance, created, **kwargs):
+    queue_changed(instance if created and not instance.status else None)
+
+
+@receiver(post_delete, sender=models.Doctor)
+@receiver(post_delete, sender=models.Patient)
+@receiver(post_delete, sender=models.Appointment)
+def queue_entry_deleted(sender, **kwargs):
+    queue_changed()
+
+
+#---------AUDIT TRAIL
+@receiver(post_delete, sender=models.Doctor)
+@receiver(post_delete, sender=models.Patient)
+@receiver(post_delete, sender=models.Appointment)
+@receiver(post_delete, sender=models.PatientDischargeDetails)
+def record_deleted(sender, instance, **kwargs):
+    #also catches profiles removed by a cascade from their user
+    audit.record('delete', instance)
+
+
+@receiver(request_finished)
+def flush_audit_log(sender, **kwargs):
+    #runs once the response is out, the request never waits on it
+    audit.flush_if_due()
+
+
+#---------METRICS FILE FOR /metrics, written after the response like the audit log
+@receiver(request_finished)
+def write_metrics(sender, **kwargs):
+    metrics.write_if_due()
+
+
+#---------SLOW QUERY LOG ON EVERY DATABASE CONNECTION
+@receiver(connection_created)
+def log_slow_queries(sender, connection, **kwargs):
+    slowqueries.install(connection)
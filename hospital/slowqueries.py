@@ -0,0 +1,162 @@
+"""
+Slow query log.
+
+Every database connection gets an execute wrapper (installed from the
+``connection_created`` signal, so views, commands and jobs are all covered).
+A statement taking ``SLOW_QUERY_MS`` or longer is stored as a ``SlowQuery``
+row with the project function and line it came from. A
+``SLOW_QUERY_EXPLAIN_RATE`` fraction of slow SELECTs also gets its plan:
+``EXPLAIN (ANALYZE, BUFFERS)`` on PostgreSQL - which runs the query a second
+time - or ``EXPLAIN QUERY PLAN`` on SQLite. Only the newest
+``SLOW_QUERY_KEEP`` rows are kept; browse them in the Django admin.
+
+Only the SQL with its placeholders is stored, never the bound values, and
+queries on ``SECRET_TABLES`` get no plan (PostgreSQL prints the values in
+it): every staff user can read the log, and those values include password
+hashes and session keys.
+
+The caller only notes its call site and queues the query; one background
+thread per process runs the EXPLAIN (on the database the query ran on) and
+the INSERT (on the database the router writes ``SlowQuery`` to, never a
+replica). When ``SLOW_QUERY_QUEUE`` queries are waiting, more are dropped.
+"""
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections, router
+
+from . import metrics
+
+
+#trim the table every this many inserts per process
+TRIM_EVERY = 50
+
+#wrappers, queryset helpers and database backends only pass calls through, the
+#caller is the interesting frame
+PASS_THROUGH = (__file__, metrics.__file__, os.path.join(os.path.dirname(__file__), 'models.py'),
+                os.path.join(os.path.dirname(__file__), 'backends', ''))
+
+logger = logging.getLogger(__name__)
+
+#their values are credentials
+SECRET_TABLES = ('"auth_user"', '"django_session"')
+
+_local = threading.local()
+_inserts = [0]
+_lock = threading.Lock()
+#pid the thread was started in, and its queue
+_worker = {'pid': None, 'queue': None}
+
+
+def call_site():
+    #innermost frame of project code, e.g. hospital/views.py:727 in search_view
+    frame=sys._getframe(2)
+    while frame is not None:
+        filename=frame.f_code.co_filename
+        if filename.startswith(settings.BASE_DIR) and 'site-packages' not in filename and not filename.startswith(PASS_THROUGH):
+            return frame.f_code.co_name, '%s:%d' % (os.path.relpath(filename, settings.BASE_DIR), frame.f_lineno)
+        frame=frame.f_back
+    return '', ''
+
+
+def explain(connection, sql, params):
+    if connection.vendor == 'postgresql':
+        prefix='EXPLAIN (ANALYZE, BUFFERS) '
+    elif connection.vendor == 'sqlite':
+        prefix='EXPLAIN QUERY PLAN '
+    else:
+        return ''
+    with connection.cursor() as cursor:
+        cursor.execute(prefix+sql, params)
+        return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+
+def save(alias, sql, params, seconds, function, site, sample):
+    from .models import SlowQuery
+    plan=''
+    if sample:
+        try:
+            plan=explain(connections[alias], sql, params)
+        except DatabaseError:
+            pass
+    using=router.db_for_write(SlowQuery)
+    row=SlowQuery.objects.using(using).create(
+        sql=sql, duration_ms=round(seconds*1000, 2), database=alias,
+        function=function[:100], call_site=site[:255], plan=plan)
+    _inserts[0]+=1
+    if _inserts[0] % TRIM_EVERY == 0:
+        SlowQuery.objects.using(using).filter(id__lte=row.id-settings.SLOW_QUERY_KEEP).delete()
+
+
+def work(pending):
+    #nothing this thread runs is logged again
+    _local.busy=True
+    while True:
+        item=pending.get()
+        try:
+            save(*item)
+        except DatabaseError:
+            #e.g. the table is not migrated yet
+            pass
+        except Exception:
+            #the thread has to survive whatever one query brings
+            logger.exception('Could not log a slow query')
+        finally:
+            if pending.qsize() == 0:
+                #no idle connections held between slow queries
+                connections.close_all()
+            pending.task_done()
+
+
+def get_queue():
+    with _lock:
+        #a forked worker has the queue but not the thread
+        if _worker['pid'] != os.getpid():
+            pending=queue.Queue(settings.SLOW_QUERY_QUEUE)
+            threading.Thread(target=work, args=(pending,), name='slow-query-log', daemon=True).start()
+            _worker.update(pid=os.getpid(), queue=pending)
+        return _worker['queue']
+
+
+def record(connection, sql, params, seconds):
+    function, site = call_site()
+    sample=(sql.lstrip()[:6].upper() == 'SELECT' and not any(table in sql for table in SECRET_TABLES)
+            and random.random() < settings.SLOW_QUERY_EXPLAIN_RATE)
+    #kept only as long as the EXPLAIN needs them
+    params=tuple(params) if sample and params is not None else None
+    try:
+        get_queue().put_nowait((connection.alias, sql, params, seconds, function, site, sample))
+    except queue.Full:
+        pass
+
+
+def drain(timeout=None):
+    """Wait until every queued query is saved; False if ``timeout`` ran out."""
+    if _worker['pid'] != os.getpid():
+        return True
+    pending=_worker['queue']
+    with pending.all_tasks_done:
+        return pending.all_tasks_done.wait_for(lambda: not pending.unfinished_tasks, timeout)
+
+
+atexit.register(drain, 5)
+
+
+def install(connection):
+    def log_slow(execute, sql, params, many, context):
+        if getattr(_local, 'busy', False) or settings.SLOW_QUERY_MS is None:
+            return execute(sql, params, many, context)
+        started=time.perf_counter()
+        result=execute(sql, params, many, context)
+        seconds=time.perf_counter()-started
+        if seconds*1000 >= settings.SLOW_QUERY_MS and not many and not connection.needs_rollback:
+            record(connection, sql, params, seconds)
+        return result
+    connection.execute_wrappers.append(log_slow)
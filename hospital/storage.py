@@ -0,0 +1,155 @@
+"""
+Static files storage for production: hashed names plus precompressed copies.
+
+``collectstatic`` writes every file under a content-hashed name (as
+``ManifestStaticFilesStorage`` does) and, for text assets, ``.gz`` and - when
+the optional ``brotli`` package is installed - ``.br`` siblings that
+``PrecompressedStaticMiddleware`` serves with long-lived caching.
+"""
+import gzip
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/xml', 'image/svg+xml')
+#not worth a second file below this many bytes saved
+MIN_SAVING = 256
+
+
+def is_compressible(name):
+    content_type, encoding = mimetypes.guess_type(name)
+    return encoding is None and content_type is not None and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compressed_variants(data):
+    variants={'gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br']=brotli.compress(data, quality=11)
+    return {suffix: body for suffix, body in variants.items() if len(body) + MIN_SAVING <= len(data)}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            if not is_compressible(name):
+                continue
+            with self.open(name) as f:
+                data=f.read()
+            for suffix, body in compressed_variants(data).items():
+                compressed_name='%s.%s' % (name, suffix)
+                if self.exists(compressed_name):
+                    self.delete(compressed_name)
+                self._save(compressed_name, ContentFile(body))
+
+    def stored_name(self, name):
+        #files that were never collected are served under their plain name
+        #instead of failing the page
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+
+#---------SERVING THE COLLECTED FILES
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+#Content-Encoding -> suffix written by post_process, in order of preference
+ENCODINGS = (('br', 'br'), ('gzip', 'gz'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def accepted_encodings(header):
+    accepted=set()
+    for part in header.split(','):
+        coding, _, params = part.partition(';')
+        params=params.replace(' ', '')
+        if params.startswith('q=') and not params[2:].strip('0.'):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticMiddleware:
+    """
+    Serve ``STATIC_URL`` requests straight from ``STATIC_ROOT`` before any
+    session or auth work, picking the ``.br``/``.gz`` copy the client accepts.
+    Hashed names never change content, so they are cached for a year;
+    anything else gets ``STATIC_MAX_AGE``. Paths missing from ``STATIC_ROOT``
+    fall through to the rest of the stack.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefix=settings.STATIC_URL
+        self.root=settings.STATIC_ROOT
+        self.max_age=getattr(settings, 'STATIC_MAX_AGE', 60)
+        #name -> {encoding: (path, size, etag)}, files only change on deploy
+        self.files={}
+
+    def __call__(self, request):
+        if request.method not in ('GET', 'HEAD') or not self.root or not request.path.startswith(self.prefix):
+            return self.get_response(request)
+        variants=self.find(request.path[len(self.prefix):])
+        if variants is None:
+            return self.get_response(request)
+        return self.serve(request, variants)
+
+    def find(self, name):
+        if name in self.files:
+            return self.files[name]
+        try:
+            path=safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not name or not os.path.isfile(path):
+            return None
+        variants={}
+        for encoding, suffix in (('identity', None),)+ENCODINGS:
+            candidate=path if suffix is None else '%s.%s' % (path, suffix)
+            try:
+                stat=os.stat(candidate)
+            except OSError:
+                continue
+            variants[encoding]=(candidate, stat.st_size, '"%x-%x-%s"' % (int(stat.st_mtime), stat.st_size, encoding))
+        self.files[name]=variants
+        return variants
+
+    def serve(self, request, variants):
+        accepted=accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding='identity'
+        for candidate, _ in ENCODINGS:
+            if candidate in variants and candidate in accepted:
+                encoding=candidate
+                break
+        path, size, etag = variants[encoding]
+        original=variants['identity'][0]
+        if etag in [tag.strip() for tag in request.META.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            response=HttpResponseNotModified()
+        elif request.method == 'HEAD':
+            response=HttpResponse()
+            response['Content-Length']=size
+        else:
+            response=FileResponse(open(path, 'rb'), filename=os.path.basename(original))
+        content_type, _ = mimetypes.guess_type(original)
+        response['Content-Type']=content_type or 'application/octet-stream'
+        if encoding != 'identity':
+            response['Content-Encoding']=encoding
+        if len(variants) > 1:
+            response['Vary']='Accept-Encoding'
+        response['ETag']=etag
+        response['Cache-Control']=IMMUTABLE if HASHED_NAME.search(original) else 'public, max-age=%d' % self.max_age
+        return response
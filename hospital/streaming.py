@@ -0,0 +1,75 @@
+"""
+Rendering for pages built around one very large table.
+
+``stream_table()`` renders the page once with a marker where the table rows
+go and sends everything before the marker straight away. The rows follow in
+batches of ``STREAM_BATCH_SIZE``, each rendered with a small row template
+while the queryset is read through ``iterator()`` - a server-side cursor on
+PostgreSQL - so neither the first byte nor the worker's memory waits on the
+size of the table. The page template prints the rows variable where the rows
+belong; the row template loops over the same variable for one batch.
+
+``render_rows()`` is the plain version for tables that fit in one response.
+Either way the row template comes from the Jinja2 engine (``hospital.jinja``,
+templates in ``hospital/jinja2/``) for URL names listed in ``JINJA2_VIEWS``, and from
+the Django engine otherwise.
+"""
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.template import engines, loader
+from django.utils.safestring import mark_safe
+
+
+ROWS_MARKER = mark_safe('<!--hospital:streamed-rows-->')
+
+
+def batches(rows, size):
+    batch=[]
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch=[]
+    if batch:
+        yield batch
+
+
+def row_engine(request):
+    match=request.resolver_match
+    if match and match.url_name in settings.JINJA2_VIEWS and 'jinja2' in engines.templates:
+        return 'jinja2'
+    return 'django'
+
+
+def get_row_template(request, row_template):
+    return loader.get_template(row_template, using=row_engine(request))
+
+
+def render_rows(request, row_template, name, rows):
+    """The rows as safe HTML, for the page template to print."""
+    return mark_safe(get_row_template(request, row_template).render({name: rows}))
+
+
+def stream_rows(template, name, queryset, size):
+    for batch in batches(queryset.iterator(chunk_size=size), size):
+        yield template.render({name: batch})
+
+
+def stream_table(request, template_name, context, name, queryset, row_template):
+    """
+    Stream ``queryset`` into ``template_name``: the page prints ``{{ name }}``
+    where the rows go and ``row_template`` gets each batch as ``name``.
+    """
+    size=settings.STREAM_BATCH_SIZE
+    #pick the database now, the rows are read after the view (and the
+    #request's replica routing) has returned
+    queryset=queryset.using(queryset.db)
+    template=get_row_template(request, row_template)
+    page=loader.render_to_string(template_name, dict(context, **{name: ROWS_MARKER}), request)
+    head, _, tail = page.partition(ROWS_MARKER)
+
+    def content():
+        yield head
+        yield from stream_rows(template, name, queryset, size)
+        yield tail
+    return StreamingHttpResponse(content(), content_type='text/html; charset=utf-8')
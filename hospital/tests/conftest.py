@@ -0,0 +1,50 @@
+import pytest
+from django.test import Client
+from django.contrib.auth.models import User, Group
+from hospital import models
+from datetime import date
+from django.core.cache import caches
+from hospital import admission, audit, ratelimit
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # database rows are rolled back between tests without sending signals
+    for cache in caches.all():
+        cache.clear()
+    ratelimit.reset()
+    admission.reset()
+    yield
+    # buffered audit events must not be flushed into the next test
+    audit.discard()
+
+@pytest.fixture(autouse=True)
+def media_root(tmp_path, settings):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    return tmp_path / 'media'
+
+@pytest.fixture
+def client():
+    return Client()
+
+@pytest.fixture
+def admin_user(db):
+    user = User.objects.create_user(username='admin', password='adminpass')
+    group, _ = Group.objects.get_or_create(name='ADMIN')
+    group.user_set.add(user)
+    return user
+
+@pytest.fixture
+def doctor_user(db):
+    user = User.objects.create_user(username='doctor', password='doctorpass', first_name='Doc', last_name='Tor')
+    group, _ = Group.objects.get_or_create(name='DOCTOR')
+    group.user_set.add(user)
+    models.Doctor.objects.create(user=user, status=True, profile_pic='profile_pic/DoctorProfilePic/doctor.jpg', mobile='123', address='abc', department='Cardiologist')
+    return user
+
+@pytest.fixture
+def patient_user(db, doctor_user):
+    user = User.objects.create_user(username='patient', password='patientpass', first_name='Pat', last_name='Ient')
+    group, _ = Group.objects.get_or_create(name='PATIENT')
+    group.user_set.add(user)
+    models.Patient.objects.create(user=user, status=True, profile_pic='profile_pic/PatientProfilePic/patient.jpg', assignedDoctorId=doctor_user.id, mobile='456', address='def', symptoms='cough', admitDate=date.today())
+    return user
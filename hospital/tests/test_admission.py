@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+from django.contrib.sessions.backends.base import SessionBase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from hospital import admission, metrics, sessions
+from hospital.admission import controller
+
+
+@pytest.fixture
+def limits(settings):
+    settings.ADMISSION_LIMITS = {'PATIENT': 2, 'DOCTOR': 1}
+    settings.ADMISSION_QUEUE_SECONDS = 0
+    return settings
+
+def test_acquire_respects_limit(limits):
+    assert controller.acquire('PATIENT', 0) and controller.acquire('PATIENT', 0)
+    assert not controller.acquire('PATIENT', 0)
+    # roles without a limit and always-admitted views are never held back
+    assert controller.acquire('ADMIN', 0)
+    assert controller.acquire('PATIENT', 0, always=True)
+    assert controller.in_flight['PATIENT'] == 3
+    controller.release('PATIENT', 0.01)
+    controller.release('PATIENT', 0.01)
+    assert controller.acquire('PATIENT', 0)
+
+def test_waiting_request_gets_freed_slot(limits):
+    controller.acquire('DOCTOR', 0)
+    threading.Timer(0.05, controller.release, ('DOCTOR', 0.01)).start()
+    started = time.monotonic()
+    assert controller.acquire('DOCTOR', 2)
+    assert time.monotonic() - started < 1
+
+def test_limits_follow_latency(limits):
+    limits.ADMISSION_ADJUST_SECONDS = 0
+    limits.ADMISSION_TARGET_LATENCY = 0.1
+    limits.ADMISSION_LIMITS = {'PATIENT': 20}
+    for _ in range(5):
+        controller.acquire('PATIENT', 0)
+        controller.release('PATIENT', 1.0)
+    assert controller.limit('PATIENT') < 10
+    for _ in range(30):
+        controller.acquire('PATIENT', 0)
+        controller.release('PATIENT', 0.001)
+    assert controller.limit('PATIENT') == 20
+
+def test_patient_shed_with_retry_after(client, patient_user, limits):
+    client.force_login(patient_user)
+    controller.in_flight['PATIENT'] = 2
+    response = client.get('/patient-view-doctor')
+    assert response.status_code == 503
+    assert response['Retry-After'] == str(limits.ADMISSION_RETRY_AFTER)
+    assert metrics._counters[('hospital_requests_shed_total', ('PATIENT',))] >= 1
+    controller.in_flight['PATIENT'] = 0
+    assert client.get('/patient-view-doctor').status_code == 200
+    assert controller.in_flight['PATIENT'] == 0
+
+def test_doctor_dashboard_always_admitted(client, doctor_user, limits):
+    client.force_login(doctor_user)
+    controller.in_flight['DOCTOR'] = 1
+    assert client.get('/doctor-view-patient').status_code == 503
+    assert client.get('/doctor-dashboard').status_code == 200
+    assert controller.in_flight['DOCTOR'] == 1
+
+def test_disabled(client, patient_user, limits):
+    limits.ADMISSION_ENABLE = False
+    client.force_login(patient_user)
+    controller.in_flight['PATIENT'] = 2
+    assert client.get('/patient-view-doctor').status_code == 200
+
+def test_anonymous_role(rf):
+    assert admission.request_role(rf.get('/')) == 'ANONYMOUS'
+
+def test_role_looked_up_when_not_on_the_user(rf, patient_user):
+    request = rf.get('/')
+    request.user = patient_user
+    request.session = SessionBase()
+    assert admission.request_role(request) == 'PATIENT'
+    assert request.session[sessions.ROLE_KEY] == 'PATIENT'
+    del patient_user.hospital_role
+    with CaptureQueriesContext(connection) as queries:
+        assert admission.request_role(request) == 'PATIENT'
+    assert len(queries) == 0
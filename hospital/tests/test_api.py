@@ -0,0 +1,68 @@
+import pytest
+from django.contrib.auth.models import User
+from hospital import models
+
+
+def make_appointments(doctor_user, patient_user, n):
+    for i in range(n):
+        models.Appointment.objects.create(doctorId=doctor_user.id, patientId=patient_user.id, doctorName='Doc', patientName='Pat', description='visit %d' % i, status=True)
+
+def test_api_requires_login(client, db):
+    response = client.get('/api/v1/doctors')
+    assert response.status_code == 401
+
+def test_api_doctors_field_selection(client, admin_user, doctor_user):
+    client.force_login(admin_user)
+    response = client.get('/api/v1/doctors', {'fields': 'first_name,department'})
+    assert response.status_code == 200
+    assert response.json()['results'] == [{'first_name': 'Doc', 'department': 'Cardiologist'}]
+
+def test_api_unknown_field(client, admin_user):
+    client.force_login(admin_user)
+    response = client.get('/api/v1/doctors', {'fields': 'password'})
+    assert response.status_code == 400
+
+def test_api_cursor_pagination(client, admin_user, doctor_user, patient_user):
+    make_appointments(doctor_user, patient_user, 5)
+    client.force_login(admin_user)
+    first = client.get('/api/v1/appointments', {'limit': 3}).json()
+    assert len(first['results']) == 3
+    second = client.get('/api/v1/appointments', {'limit': 3, 'cursor': first['next']}).json()
+    assert len(second['results']) == 2
+    assert second['next'] is None
+    ids = [r['id'] for r in first['results'] + second['results']]
+    assert ids == sorted(set(ids))
+
+def test_api_bad_cursor(client, admin_user):
+    client.force_login(admin_user)
+    response = client.get('/api/v1/appointments', {'cursor': 'garbage'})
+    assert response.status_code == 400
+
+def test_api_etag_not_modified(client, admin_user, doctor_user):
+    client.force_login(admin_user)
+    response = client.get('/api/v1/doctors')
+    etag = response['ETag']
+    response = client.get('/api/v1/doctors', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    models.Doctor.objects.update(mobile='999')
+    response = client.get('/api/v1/doctors', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+def test_api_doctor_scope(client, doctor_user, patient_user):
+    other = User.objects.create_user(username='other', password='otherpass')
+    models.Patient.objects.create(user=other, status=True, assignedDoctorId=other.id, mobile='1', address='x', symptoms='flu')
+    client.force_login(doctor_user)
+    results = client.get('/api/v1/patients').json()['results']
+    assert [r['user_id'] for r in results] == [patient_user.id]
+
+def test_api_patient_sees_only_own_appointments(client, doctor_user, patient_user):
+    make_appointments(doctor_user, patient_user, 2)
+    models.Appointment.objects.create(doctorId=doctor_user.id, patientId=patient_user.id + 100, description='someone else', status=True)
+    client.force_login(patient_user)
+    results = client.get('/api/v1/appointments').json()['results']
+    assert len(results) == 2
+
+def test_api_rejects_post(client, admin_user):
+    client.force_login(admin_user)
+    response = client.post('/api/v1/doctors')
+    assert response.status_code == 405
@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from hospital import archive, models
+
+
+def test_deleted_doctor_hidden_from_directory_pages(client, admin_user, doctor_user):
+    doctor = models.Doctor.objects.get(user=doctor_user)
+    client.force_login(admin_user)
+    client.get(f'/delete-doctor-from-hospital/{doctor.id}')
+    response = client.get('/admin-view-doctor')
+    assert list(response.context['doctors']) == []
+
+def test_archive_deleted_moves_profiles_and_appointments(client, admin_user, doctor_user, patient_user):
+    models.Appointment.objects.create(doctorId=doctor_user.id, patientId=patient_user.id, description='x', status=True)
+    kept = models.Appointment.objects.create(doctorId=admin_user.id, patientId=admin_user.id, description='y', status=True)
+    doctor = models.Doctor.objects.get(user=doctor_user)
+    client.force_login(admin_user)
+    client.get(f'/delete-doctor-from-hospital/{doctor.id}')
+
+    call_command('archive_deleted', '--batch-size', '1')
+
+    assert not models.Doctor.all_objects.filter(id=doctor.id).exists()
+    assert not User.objects.filter(id=doctor_user.id).exists()
+    archived = models.ArchivedDoctor.objects.get()
+    assert (archived.originalId, archived.userId, archived.name) == (doctor.id, doctor_user.id, 'Doc Tor')
+    assert list(models.Appointment.objects.all()) == [kept]
+    assert models.ArchivedAppointment.objects.get().doctorId == doctor_user.id
+
+def test_archive_deleted_patients(client, admin_user, patient_user):
+    patient = models.Patient.objects.get(user=patient_user)
+    client.force_login(admin_user)
+    client.get(f'/delete-patient-from-hospital/{patient.id}')
+    call_command('archive_deleted')
+    assert not models.Patient.all_objects.exists()
+    assert models.ArchivedPatient.objects.get().username == 'patient'
+
+def test_appointments_archived_in_chunks(doctor_user, patient_user):
+    for i in range(5):
+        models.Appointment.objects.create(doctorId=doctor_user.id, patientId=patient_user.id, description=str(i), status=True)
+    appointments = models.Appointment.objects.filter(doctorId=doctor_user.id)
+    with CaptureQueriesContext(connection) as queries:
+        assert archive.archive_appointments(appointments, 2) == 5
+    chunks = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'ORDER BY' in q['sql']]
+    # three chunks of at most two rows, then an empty one
+    assert len(chunks) == 4 and all('LIMIT 2' in sql for sql in chunks)
+    assert not models.Appointment.objects.exists()
+    assert sorted(a.description for a in models.ArchivedAppointment.objects.all()) == ['0', '1', '2', '3', '4']
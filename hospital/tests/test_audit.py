@@ -0,0 +1,98 @@
+from datetime import timedelta
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from hospital import audit, models
+
+
+def test_actions_are_buffered_not_written(transactional_db, client, admin_user, doctor_user):
+    client.force_login(admin_user)
+    client.get('/delete-doctor-from-hospital/%d' % doctor_user.doctor.id)
+    assert audit.pending() == 1
+    assert not models.AuditEvent.objects.exists()
+
+def test_flush_writes_one_batch(transactional_db, client, admin_user, patient_user):
+    client.force_login(admin_user)
+    patient = patient_user.patient
+    models.Patient.objects.filter(id=patient.id).update(status=False)
+    client.post('/admin-approve-patient', {'action': 'approve', 'selected': [patient.id]})
+    client.get('/delete-patient-from-hospital/%d' % patient.id)
+    with CaptureQueriesContext(connection) as queries:
+        assert audit.flush() == 2
+    assert [q['sql'][:6] for q in queries if not q['sql'].startswith(('BEGIN', 'COMMIT'))] == ['INSERT']
+    events = list(models.AuditEvent.objects.by_actor(admin_user.id).order_by('id'))
+    assert [(e.action, e.targetType, e.targetId, e.actorName) for e in events] == [
+        ('approve', 'patient', patient.id, 'admin'), ('delete', 'patient', patient.id, 'admin')]
+    assert models.AuditEvent.objects.for_target('patient', patient.id).count() == 2
+
+def test_flush_on_size(transactional_db, settings, doctor_user):
+    # written once the surrounding transaction commits, here at once
+    settings.AUDIT_FLUSH_SIZE = 3
+    for _ in range(3):
+        audit.record('update', doctor_user.doctor)
+    assert audit.pending() == 0
+    assert models.AuditEvent.objects.count() == 3
+
+def test_flush_after_request_once_due(transactional_db, client, settings, admin_user, doctor_user):
+    client.force_login(admin_user)
+    audit.record('update', doctor_user.doctor)
+    client.get('/admin-dashboard')
+    assert audit.pending() == 1
+    settings.AUDIT_FLUSH_SECONDS = 0
+    client.get('/admin-dashboard')
+    assert audit.pending() == 0
+    assert models.AuditEvent.objects.count() == 1
+
+def test_cascaded_deletes_are_recorded(transactional_db, client, admin_user, doctor_user):
+    client.force_login(admin_user)
+    client.get('/reject-doctor/%d' % doctor_user.doctor.id)
+    audit.flush()
+    actions = set(models.AuditEvent.objects.values_list('action', 'targetType'))
+    assert actions == {('reject', 'doctor'), ('delete', 'doctor')}
+
+def test_bulk_reject_records_reject_and_delete(transactional_db, client, admin_user, doctor_user):
+    doctor = doctor_user.doctor
+    models.Doctor.objects.filter(id=doctor.id).update(status=False)
+    client.force_login(admin_user)
+    client.post('/admin-approve-doctor', {'action': 'reject', 'selected': [doctor.id]})
+    audit.flush()
+    events = set(models.AuditEvent.objects.values_list('action', 'targetType', 'targetId'))
+    assert events == {('reject', 'doctor', doctor.id), ('delete', 'doctor', doctor.id)}
+
+def test_bulk_reject_appointments_skips_approved(transactional_db, client, admin_user, doctor_user, patient_user):
+    approved = models.Appointment.objects.create(doctorId=doctor_user.id, patientId=patient_user.id, description='a', status=True)
+    pending = models.Appointment.objects.create(doctorId=doctor_user.id, patientId=patient_user.id, description='p', status=False)
+    client.force_login(admin_user)
+    # a stale page still listing the one approved since
+    client.post('/admin-approve-appointment', {'action': 'reject', 'selected': [approved.id, pending.id]})
+    audit.flush()
+    events = set(models.AuditEvent.objects.values_list('action', 'targetType', 'targetId'))
+    assert events == {('reject', 'appointment', pending.id), ('delete', 'appointment', pending.id)}
+    assert list(models.Appointment.objects.all()) == [approved]
+
+def test_rolled_back_actions_are_not_recorded(transactional_db, doctor_user):
+    with pytest.raises(RuntimeError):
+        with transaction.atomic():
+            audit.record('approve', doctor_user.doctor)
+            raise RuntimeError('approval failed')
+    with transaction.atomic():
+        audit.record('update', doctor_user.doctor)
+        # only once the transaction commits
+        assert audit.pending() == 0
+    assert audit.pending() == 1
+    audit.flush()
+    assert list(models.AuditEvent.objects.values_list('action', flat=True)) == ['update']
+
+def test_log_is_append_only(transactional_db, doctor_user):
+    audit.record('update', doctor_user.doctor)
+    audit.flush()
+    event = models.AuditEvent.objects.get()
+    with pytest.raises(TypeError):
+        event.save()
+    with pytest.raises(TypeError):
+        models.AuditEvent.objects.update(action='x')
+    with pytest.raises(TypeError):
+        models.AuditEvent.objects.all().delete()
+    now = timezone.now()
+    assert models.AuditEvent.objects.between(now - timedelta(minutes=1), now + timedelta(minutes=1)).count() == 1
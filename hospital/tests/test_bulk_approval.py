@@ -0,0 +1,48 @@
+from django.contrib.auth.models import User
+from hospital import models
+
+
+def make_pending_doctors(n):
+    doctors = []
+    for i in range(n):
+        user = User.objects.create_user(username='pending%d' % i, password='pass')
+        doctors.append(models.Doctor.objects.create(user=user, status=False, profile_pic='profile_pic/DoctorProfilePic/d.jpg', mobile='1', address='x'))
+    return doctors
+
+def test_bulk_approve_doctors_single_update(client, admin_user, django_assert_max_num_queries):
+    doctors = make_pending_doctors(3)
+    client.force_login(admin_user)
+    ids = [d.id for d in doctors[:2]]
+    # session, user, savepoint pair, the pending ids for the audit log and one UPDATE
+    with django_assert_max_num_queries(6):
+        response = client.post('/admin-approve-doctor', {'action': 'approve', 'selected': ids})
+    assert response.status_code == 302
+    assert response.url == '/admin-approve-doctor'
+    assert set(models.Doctor.objects.filter(status=True).values_list('id', flat=True)) == set(ids)
+
+def test_bulk_reject_doctors_deletes_users(client, admin_user):
+    doctors = make_pending_doctors(3)
+    client.force_login(admin_user)
+    client.post('/admin-approve-doctor', {'action': 'reject', 'selected': [d.id for d in doctors]})
+    assert not models.Doctor.objects.exists()
+    assert not User.objects.filter(username__startswith='pending').exists()
+
+def test_bulk_reject_ignores_approved(client, admin_user, doctor_user, patient_user):
+    patient = models.Patient.objects.get(user=patient_user)
+    client.force_login(admin_user)
+    client.post('/admin-approve-patient', {'action': 'reject', 'selected': [patient.id]})
+    assert models.Patient.objects.filter(id=patient.id).exists()
+
+def test_bulk_approve_appointments(client, admin_user):
+    appointments = [models.Appointment.objects.create(doctorId=1, patientId=2, description='x', status=False) for _ in range(3)]
+    client.force_login(admin_user)
+    client.post('/admin-approve-appointment', {'action': 'approve', 'selected': [a.id for a in appointments[:2]]})
+    assert models.Appointment.objects.filter(status=True).count() == 2
+    client.post('/admin-approve-appointment', {'action': 'reject', 'selected': [appointments[2].id]})
+    assert models.Appointment.objects.count() == 2
+
+def test_approve_page_has_bulk_form(client, admin_user):
+    make_pending_doctors(1)
+    client.force_login(admin_user)
+    response = client.get('/admin-approve-doctor')
+    assert b'name="selected"' in response.content
@@ -0,0 +1,43 @@
+from hospital import models
+
+
+def test_admin_view_appointment_not_modified(client, admin_user):
+    client.force_login(admin_user)
+    response = client.get('/admin-view-appointment')
+    assert response.status_code == 200
+    etag = response['ETag']
+    response = client.get('/admin-view-appointment', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
+    assert not response.templates
+
+def test_admin_view_appointment_changes_etag(client, admin_user):
+    client.force_login(admin_user)
+    etag = client.get('/admin-view-appointment')['ETag']
+    models.Appointment.objects.create(doctorId=1, patientId=2, description='checkup', status=True)
+    response = client.get('/admin-view-appointment', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+def test_delete_changes_etag(client, admin_user):
+    appointment = models.Appointment.objects.create(doctorId=1, patientId=2, description='checkup', status=True)
+    client.force_login(admin_user)
+    etag = client.get('/admin-view-appointment')['ETag']
+    appointment.delete()
+    response = client.get('/admin-view-appointment', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+
+def test_doctor_view_patient_etag_is_per_user(client, doctor_user, admin_user):
+    client.force_login(doctor_user)
+    response = client.get('/doctor-view-patient')
+    assert response['Cache-Control'] == 'private, no-cache'
+    etag = response['ETag']
+    assert client.get('/doctor-view-patient', HTTP_IF_NONE_MATCH=etag).status_code == 304
+    patient = models.Patient.objects.create(user=admin_user, status=True, profile_pic='profile_pic/PatientProfilePic/p.jpg', assignedDoctorId=doctor_user.id, mobile='1', address='x', symptoms='flu')
+    assert client.get('/doctor-view-patient', HTTP_IF_NONE_MATCH=etag).status_code == 200
+
+def test_dashboard_unchanged_refresh_skips_page_queries(client, doctor_user, patient_user, django_assert_max_num_queries):
+    client.force_login(doctor_user)
+    etag = client.get('/doctor-dashboard')['ETag']
+    # session, user and the four scope versions
+    with django_assert_max_num_queries(6):
+        response = client.get('/doctor-dashboard', HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 304
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+
+import pytest
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from hospital import credentials
+
+
+@pytest.fixture
+def fast_hashing(settings):
+    settings.PASSWORD_ITERATIONS = 1000
+    return settings
+
+def user_writes(queries):
+    return [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE')) and 'auth_user"' in q['sql']]
+
+def test_signup_is_a_single_write(client, db, fast_hashing):
+    data = {'username': 'newadmin', 'password': 'newadminpass', 'first_name': 'Admin', 'last_name': 'User'}
+    with CaptureQueriesContext(connection) as queries:
+        assert client.post('/adminsignup', data).status_code == 302
+    assert len(user_writes(queries)) == 1
+    assert User.objects.get(username='newadmin').check_password('newadminpass')
+
+def test_login_rehashes_with_new_iterations(client, db, fast_hashing):
+    user = User.objects.create_user(username='nurse', password='nursepass')
+    assert '$1000$' in user.password
+    fast_hashing.PASSWORD_ITERATIONS = 1500
+    response = client.post('/adminlogin', {'username': 'nurse', 'password': 'nursepass'})
+    assert response.status_code == 302
+    user.refresh_from_db()
+    assert user.password.startswith('pbkdf2_sha256$1500$')
+    assert user.check_password('nursepass')
+
+def test_hashing_runs_on_the_pool(monkeypatch, fast_hashing):
+    threads = []
+    hash_password = credentials.make_password
+
+    def spy(password):
+        threads.append(threading.current_thread().name)
+        return hash_password(password)
+
+    credentials.run(spy, 'secret')
+    assert threads[0].startswith('password-hash')
+
+def test_full_pool_sheds_logins(client, doctor_user, monkeypatch):
+    def busy(func, *args):
+        raise credentials.PoolBusy()
+    monkeypatch.setattr(credentials.pool, 'submit', busy)
+    response = client.post('/doctorlogin', {'username': 'doctor', 'password': 'doctorpass'})
+    assert response.status_code == 503
+    assert response['Retry-After']
+
+def test_pool_is_bounded(fast_hashing):
+    fast_hashing.PASSWORD_HASH_WORKERS = 1
+    fast_hashing.PASSWORD_HASH_QUEUE = 1
+    credentials.reset()
+    release = threading.Event()
+    try:
+        first = credentials.pool.submit(release.wait)
+        second = credentials.pool.submit(release.wait)
+        with pytest.raises(credentials.PoolBusy):
+            credentials.pool.submit(release.wait)
+        release.set()
+        first.result(), second.result()
+        # slots are given back once a hash is done
+        credentials.pool.submit(int).result()
+    finally:
+        release.set()
+        credentials.reset()
+
+def test_async_helpers(fast_hashing):
+    async def signup_and_login():
+        encoded = await credentials.amake_password('secret')
+        return encoded, await credentials.acheck_password('secret', encoded), await credentials.acheck_password('wrong', encoded)
+
+    encoded, good, bad = asyncio.run(signup_and_login())
+    assert good and not bad
+    assert check_password('secret', encoded)
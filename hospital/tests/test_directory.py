@@ -0,0 +1,51 @@
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import transaction
+from hospital import models
+from hospital.directory import CACHE_ALIAS, CACHE_KEY, get_directory, search_directory
+
+
+def make_doctor(username, first_name, department, status=True):
+    user = User.objects.create_user(username=username, password='pass', first_name=first_name, last_name='Smith')
+    return models.Doctor.objects.create(user=user, status=status, mobile='1', address='x', department=department)
+
+def test_directory_lists_only_approved(doctor_user):
+    make_doctor('pending', 'Pending', 'Dermatologists', status=False)
+    assert [d['user_id'] for d in get_directory()] == [doctor_user.id]
+
+def test_directory_search(doctor_user):
+    make_doctor('derm', 'Alice', 'Dermatologists')
+    assert [d['first_name'] for d in search_directory('derm')] == ['Alice']
+    assert [d['first_name'] for d in search_directory('ali')] == ['Alice']
+    assert search_directory('lice') == []
+
+def test_directory_invalidated_on_approval(transactional_db, doctor_user):
+    doctor = make_doctor('pending', 'Pending', 'Dermatologists', status=False)
+    assert len(get_directory()) == 1
+    doctor.status = True
+    doctor.save()
+    assert len(get_directory()) == 2
+
+def test_directory_invalidated_on_user_rename(transactional_db, doctor_user):
+    get_directory()
+    doctor_user.first_name = 'Renamed'
+    doctor_user.save()
+    assert get_directory()[0]['get_name'] == 'Renamed Tor'
+
+def test_directory_dropped_only_after_commit(transactional_db, doctor_user):
+    get_directory()
+    with transaction.atomic():
+        make_doctor('derm', 'Alice', 'Dermatologists')
+        # a request rebuilding now would not see Alice yet
+        assert caches[CACHE_ALIAS].get(CACHE_KEY) is not None
+    assert caches[CACHE_ALIAS].get(CACHE_KEY) is None
+    assert len(get_directory()) == 2
+
+def test_patient_view_doctor_warm_cache_skips_doctor_queries(client, patient_user, django_assert_max_num_queries):
+    client.force_login(patient_user)
+    client.get('/patient-view-doctor')
+    # session, user and the patient for the sidebar
+    with django_assert_max_num_queries(3):
+        response = client.get('/patient-view-doctor')
+    assert response.status_code == 200
+    assert b'Doc Tor' in response.content
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import pytest
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.test import Client
+from hospital import events, models
+
+
+async def noop_application(scope, receive, send):
+    raise AssertionError('should not reach Django')
+
+def scope(cookie=''):
+    return {'type': 'http', 'method': 'GET', 'path': events.EVENTS_PATH, 'query_string': b'',
+            'headers': [(b'cookie', cookie.encode())]}
+
+def session_cookie(user):
+    client = Client()
+    client.force_login(user)
+    return '%s=%s' % (settings.SESSION_COOKIE_NAME, client.cookies[settings.SESSION_COOKIE_NAME].value)
+
+def parse(body):
+    kind, data = body.decode().strip().split('\n')
+    return kind[len('event: '):], json.loads(data[len('data: '):])
+
+def create_pending_doctor():
+    user = User.objects.create_user(username='newdoc', first_name='New', last_name='Doc')
+    models.Doctor.objects.create(user=user, status=False, department='Dermatologists', mobile='1', address='x')
+
+@async_to_sync
+async def stream(cookie, action=None):
+    communicator = ApplicationCommunicator(events.EventStreamRouter(noop_application), scope(cookie))
+    await communicator.send_input({'type': 'http.request'})
+    start = await communicator.receive_output(5)
+    messages = []
+    if start['status'] == 200:
+        messages.append(parse((await communicator.receive_output(5))['body']))
+        if action:
+            await sync_to_async(action)()
+            messages.append(parse((await communicator.receive_output(5))['body']))
+            messages.append(parse((await communicator.receive_output(5))['body']))
+        await communicator.send_input({'type': 'http.disconnect'})
+    await communicator.wait(5)
+    assert not events.broker.has_subscribers()
+    return start, messages
+
+def test_stream_refuses_non_admins(doctor_user):
+    assert stream('')[0]['status'] == 403
+    assert stream(session_cookie(doctor_user))[0]['status'] == 403
+
+def test_stream_pushes_counts_and_new_items(transactional_db, admin_user):
+    start, messages = stream(session_cookie(admin_user), create_pending_doctor)
+    assert dict(start['headers'])[b'content-type'] == b'text/event-stream'
+    assert messages[0] == ('counts', {'type': 'counts', 'doctors': 0, 'patients': 0, 'appointments': 0})
+    kind, item = messages[1]
+    assert kind == 'item' and item['kind'] == 'doctor' and item['name'] == 'New Doc'
+    assert messages[2][1]['doctors'] == 1
+
+def test_nothing_published_without_subscribers(doctor_user, django_assert_num_queries):
+    with django_assert_num_queries(0):
+        events.queue_changed(doctor_user.doctor)
+
+@pytest.mark.skipif(connection.vendor != 'postgresql', reason='PostgreSQL only')
+def test_postgres_channel_skips_work_without_listeners(doctor_user, monkeypatch, django_assert_num_queries):
+    import psycopg2
+    channel = events.PostgresChannel()
+    monkeypatch.setattr(events, '_channel', channel)
+    # one look for listeners, then trusted for LISTENER_CHECK_SECONDS
+    with django_assert_num_queries(1):
+        events.queue_changed(doctor_user.doctor)
+        events.queue_changed(doctor_user.doctor)
+    # what the listener thread of a worker with an admin connected holds
+    listener = psycopg2.connect(**connections['default'].get_connection_params())
+    try:
+        with listener.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_lock_shared(%s)', [events.LISTENER_LOCK])
+        channel.checked = None
+        assert channel.wanted()
+        # and gives back once its last admin leaves
+        with listener.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock_shared(%s)', [events.LISTENER_LOCK])
+    finally:
+        listener.close()
+    channel.checked = None
+    assert not channel.wanted()
+
+def test_broker_drops_events_for_slow_clients():
+    queue = asyncio.Queue(1)
+    events.deliver([queue], {'type': 'counts'})
+    events.deliver([queue], {'type': 'counts'})
+    assert queue.qsize() == 1
+
+def test_wsgi_fallback_stops_reconnects(client):
+    assert client.get(events.EVENTS_PATH).status_code == 204
@@ -0,0 +1,55 @@
+import datetime
+import html
+import os
+import re
+
+import pytest
+from django.template import engines, loader
+
+from hospital import jinja
+
+
+ROWS = {
+    'patients': [{'id': 1, 'get_name': 'Pat <Ient>', 'thumbnail': '/media/p.jpg', 'symptoms': 'cough & cold', 'mobile': '1', 'address': 'x'}],
+    'doctors': [{'id': 2, 'get_name': 'Doc Tor', 'thumbnail': '', 'mobile': None, 'address': 'y', 'department': 'Cardiologist'}],
+    'appointments': [{'doctorName': 'Doc', 'patientName': 'Pat', 'description': '"quoted"', 'appointmentDate': datetime.date(2024, 3, 5)}],
+}
+TEMPLATES = {
+    'hospital/doctor_view_patient_rows.html': 'patients',
+    'hospital/admin_view_patient_rows.html': 'patients',
+    'hospital/admin_view_doctor_rows.html': 'doctors',
+    'hospital/admin_view_appointment_rows.html': 'appointments',
+}
+
+def normalize(text):
+    # the engines spell some entities differently (&quot; and &#34;)
+    return html.unescape(re.sub(r'\s+', ' ', text).strip())
+
+@pytest.mark.parametrize('template_name', sorted(TEMPLATES))
+def test_jinja_rows_match_django(template_name):
+    name = TEMPLATES[template_name]
+    context = {name: ROWS[name]}
+    django_html = loader.get_template(template_name, using='django').render(context)
+    jinja_html = loader.get_template(template_name, using='jinja2').render(context)
+    assert normalize(jinja_html) == normalize(django_html)
+    assert '<Ient>' not in jinja_html and '"quoted"' not in jinja_html and 'cough & cold' not in jinja_html
+
+def test_views_switch_engine(client, admin_user, doctor_user, settings):
+    client.force_login(admin_user)
+    response = client.get('/admin-view-doctor')
+    assert 'hospital/admin_view_doctor_rows.html' not in [t.name for t in response.templates]
+    assert b'Doc Tor' in response.content
+    settings.JINJA2_VIEWS = frozenset()
+    response = client.get('/admin-view-doctor')
+    # the Django engine's renders show up in the test client's template list
+    assert 'hospital/admin_view_doctor_rows.html' in [t.name for t in response.templates]
+    assert b'Doc Tor' in response.content
+
+def test_precompile_writes_bytecode():
+    env = engines['jinja2'].env
+    cache = env.bytecode_cache
+    # as in a fresh worker, nothing compiled in memory or on disk
+    env.cache.clear()
+    cache.clear()
+    jinja.precompile()
+    assert len([f for f in os.listdir(cache.directory) if f.endswith('.cache')]) == len(TEMPLATES)
@@ -0,0 +1,70 @@
+import pytest
+from django.contrib.auth.models import User, Group
+from django.test import Client
+from hospital import models
+
+DOCTOR_PIC = 'profile_pic/DoctorProfilePic/doctor.jpg'
+PATIENT_PIC = 'profile_pic/PatientProfilePic/patient.jpg'
+BODY = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def pictures(media_root):
+    for name in (DOCTOR_PIC, PATIENT_PIC):
+        path = media_root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(BODY)
+
+def login(user):
+    client = Client()
+    client.force_login(user)
+    return client
+
+def body(response):
+    return b''.join(response.streaming_content)
+
+def test_templates_link_to_media_url(client, doctor_user, pictures):
+    client.force_login(doctor_user)
+    assert b'src="/media/' + DOCTOR_PIC.encode() in client.get('/doctor-dashboard').content
+
+def test_patient_picture_access(db, pictures, admin_user, doctor_user, patient_user):
+    other_doctor = User.objects.create_user(username='other', password='x')
+    Group.objects.get_or_create(name='DOCTOR')[0].user_set.add(other_doctor)
+    assert login(patient_user).get('/media/' + PATIENT_PIC).status_code == 200
+    assert login(doctor_user).get('/media/' + PATIENT_PIC).status_code == 200
+    assert login(admin_user).get('/media/' + PATIENT_PIC).status_code == 200
+    assert login(other_doctor).get('/media/' + PATIENT_PIC).status_code == 403
+    assert Client().get('/media/' + PATIENT_PIC).status_code == 404
+
+def test_doctor_picture_visible_to_patients(pictures, patient_user):
+    response = login(patient_user).get('/media/' + DOCTOR_PIC)
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'image/jpeg'
+    assert body(response) == BODY
+
+def test_unowned_and_escaping_paths(pictures, admin_user):
+    client = login(admin_user)
+    assert client.get('/media/profile_pic/DoctorProfilePic/missing.jpg').status_code == 404
+    assert client.get('/media/../manage.py').status_code == 404
+
+def test_range_requests(pictures, patient_user):
+    client = login(patient_user)
+    response = client.get('/media/' + PATIENT_PIC, HTTP_RANGE='bytes=10-19')
+    assert response.status_code == 206
+    assert response['Content-Range'] == 'bytes 10-19/%d' % len(BODY)
+    assert body(response) == BODY[10:20]
+    assert body(client.get('/media/' + PATIENT_PIC, HTTP_RANGE='bytes=-5')) == BODY[-5:]
+    assert client.get('/media/' + PATIENT_PIC, HTTP_RANGE='bytes=5000-').status_code == 416
+    stale = client.get('/media/' + PATIENT_PIC, HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"stale"')
+    assert stale.status_code == 200
+
+def test_conditional_get(pictures, patient_user):
+    client = login(patient_user)
+    etag = client.get('/media/' + PATIENT_PIC)['ETag']
+    assert client.get('/media/' + PATIENT_PIC, HTTP_IF_NONE_MATCH=etag).status_code == 304
+
+def test_sendfile_offload(pictures, patient_user, settings):
+    settings.MEDIA_SENDFILE = 'x-accel-redirect'
+    response = login(patient_user).get('/media/' + PATIENT_PIC)
+    assert response['X-Accel-Redirect'] == settings.MEDIA_ACCEL_PREFIX + PATIENT_PIC
+    assert response.content == b''
@@ -0,0 +1,100 @@
+import json
+import os
+import pytest
+from hospital import metrics
+
+
+@pytest.fixture
+def metrics_dir(tmp_path, settings, monkeypatch):
+    settings.METRICS_DIR = str(tmp_path)
+    settings.METRICS_TOKEN = 'secret'
+    monkeypatch.setattr(metrics, '_histograms', {})
+    monkeypatch.setattr(metrics, '_counters', {})
+    return tmp_path
+
+def scrape(client):
+    response = client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+    assert response.status_code == 200
+    assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+    return response.content.decode()
+
+def test_request_db_and_template_metrics(client, metrics_dir, doctor_user):
+    client.force_login(doctor_user)
+    client.get('/doctor-dashboard')
+    text = scrape(client)
+    assert 'hospital_request_duration_seconds_count{view="doctor-dashboard",method="GET"} 1' in text
+    assert 'hospital_db_query_duration_seconds_count{view="doctor-dashboard"}' in text
+    assert 'hospital_template_render_seconds_count{template="hospital/doctor_dashboard.html"} 1' in text
+    assert 'hospital_request_duration_seconds_bucket{view="doctor-dashboard",method="GET",le="+Inf"} 1' in text
+
+def test_unnamed_login_routes_and_password_hashing(client, metrics_dir, doctor_user):
+    client.post('/doctorlogin', {'username': 'doctor', 'password': 'doctorpass'})
+    text = scrape(client)
+    assert 'hospital_request_duration_seconds_count{view="doctorlogin",method="POST"} 1' in text
+    assert 'hospital_password_hash_seconds_count{operation="verify"} 1' in text
+    # only the fixture's create_user, the check inside verify is not counted twice
+    assert 'hospital_password_hash_seconds_count{operation="encode"} 1' in text
+
+def test_cache_hit_ratio(client, metrics_dir, patient_user):
+    client.force_login(patient_user)
+    client.get('/patient-view-doctor')
+    client.get('/patient-view-doctor')
+    text = scrape(client)
+    assert 'hospital_cache_requests_total{cache="directory",result="miss"} 1' in text
+    assert 'hospital_cache_requests_total{cache="directory",result="hit"} 1' in text
+
+def test_scrape_adds_up_process_files(client, metrics_dir):
+    metrics.observe('hospital_pdf_render_seconds', 0.2)
+    other = {'histograms': [['hospital_pdf_render_seconds', [], [0] * 7 + [2] + [0] * 6 + [0.5]]], 'counters': []}
+    (metrics_dir / '99999999.json').write_text(json.dumps(other))
+    text = scrape(client)
+    assert 'hospital_pdf_render_seconds_count 3' in text
+    assert 'hospital_pdf_render_seconds_bucket{le="0.25"} 3' in text
+    assert 'hospital_pdf_render_seconds_bucket{le="0.1"} 0' in text
+
+def test_token_required(client, metrics_dir, settings):
+    assert client.get('/metrics').status_code == 403
+    assert client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code == 403
+    settings.METRICS_TOKEN = ''
+    assert client.get('/metrics', HTTP_AUTHORIZATION='Bearer ').status_code == 403
+
+def test_scrape_with_metrics_disabled(client, metrics_dir, settings):
+    settings.METRICS_ENABLE = False
+    settings.METRICS_DIR = str(metrics_dir / 'missing')
+    assert 'hospital_pdf_render_seconds_count' not in scrape(client)
+
+def test_process_file_name_is_unique(metrics_dir, monkeypatch):
+    metrics.write()
+    first = metrics.process_name()
+    assert first.startswith('%d-' % os.getpid())
+    assert (metrics_dir / (first + '.json')).exists()
+    # a later process that gets the same pid
+    monkeypatch.setitem(metrics._process, 'pid', None)
+    monkeypatch.setitem(metrics._process, 'lock', None)
+    assert metrics.process_name() != first
+
+@pytest.mark.skipif(metrics.fcntl is None, reason='needs fcntl')
+def test_dead_workers_folded_into_archive(client, metrics_dir):
+    dead = {'histograms': [], 'counters': [['hospital_requests_shed_total', ['doctor'], 3]]}
+    for name in ('1-aaaa', '2-bbbb'):
+        (metrics_dir / (name + '.json')).write_text(json.dumps(dead))
+        (metrics_dir / (name + '.lock')).write_text('')
+    assert 'hospital_requests_shed_total{role="doctor"} 6' in scrape(client)
+    assert not (metrics_dir / '1-aaaa.json').exists() and not (metrics_dir / '2-bbbb.lock').exists()
+    assert (metrics_dir / 'archive.json').exists()
+    # this process's own file is alive and stays
+    assert (metrics_dir / (metrics.process_name() + '.json')).exists()
+    (metrics_dir / '3-cccc.json').write_text(json.dumps(dead))
+    (metrics_dir / '3-cccc.lock').write_text('')
+    assert 'hospital_requests_shed_total{role="doctor"} 9' in scrape(client)
+
+@pytest.mark.skipif(metrics.fcntl is None, reason='needs fcntl')
+def test_half_finished_fold_not_counted_twice(client, metrics_dir):
+    dead = {'histograms': [], 'counters': [['hospital_requests_shed_total', ['doctor'], 3]]}
+    (metrics_dir / '1-aaaa.json').write_text(json.dumps(dead))
+    (metrics_dir / '1-aaaa.lock').write_text('')
+    # archived, but the files were not removed
+    (metrics_dir / 'archive.json').write_text(json.dumps(dict(dead, folded=['1-aaaa'])))
+    assert 'hospital_requests_shed_total{role="doctor"} 3' in scrape(client)
+    assert not (metrics_dir / '1-aaaa.json').exists()
+    assert 'hospital_requests_shed_total{role="doctor"} 3' in scrape(client)
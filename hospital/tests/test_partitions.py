@@ -0,0 +1,95 @@
+from datetime import date, timedelta
+
+import pytest
+from django.db import connection
+from hospital import models, partitions
+
+
+def make_discharge(patientId, releaseDate):
+    return models.PatientDischargeDetails.objects.create(
+        patientId=patientId, patientName='Pat', assignedDoctorName='Doc', address='x', mobile='1', symptoms='flu',
+        admitDate=releaseDate, releaseDate=releaseDate, daySpent=0, roomCharge=0, medicineCost=0, doctorFee=0, OtherCharge=0, total=0)
+
+def test_partition_names_and_month_arithmetic():
+    assert partitions.add_months(date(2026, 11, 1), 2) == date(2027, 1, 1)
+    assert partitions.add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+    assert partitions.partition_name('hospital_appointment', date(2027, 1, 1)) == 'hospital_appointment_p2027_01'
+
+def test_partition_commands_are_noops_on_sqlite(db):
+    if partitions.is_supported():
+        return
+    assert partitions.ensure_future_partitions(3) == []
+    assert partitions.detach_old_partitions(12) == []
+
+def test_latest_discharge_prefers_recent(db):
+    recent = make_discharge(7, date.today())
+    # entered later, but released a month earlier
+    make_discharge(7, date.today() - timedelta(days=30))
+    assert models.PatientDischargeDetails.objects.latest_for_patient(7) == [recent]
+
+def test_latest_discharge_same_day(db):
+    make_discharge(7, date.today())
+    later = make_discharge(7, date.today())
+    assert models.PatientDischargeDetails.objects.latest_for_patient(7) == [later]
+
+def test_latest_discharge_finds_old_bills(db, django_assert_num_queries):
+    old = make_discharge(7, date.today() - timedelta(days=400))
+    with django_assert_num_queries(1):
+        assert models.PatientDischargeDetails.objects.latest_for_patient(7) == [old]
+    with django_assert_num_queries(1):
+        assert models.PatientDischargeDetails.objects.latest_for_patient(8) == []
+
+def test_appointment_date_is_stable(db):
+    a = models.Appointment.objects.create(doctorId=1, patientId=2, description='x')
+    booked = date.today() - timedelta(days=40)
+    models.Appointment.objects.filter(id=a.id).update(appointmentDate=booked)
+    a.refresh_from_db()
+    a.status = True
+    a.save()
+    a.refresh_from_db()
+    # approving keeps the row in its booking month's partition
+    assert a.appointmentDate == booked
+
+@pytest.mark.skipif(not partitions.is_supported(), reason='PostgreSQL only')
+def test_partition_table_round_trip(db):
+    table = 'hospital_partition_probe'
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE TABLE "%s" (id serial PRIMARY KEY, day date NOT NULL, note text)' % table)
+        cursor.execute('CREATE INDEX "%s_note" ON "%s" (note)' % (table, table))
+        cursor.execute('INSERT INTO "%s" (day, note) VALUES (%%s, %%s), (%%s, %%s)' % table,
+                       [date(2026, 1, 5), 'jan', date(2026, 2, 7), 'feb'])
+
+    partitions.partition_table(table, 'day')
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [table])
+        assert cursor.fetchone()[0] == 'p'
+        cursor.execute('SELECT count(*) FROM "%s_default"' % table)
+        assert cursor.fetchone()[0] == 2
+        cursor.execute('SELECT indexname FROM pg_indexes WHERE tablename = %s', [table])
+        assert {row[0] for row in cursor.fetchall()} == {table + '_pkey', table + '_note'}
+        # the id sequence still belongs to the table
+        cursor.execute('INSERT INTO "%s" (day, note) VALUES (%%s, %%s) RETURNING id' % table, [date(2026, 1, 9), 'new'])
+        assert cursor.fetchone()[0] == 3
+
+    assert partitions.create_partition(table, 'day', date(2026, 1, 1))
+    assert not partitions.create_partition(table, 'day', date(2026, 1, 1))
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT note FROM "%s" ORDER BY id' % partitions.partition_name(table, date(2026, 1, 1)))
+        assert [row[0] for row in cursor.fetchall()] == ['jan', 'new']
+        cursor.execute('SELECT note FROM "%s_default"' % table)
+        assert [row[0] for row in cursor.fetchall()] == ['feb']
+
+    partitions.unpartition_table(table, 'day')
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [table])
+        assert cursor.fetchone()[0] == 'r'
+        cursor.execute('SELECT note FROM "%s" ORDER BY id' % table)
+        assert [row[0] for row in cursor.fetchall()] == ['jan', 'feb', 'new']
+
+@pytest.mark.skipif(not partitions.is_supported(), reason='PostgreSQL only')
+def test_migrated_tables_are_partitioned(db):
+    with connection.cursor() as cursor:
+        for table in partitions.PARTITIONED_TABLES:
+            cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [table])
+            assert cursor.fetchone()[0] == 'p'
+            assert table + '_default' in partitions.attached_partitions(table)
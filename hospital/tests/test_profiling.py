@@ -0,0 +1,66 @@
+import time
+import pytest
+from hospital import profiling
+
+
+@pytest.fixture
+def profile_dir(tmp_path, settings):
+    settings.PROFILE_DIR = str(tmp_path)
+    return tmp_path
+
+def test_unsampled_requests_are_not_profiled(client, profile_dir):
+    client.get('/')
+    assert list(profile_dir.iterdir()) == []
+
+def test_signed_header_profiles_request(client, profile_dir):
+    client.get('/aboutus', HTTP_X_PROFILE_TOKEN=profiling.make_token())
+    [capture] = profiling.captures()
+    assert capture['path'] == '/aboutus' and capture['status'] == 200 and capture['mode'] == 'cprofile'
+    assert (profile_dir / capture['file']).stat().st_size > 0
+
+def test_forged_header_ignored(client, profile_dir):
+    client.get('/aboutus', HTTP_X_PROFILE_TOKEN='profile:forged:token')
+    assert profiling.captures() == []
+
+def test_sampler_mode_writes_collapsed_file(client, profile_dir, settings):
+    settings.PROFILE_SAMPLE_RATE = 1
+    settings.PROFILE_MODE = 'sampler'
+    client.get('/aboutus')
+    [capture] = profiling.captures()
+    assert capture['file'].endswith('.collapsed')
+    assert (profile_dir / capture['file']).exists()
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def test_sampler_collapses_stacks(tmp_path):
+    sampler = profiling.StackSampler(0.001)
+    sampler.start()
+    busy_wait(0.05)
+    sampler.stop()
+    sampler.write(str(tmp_path / 'out.collapsed'))
+    lines = (tmp_path / 'out.collapsed').read_text().splitlines()
+    stack, count = lines[0].rsplit(' ', 1)
+    assert int(count) > 0
+    assert stack.split(';')[-1].startswith('busy_wait ')
+
+def test_ring_keeps_newest(client, profile_dir, settings):
+    settings.PROFILE_SAMPLE_RATE = 1
+    settings.PROFILE_KEEP = 2
+    for _ in range(4):
+        client.get('/aboutus')
+    assert len(profiling.captures()) == 2
+    assert len(list(profile_dir.iterdir())) == 4
+
+def test_admin_lists_and_downloads_captures(client, profile_dir, admin_user, doctor_user):
+    client.get('/aboutus', HTTP_X_PROFILE_TOKEN=profiling.make_token())
+    [capture] = profiling.captures()
+    client.force_login(doctor_user)
+    assert client.get('/admin-profiles').status_code == 302
+    client.force_login(admin_user)
+    response = client.get('/admin-profiles')
+    assert capture['file'].encode() in response.content
+    assert client.get('/admin-profiles/' + capture['id']).status_code == 200
+    assert client.get('/admin-profiles/nope').status_code == 404
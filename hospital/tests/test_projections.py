@@ -0,0 +1,52 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from hospital import models
+
+
+def make_patients(n, status=True):
+    start = models.Patient.all_objects.count()
+    for i in range(start, start + n):
+        user = User.objects.create_user(username='p%d' % i, password='pass', first_name='First%d' % i, last_name='Last%d' % i)
+        models.Patient.objects.create(user=user, status=status, profile_pic='profile_pic/PatientProfilePic/p%d.jpg' % i, mobile=str(i), address='a', symptoms='s')
+
+def test_rows_only_holds_projected_fields(patient_user):
+    rows = models.Patient.objects.filter(user=patient_user).rows('id', 'profile_pic', 'mobile')
+    assert rows == [{
+        'id': models.Patient.objects.get(user=patient_user).id,
+        'profile_pic': 'profile_pic/PatientProfilePic/patient.jpg',
+        'mobile': '456',
+        'get_name': 'Pat Ient',
+        'thumbnail': '/media/profile_pic/PatientProfilePic/patient.jpg',
+    }]
+
+def test_rows_without_picture(doctor_user):
+    assert models.Doctor.objects.rows('department') == [{'department': 'Cardiologist', 'get_name': 'Doc Tor'}]
+
+def test_rows_hides_soft_deleted(db):
+    make_patients(2)
+    models.Patient.objects.filter(mobile='0').update(is_deleted=True)
+    assert [r['get_name'] for r in models.Patient.objects.rows('id')] == ['First1 Last1']
+
+def list_page_queries(client, url):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(queries), response
+
+def test_list_pages_query_count_does_not_grow(client, admin_user):
+    client.force_login(admin_user)
+    urls = ('/admin-view-patient', '/admin-discharge-patient', '/admin-dashboard')
+    make_patients(1)
+    few = [list_page_queries(client, url)[0] for url in urls]
+    make_patients(20)
+    for url, expected in zip(urls, few):
+        count, response = list_page_queries(client, url)
+        assert count <= expected
+        assert b'First19 Last19' in response.content
+
+def test_list_page_shows_picture(client, admin_user, patient_user):
+    client.force_login(admin_user)
+    response = client.get('/admin-view-patient')
+    assert b'src="/media/profile_pic/PatientProfilePic/patient.jpg"' in response.content
+    assert b'Pat Ient' in response.content
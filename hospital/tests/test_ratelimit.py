@@ -0,0 +1,113 @@
+import timeit
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.test import RequestFactory
+from hospital import ratelimit
+
+
+def login_attempt(client, username, ip='10.0.0.1'):
+    return client.post('/doctorlogin', {'username': username, 'password': 'wrong'}, REMOTE_ADDR=ip)
+
+def test_login_limited_per_address(db, client, settings):
+    settings.RATE_LIMITS = dict(settings.RATE_LIMITS, login={'rate': '1/m', 'burst': 3, 'methods': ['POST'], 'keys': ['ip']})
+    statuses = [login_attempt(client, 'user%d' % i).status_code for i in range(4)]
+    assert statuses == [200, 200, 200, 429]
+    response = login_attempt(client, 'other')
+    assert 0 < int(response['Retry-After']) <= 60
+    # another address has its own bucket, and showing the form is free
+    assert login_attempt(client, 'other', ip='10.0.0.2').status_code == 200
+    assert client.get('/doctorlogin', REMOTE_ADDR='10.0.0.1').status_code == 200
+
+def test_login_limited_per_account_across_addresses(db, client, settings):
+    settings.RATE_LIMITS = dict(settings.RATE_LIMITS, login={'rate': '1/m', 'burst': 2, 'methods': ['POST'], 'keys': ['ip', 'user']})
+    assert login_attempt(client, 'doctor', ip='10.0.0.1').status_code == 200
+    assert login_attempt(client, 'Doctor', ip='10.0.0.2').status_code == 200
+    assert login_attempt(client, 'doctor', ip='10.0.0.3').status_code == 429
+
+def test_search_limited_per_user(client, settings, doctor_user):
+    settings.RATE_LIMITS = dict(settings.RATE_LIMITS, search={'rate': '1/m', 'burst': 1, 'methods': ['GET'], 'keys': ['user']})
+    client.force_login(doctor_user)
+    assert client.get('/search', {'query': 'a'}).status_code == 200
+    assert client.get('/search', {'query': 'a'}).status_code == 429
+
+def test_shared_cache_backend(db, client, settings):
+    settings.RATELIMIT_BACKEND = 'hospital.ratelimit.CacheBackend'
+    settings.RATE_LIMITS = dict(settings.RATE_LIMITS, signup={'rate': '1/h', 'burst': 1, 'methods': ['POST'], 'keys': ['ip']})
+    assert client.post('/patientsignup', {}).status_code != 429
+    assert client.post('/patientsignup', {}).status_code == 429
+
+def test_disabled(db, client, settings):
+    settings.RATELIMIT_ENABLE = False
+    settings.RATE_LIMITS = dict(settings.RATE_LIMITS, contact={'rate': '1/h', 'burst': 1, 'methods': ['POST'], 'keys': ['ip']})
+    for _ in range(3):
+        assert client.post('/contactus', {}).status_code == 200
+
+def test_tokens_refill():
+    policy = ratelimit.Policy('test', '1/s', 1)
+    backend = ratelimit.LocalBackend()
+    assert backend.take('k', policy, 100.0) == 0
+    assert backend.take('k', policy, 100.5) == 0.5
+    assert backend.take('k', policy, 101.0) == 0
+
+def test_hot_path_under_50_microseconds(settings):
+    # a policy loose enough never to refuse, the cost measured is the check itself
+    settings.RATE_LIMITS = dict(settings.RATE_LIMITS, search={'rate': '1000000/s', 'burst': 1000000, 'methods': ['GET'], 'keys': ['ip', 'user']})
+    request = RequestFactory().get('/searchdoctor', {'query': 'x'})
+    request.user = AnonymousUser()
+    runs = min(timeit.repeat(lambda: ratelimit.check(request, 'search'), number=2000, repeat=5))
+    assert runs / 2000 < 50e-6
+
+def test_refused_account_refunds_address_token(db, client, settings):
+    settings.RATE_LIMITS = dict(settings.RATE_LIMITS, login={'rate': '1/m', 'burst': 2, 'methods': ['POST'], 'keys': ['ip', 'user']})
+    settings.RATELIMIT_BACKEND = 'hospital.ratelimit.LocalBackend'
+    assert login_attempt(client, 'doctor').status_code == 200
+    assert login_attempt(client, 'doctor').status_code == 200
+    # someone hammering the doctor's account is refused by the account bucket
+    for _ in range(3):
+        assert login_attempt(client, 'doctor', ip='10.0.0.9').status_code == 429
+    # without spending that address's tokens
+    assert login_attempt(client, 'nurse', ip='10.0.0.9').status_code == 200
+    assert login_attempt(client, 'porter', ip='10.0.0.9').status_code == 200
+    assert login_attempt(client, 'cleaner', ip='10.0.0.9').status_code == 429
+
+def test_workers_split_the_rate(settings, monkeypatch):
+    monkeypatch.setenv('WEB_CONCURRENCY', '5')
+    ratelimit._state.clear()
+    backend = ratelimit.get_backend()
+    assert isinstance(backend, ratelimit.LocalBackend) and backend.workers == 5
+    # 10 a second over five workers: two each, refilling every half second
+    policy = ratelimit.Policy('test', '10/s', 10)
+    assert [backend.take('k', policy, 100.0) for _ in range(3)] == [0, 0, 0.5]
+    assert backend.take('k', policy, 100.5) == 0
+    # a burst smaller than the worker count still lets one through
+    small = ratelimit.Policy('small', '1/s', 2)
+    assert backend.take('s', small, 100.0) == 0
+    assert backend.take('s', small, 100.0) > 0
+    ratelimit._state.clear()
+
+def test_hot_path_with_several_workers(settings, monkeypatch):
+    # what manage.py serve runs: WEB_CONCURRENCY set and the default backend
+    monkeypatch.setenv('WEB_CONCURRENCY', '9')
+    ratelimit._state.clear()
+    settings.RATE_LIMITS = dict(settings.RATE_LIMITS, search={'rate': '1000000/s', 'burst': 1000000, 'methods': ['GET'], 'keys': ['ip', 'user']})
+    request = RequestFactory().get('/searchdoctor', {'query': 'x'})
+    request.user = AnonymousUser()
+    runs = min(timeit.repeat(lambda: ratelimit.check(request, 'search'), number=2000, repeat=5))
+    assert runs / 2000 < 50e-6
+    ratelimit._state.clear()
+
+def test_cache_backend_counts_windows(settings):
+    settings.RATELIMIT_BACKEND = 'hospital.ratelimit.CacheBackend'
+    backend = ratelimit.get_backend()
+    assert backend.cache is caches['ratelimit']
+    policy = ratelimit.Policy('test', '1/s', 2)
+    assert backend.take('k', policy, 100.0) == 0
+    assert backend.take('k', policy, 100.5) == 0
+    assert backend.take('k', policy, 101.0) == 1.0
+    backend.refund('k', policy, 101.0)
+    assert backend.take('k', policy, 101.0) == 0
+    # the next window starts empty
+    assert backend.take('k', policy, 102.0) == 0
+
+def test_ratelimit_cache_does_not_cull_live_windows(settings):
+    assert caches['ratelimit']._max_entries >= 100000
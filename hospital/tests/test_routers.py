@@ -0,0 +1,62 @@
+import time
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from hospital import models, routers
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    monkeypatch.setattr(routers, 'replica_healthy', lambda alias: True)
+    with override_settings(DATABASE_REPLICA_ALIAS='replica'):
+        yield
+
+def route(request, write=False):
+    router = routers.PrimaryReplicaRouter()
+    seen = {}
+    def view(request):
+        seen['before'] = router.db_for_read(models.Doctor)
+        if write:
+            router.db_for_write(models.Doctor)
+            seen['after'] = router.db_for_read(models.Doctor)
+        return HttpResponse()
+    response = routers.ReplicaRoutingMiddleware(view)(request)
+    return seen, response
+
+def test_get_reads_from_replica(replica):
+    seen, response = route(RequestFactory().get('/admin-dashboard'))
+    assert seen['before'] == 'replica'
+    assert routers.STICKY_COOKIE not in response.cookies
+
+def test_post_reads_from_primary_and_sets_sticky_cookie(replica):
+    seen, response = route(RequestFactory().post('/patient-book-appointment'))
+    assert seen['before'] == 'default'
+    assert routers.STICKY_COOKIE in response.cookies
+
+def test_write_inside_get_pins_rest_of_request(replica):
+    seen, response = route(RequestFactory().get('/approve-doctor/1'), write=True)
+    assert (seen['before'], seen['after']) == ('replica', 'default')
+    assert routers.STICKY_COOKIE in response.cookies
+
+def test_sticky_cookie_reads_from_primary(replica):
+    request = RequestFactory().get('/patient-view-appointment')
+    request.COOKIES[routers.STICKY_COOKIE] = str(int(time.time()) + 5)
+    assert route(request)[0]['before'] == 'default'
+    request.COOKIES[routers.STICKY_COOKIE] = str(int(time.time()) - 1)
+    assert route(request)[0]['before'] == 'replica'
+
+def test_lagging_replica_falls_back_to_primary(monkeypatch):
+    monkeypatch.setattr(routers, 'measure_lag', lambda alias: 30.0)
+    monkeypatch.setitem(routers._lag_cache, 'checked', 0.0)
+    with override_settings(DATABASE_REPLICA_ALIAS='replica'):
+        assert route(RequestFactory().get('/admin-dashboard'))[0]['before'] == 'default'
+
+def test_outside_requests_use_primary(replica):
+    router = routers.PrimaryReplicaRouter()
+    assert router.db_for_read(models.Doctor) == 'default'
+    with routers.read_from_replica():
+        assert router.db_for_read(models.Doctor) == 'replica'
+
+def test_no_replica_configured():
+    seen, response = route(RequestFactory().get('/admin-dashboard'))
+    assert seen['before'] == 'default'
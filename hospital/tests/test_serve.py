@@ -0,0 +1,53 @@
+from django.core.management import call_command
+from hospital import audit, metrics, warmup
+from hospital.directory import get_directory
+from hospital.management.commands import serve
+
+
+class Connections:
+    # closing the test database connection would end the test transaction
+    closed = False
+
+    def close_all(self):
+        self.closed = True
+
+def test_warm_fills_caches_and_closes_connections(doctor_user, monkeypatch, django_assert_num_queries):
+    connections = Connections()
+    monkeypatch.setattr(warmup, 'connections', connections)
+    timings = warmup.warm()
+    assert set(timings) == {'urls', 'templates', 'directory'}
+    assert timings['urls'][0] > 0 and timings['templates'][0] > 0
+    assert connections.closed
+    with django_assert_num_queries(0):
+        assert [d['user_id'] for d in get_directory()] == [doctor_user.id]
+
+def test_warm_survives_a_failing_step(db, monkeypatch):
+    monkeypatch.setattr(warmup, 'connections', Connections())
+    monkeypatch.setattr(warmup, 'warm_urls', lambda: 1 / 0)
+    assert set(warmup.warm()) == {'templates', 'directory'}
+
+def test_workers_follow_cores(settings, monkeypatch):
+    settings.SERVE_MAX_WORKERS = 16
+    assert serve.default_workers(1) == 3
+    assert serve.default_workers(4) == 9
+    assert serve.default_workers(4, asgi=True) == 4
+    assert serve.default_workers(64) == 16
+    # a container limited to 1.5 CPUs on a large host
+    monkeypatch.setattr(serve.os, 'sched_getaffinity', lambda pid: set(range(32)), raising=False)
+    monkeypatch.setattr(serve, 'cgroup_cores', lambda: 1.5)
+    assert serve.available_cores() == 2
+    monkeypatch.setattr(serve, 'cgroup_cores', lambda: 0.2)
+    assert serve.available_cores() == 1
+
+def test_check_prints_configuration(settings, capsys):
+    call_command('serve', '--check', '--workers', '5', '--threads', '4')
+    out = capsys.readouterr().out
+    assert 'workers: 5' in out and 'worker_class: gthread' in out and 'threads: 4' in out
+    assert 'preload_app: True' in out and 'warm: yes' in out
+
+def test_forked_worker_starts_from_zero(db):
+    metrics.inc('hospital_cache_requests_total', ('directory', 'miss'))
+    audit.record('test', ('patient', 1))
+    serve.post_fork(None, None)
+    assert metrics.snapshot()['counters'] == []
+    assert audit.pending() == 0
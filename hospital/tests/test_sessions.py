@@ -0,0 +1,82 @@
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from hospital import sessions
+
+
+def session_queries(client, path):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.get(path)
+    assert response.status_code == 200
+    return [q['sql'] for q in ctx.captured_queries if 'django_session' in q['sql']]
+
+@override_settings(SESSION_ENGINE='hospital.sessions')
+def test_signed_cookie_sessions_cost_no_session_queries(doctor_user):
+    client = Client()
+    client.force_login(doctor_user)
+    assert session_queries(client, '/doctor-view-patient') == []
+
+@override_settings(SESSION_ENGINE='django.contrib.sessions.backends.cached_db', SESSION_CACHE_ALIAS='default')
+def test_cached_db_sessions_cost_no_session_queries(doctor_user):
+    client = Client()
+    client.force_login(doctor_user)
+    assert session_queries(client, '/doctor-view-patient') == []
+
+def test_login_stores_role_and_profile(client, doctor_user):
+    client.force_login(doctor_user)
+    session = client.session
+    assert session[sessions.ROLE_KEY] == 'DOCTOR'
+    assert session[sessions.PROFILE_KEY] == doctor_user.doctor.id
+
+def test_role_from_session_skips_group_query(client, doctor_user, django_assert_max_num_queries):
+    client.force_login(doctor_user)
+    client.get('/doctor-patient')
+    # session, user and the doctor for the sidebar
+    with django_assert_max_num_queries(3):
+        client.get('/doctor-patient')
+
+@override_settings(SESSION_SIGNING_KEY='old-key', SESSION_SIGNING_FALLBACK_KEYS=[])
+def make_old_cookie():
+    store = sessions.SessionStore()
+    store['hospital_role'] = 'ADMIN'
+    store.save()
+    return store.session_key
+
+def test_signing_key_rotation():
+    old_cookie = make_old_cookie()
+    with override_settings(SESSION_SIGNING_KEY='new-key', SESSION_SIGNING_FALLBACK_KEYS=['old-key']):
+        store = sessions.SessionStore(old_cookie)
+        assert store['hospital_role'] == 'ADMIN'
+        assert store.modified
+        store.save()
+        assert store.session_key != old_cookie
+    with override_settings(SESSION_SIGNING_KEY='new-key', SESSION_SIGNING_FALLBACK_KEYS=[]):
+        assert sessions.SessionStore(store.session_key)['hospital_role'] == 'ADMIN'
+        assert 'hospital_role' not in sessions.SessionStore(old_cookie)
+
+def test_tampered_cookie_is_rejected():
+    cookie = make_old_cookie()
+    with override_settings(SESSION_SIGNING_KEY='old-key'):
+        assert sessions.SessionStore(cookie[:-2] + 'xx').load() == {}
+
+def test_session_without_role_gets_one(client, doctor_user, django_assert_max_num_queries):
+    client.force_login(doctor_user)
+    # a session from before roles were stored
+    session = client.session
+    del session[sessions.ROLE_KEY]
+    del session[sessions.PROFILE_KEY]
+    session.save()
+    assert client.get('/doctor-patient').status_code == 200
+    session = client.session
+    assert session[sessions.ROLE_KEY] == 'DOCTOR'
+    assert session[sessions.PROFILE_KEY] == doctor_user.doctor.id
+    with django_assert_max_num_queries(3):
+        client.get('/doctor-patient')
+
+def test_sidebar_profile_by_stored_id(client, doctor_user):
+    client.force_login(doctor_user)
+    with CaptureQueriesContext(connection) as ctx:
+        client.get('/doctor-patient')
+    doctor_queries = [q['sql'] for q in ctx.captured_queries if 'FROM "hospital_doctor"' in q['sql']]
+    assert len(doctor_queries) == 1
+    assert '"hospital_doctor"."id" = %d' % doctor_user.doctor.id in doctor_queries[0]
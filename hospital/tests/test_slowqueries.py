@@ -0,0 +1,91 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from hospital import models, slowqueries
+
+
+@pytest.fixture
+def log_everything(settings, transactional_db):
+    # every statement counts as slow; saved by another thread, so it has to commit
+    settings.SLOW_QUERY_MS = 0
+    settings.SLOW_QUERY_EXPLAIN_RATE = 1
+    yield
+    # saved before the tables are emptied for the next test
+    settings.SLOW_QUERY_MS = None
+    slowqueries.drain(10)
+
+def test_slow_queries_logged_with_call_site_and_plan(client, doctor_user, log_everything):
+    client.force_login(doctor_user)
+    client.get('/search', {'query': 'cough'})
+    assert slowqueries.drain(10)
+    logged = models.SlowQuery.objects.filter(function='search_view')
+    assert logged.exists()
+    query = logged.filter(sql__contains='hospital_patient').first()
+    assert query.call_site.startswith('hospital/views.py:')
+    # joined to auth_user, so no plan
+    assert not query.plan
+    models.Appointment.objects.filter(status=False).exists()
+    assert slowqueries.drain(10)
+    assert models.SlowQuery.objects.filter(sql__contains='hospital_appointment').exclude(plan='').exists()
+
+def test_fast_queries_not_logged(client, doctor_user, settings):
+    settings.SLOW_QUERY_MS = 10000
+    client.force_login(doctor_user)
+    client.get('/search', {'query': 'cough'})
+    assert not models.SlowQuery.objects.exists()
+
+def test_plans_are_sampled(client, doctor_user, log_everything, settings):
+    settings.SLOW_QUERY_EXPLAIN_RATE = 0
+    client.force_login(doctor_user)
+    client.get('/search', {'query': 'cough'})
+    assert slowqueries.drain(10)
+    assert not models.SlowQuery.objects.exclude(plan='').exists()
+
+def test_table_is_bounded(doctor_user, log_everything, settings):
+    settings.SLOW_QUERY_KEEP = 10
+    for _ in range(120):
+        models.Doctor.objects.filter(department='x').exists()
+    assert slowqueries.drain(10)
+    assert models.SlowQuery.objects.count() <= 10 + 50
+
+def test_nothing_written_on_the_calling_thread(doctor_user, log_everything):
+    with CaptureQueriesContext(connection) as queries:
+        models.Doctor.objects.filter(department='x').exists()
+    assert len(queries) == 1
+    assert slowqueries.drain(10)
+    assert models.SlowQuery.objects.filter(sql__contains='hospital_doctor').exists()
+
+def test_replica_queries_saved_on_the_write_database(log_everything):
+    class ReplicaConnection:
+        alias = 'replica'
+    slowqueries.record(ReplicaConnection(), 'UPDATE x SET y = 1', None, 0.5)
+    assert slowqueries.drain(10)
+    assert models.SlowQuery.objects.get(sql='UPDATE x SET y = 1').database == 'replica'
+
+def test_full_queue_drops_queries(log_everything, settings, monkeypatch):
+    monkeypatch.setattr(slowqueries, '_worker', {'pid': None, 'queue': None})
+    settings.SLOW_QUERY_QUEUE = 1
+    release = slowqueries.threading.Event()
+    monkeypatch.setattr(slowqueries, 'save', lambda *item: release.wait())
+    try:
+        for _ in range(3):
+            slowqueries.record(connection, 'SELECT 1', None, 0.5)
+        assert slowqueries.get_queue().qsize() <= 1
+    finally:
+        release.set()
+    assert slowqueries.drain(10)
+
+def test_credentials_never_stored(doctor_user, log_everything):
+    doctor_user.set_password('newsecret')
+    doctor_user.save()
+    from django.contrib.sessions.backends.db import SessionStore
+    session = SessionStore()
+    session['x'] = 1
+    session.create()
+    SessionStore(session.session_key).load()
+    assert slowqueries.drain(10)
+    logged = models.SlowQuery.objects.filter(sql__contains='"auth_user"')
+    assert logged.filter(sql__startswith='UPDATE').exists()
+    stored = ' '.join(q.sql + q.plan for q in models.SlowQuery.objects.all())
+    assert doctor_user.password not in stored and session.session_key not in stored
+    assert not models.SlowQuery.objects.filter(sql__contains='"django_session"').exclude(plan='').exists()
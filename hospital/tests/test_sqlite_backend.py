@@ -0,0 +1,93 @@
+import sqlite3
+
+import pytest
+from django.db import connection
+
+from hospital.backends.sqlite3 import base
+
+pytestmark = pytest.mark.skipif(connection.vendor != 'sqlite', reason='SQLite backend')
+
+
+@pytest.fixture
+def tuned(db, tmp_path):
+    path = str(tmp_path / 'clinic.sqlite3')
+    wrapper = base.DatabaseWrapper(dict(connection.settings_dict, NAME=path), alias='tuned')
+    with wrapper.cursor() as cursor:
+        cursor.execute('CREATE TABLE visit (id INTEGER PRIMARY KEY, note TEXT)')
+    yield wrapper
+    wrapper.close()
+
+def begin(wrapper):
+    # what transaction.atomic() does for the outermost block
+    wrapper.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+
+def end(wrapper):
+    wrapper.commit()
+    wrapper.set_autocommit(True)
+
+def other_writer(wrapper):
+    return sqlite3.connect(wrapper.settings_dict['NAME'], timeout=0)
+
+def test_pragmas_applied(tuned, settings):
+    with tuned.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        assert cursor.fetchone()[0] == 'wal'
+        cursor.execute('PRAGMA synchronous')
+        assert cursor.fetchone()[0] == 1
+        cursor.execute('PRAGMA busy_timeout')
+        assert cursor.fetchone()[0] == settings.SQLITE_PRAGMAS['busy_timeout']
+
+def test_transactions_take_write_lock_up_front(tuned):
+    begin(tuned)
+    other = other_writer(tuned)
+    # nothing written yet, but the write lock is already held
+    with pytest.raises(sqlite3.OperationalError, match='locked'):
+        other.execute('BEGIN IMMEDIATE')
+    end(tuned)
+    other.execute('BEGIN IMMEDIATE')
+    other.rollback()
+    other.close()
+
+def test_deferred_when_disabled(tuned, settings):
+    settings.SQLITE_IMMEDIATE = False
+    begin(tuned)
+    other = other_writer(tuned)
+    other.execute('BEGIN IMMEDIATE')
+    other.rollback()
+    other.close()
+    end(tuned)
+
+@pytest.mark.skipif(base.fcntl is None, reason='needs fcntl')
+def test_single_writer_lock(tuned, settings):
+    settings.SQLITE_WRITE_LOCK = True
+    lock_path = tuned.settings_dict['NAME'] + '-writer.lock'
+
+    def lock_free():
+        with open(lock_path, 'a') as f:
+            try:
+                base.fcntl.flock(f, base.fcntl.LOCK_EX | base.fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            base.fcntl.flock(f, base.fcntl.LOCK_UN)
+            return True
+
+    begin(tuned)
+    with tuned.cursor() as cursor:
+        cursor.execute("INSERT INTO visit (note) VALUES ('in transaction')")
+    assert not lock_free()
+    end(tuned)
+    assert lock_free()
+    # writes outside a transaction hold it only for the statement
+    with tuned.cursor() as cursor:
+        cursor.execute("INSERT INTO visit (note) VALUES ('autocommit')")
+        cursor.execute('SELECT count(*) FROM visit')
+        assert cursor.fetchone()[0] == 2
+    assert lock_free() and not tuned.holds_writer_lock
+
+def test_rollback_releases_writer_lock(tuned, settings):
+    settings.SQLITE_WRITE_LOCK = True
+    begin(tuned)
+    assert tuned.holds_writer_lock
+    tuned.rollback()
+    tuned.set_autocommit(True)
+    assert not tuned.holds_writer_lock
@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from hospital.management.commands import startup_profile
+from hospital.management.commands.startup_profile import parse_importtime
+
+# generous ceiling for slow CI machines, a cold start takes ~0.4s locally
+IMPORT_BUDGET_SECONDS = 2.5
+HEAVY_MODULES = ['xhtml2pdf', 'reportlab', 'psycopg2']
+
+COLD_START = '''
+import json, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+import hospital.views, hospital.api, hospitalmanagement.urls
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+''' % HEAVY_MODULES
+
+def cold_start():
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE='hospitalmanagement.settings', USE_SQLITE='1')
+    out = subprocess.run([sys.executable, '-c', COLD_START], cwd=settings.BASE_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def test_cold_start_skips_heavy_imports():
+    assert cold_start()['loaded'] == []
+
+def test_cold_start_import_budget():
+    elapsed = min(cold_start()['elapsed'] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET_SECONDS
+
+def test_parse_importtime():
+    stderr = ('import time: self [us] | cumulative | imported package\n'
+              'import time:       120 |        120 |   hospital.models\n'
+              'import time:        80 |        200 | hospital\n')
+    assert parse_importtime(stderr) == [('   hospital.models', 120, 120), (' hospital', 80, 200)]
+
+def fake_run(returncode, stderr):
+    return lambda *args, **kwargs: subprocess.CompletedProcess(args, returncode, '', stderr)
+
+def test_startup_profile_without_output(monkeypatch):
+    monkeypatch.setattr(startup_profile.subprocess, 'run', fake_run(1, ''))
+    with pytest.raises(CommandError, match='exit status 1'):
+        call_command('startup_profile')
+    monkeypatch.setattr(startup_profile.subprocess, 'run', fake_run(0, ''))
+    with pytest.raises(CommandError, match='No -X importtime output'):
+        call_command('startup_profile', '--packages')
+
+def test_startup_profile_zero_time_modules(monkeypatch, capsys):
+    stderr = 'import time: self [us] | cumulative | imported package\nimport time:         0 |          0 | tiny\n'
+    monkeypatch.setattr(startup_profile.subprocess, 'run', fake_run(0, stderr))
+    call_command('startup_profile', '--packages')
+    out = capsys.readouterr().out
+    assert out.startswith('Cold start imports: 1 modules, 0.0 ms\n%10s' % 'self ms')
+    assert 'tiny' in out
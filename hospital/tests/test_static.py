@@ -0,0 +1,50 @@
+import gzip
+import json
+import pytest
+from django.core.management import call_command
+from hospital import storage
+
+
+@pytest.fixture
+def collected(tmp_path, settings):
+    settings.STATIC_ROOT = str(tmp_path)
+    settings.STATICFILES_STORAGE = 'hospital.storage.CompressedManifestStaticFilesStorage'
+    call_command('collectstatic', interactive=False, verbosity=0)
+    manifest = json.loads((tmp_path / 'staticfiles.json').read_text())['paths']
+    return tmp_path, manifest
+
+def test_collectstatic_writes_hashed_and_compressed_copies(collected):
+    root, manifest = collected
+    hashed = manifest['style.css']
+    assert hashed != 'style.css'
+    assert gzip.decompress((root / (hashed + '.gz')).read_bytes()) == (root / hashed).read_bytes()
+    # images are not worth compressing again
+    assert not (root / (manifest['images/bg.jpg'] + '.gz')).exists()
+
+def test_hashed_file_served_compressed_and_immutable(client, collected):
+    _, manifest = collected
+    response = client.get('/static/' + manifest['style.css'], HTTP_ACCEPT_ENCODING='gzip, deflate')
+    assert response.status_code == 200
+    assert response['Content-Encoding'] == 'gzip'
+    assert response['Content-Type'].startswith('text/css')
+    assert response['Vary'] == 'Accept-Encoding'
+    assert response['Cache-Control'] == storage.IMMUTABLE
+    again = client.get('/static/' + manifest['style.css'], HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+    assert again.status_code == 304
+
+def test_identity_when_compression_refused(client, collected):
+    _, manifest = collected
+    response = client.get('/static/' + manifest['style.css'], HTTP_ACCEPT_ENCODING='gzip;q=0')
+    assert response.status_code == 200
+    assert not response.has_header('Content-Encoding')
+
+def test_unhashed_name_gets_short_cache(client, collected, settings):
+    response = client.get('/static/style.css')
+    assert response['Cache-Control'] == 'public, max-age=%d' % settings.STATIC_MAX_AGE
+
+def test_missing_and_escaping_paths_fall_through(client, collected):
+    assert client.get('/static/nope.css').status_code == 404
+    assert client.get('/static/../manage.py').status_code == 404
+
+def test_accepted_encodings():
+    assert storage.accepted_encodings('br;q=1.0, gzip;q=0, identity') == {'br', 'identity'}
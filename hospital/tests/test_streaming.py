@@ -0,0 +1,44 @@
+from django.http import StreamingHttpResponse
+from hospital import models
+
+
+def make_appointments(n):
+    models.Appointment.objects.bulk_create([
+        models.Appointment(doctorId=1, patientId=2, doctorName='Doc', patientName='Pat%d' % i, description='visit %d' % i, status=True)
+        for i in range(n)
+    ])
+
+def test_appointments_page_streams_all_rows(client, admin_user, settings):
+    settings.STREAM_BATCH_SIZE = 2
+    make_appointments(5)
+    client.force_login(admin_user)
+    response = client.get('/admin-view-appointment')
+    assert isinstance(response, StreamingHttpResponse)
+    chunks = list(response.streaming_content)
+    # head, three batches of rows, tail
+    assert len(chunks) == 5
+    assert chunks[1].count(b'<tr>') == 2 and chunks[3].count(b'<tr>') == 1
+    content = b''.join(chunks)
+    assert content.index(b'<thead>') < content.index(b'Pat0') < content.index(b'Pat4') < content.index(b'</table>')
+    assert b'streamed-rows' not in content
+
+def test_first_chunk_needs_no_query(client, admin_user, django_assert_num_queries):
+    make_appointments(3)
+    client.force_login(admin_user)
+    response = client.get('/admin-view-appointment')
+    chunks = iter(response.streaming_content)
+    with django_assert_num_queries(0):
+        head = next(chunks)
+    assert b'Appointments' in head and b'Pat0' not in head
+    assert b'Pat2' in b''.join(chunks)
+
+def test_rows_are_escaped(client, admin_user):
+    models.Appointment.objects.create(doctorId=1, patientId=2, doctorName='Doc', patientName='<b>x</b>', description='d', status=True)
+    client.force_login(admin_user)
+    content = b''.join(client.get('/admin-view-appointment').streaming_content)
+    assert b'&lt;b&gt;x&lt;/b&gt;' in content
+
+def test_empty_table(client, admin_user):
+    client.force_login(admin_user)
+    content = b''.join(client.get('/admin-view-appointment').streaming_content)
+    assert b'<thead>' in content and b'<td>' not in content
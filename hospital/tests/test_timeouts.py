@@ -0,0 +1,63 @@
+import time
+
+import pytest
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from hospital import metrics
+from hospital.timeouts import statement_timeout
+
+
+def slow_sql():
+    if connection.vendor == 'postgresql':
+        return 'SELECT pg_sleep(5)'
+    return 'WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x+1 FROM c WHERE x < 100000000) SELECT count(*) FROM c'
+
+@statement_timeout('test')
+def slow_view(request):
+    with connection.cursor() as cursor:
+        cursor.execute(slow_sql())
+    return HttpResponse('done')
+
+@statement_timeout('test')
+def fast_view(request):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        return HttpResponse(str(cursor.fetchone()[0]))
+
+@statement_timeout('test')
+def broken_view(request):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT * FROM no_such_table')
+
+@pytest.fixture
+def timeouts(settings, rf, admin_user):
+    settings.STATEMENT_TIMEOUTS = {'test': 0.2}
+    request = rf.get('/')
+    request.user = admin_user
+    return request
+
+def test_slow_statement_is_cut_short(timeouts):
+    started = time.monotonic()
+    response = slow_view(timeouts)
+    assert time.monotonic() - started < 3
+    assert response.status_code == 503
+    assert b'taking too long' in response.content
+    assert metrics._counters[('hospital_statement_timeouts_total', ('unresolved',))] >= 1
+    # the connection is still usable afterwards
+    assert fast_view(timeouts).content == b'1'
+
+def test_fast_view_unaffected(timeouts):
+    assert fast_view(timeouts).content == b'1'
+
+def test_other_errors_propagate(timeouts):
+    with pytest.raises(DatabaseError):
+        broken_view(timeouts)
+
+def test_group_without_timeout(timeouts, settings):
+    settings.STATEMENT_TIMEOUTS = {}
+    assert fast_view(timeouts).content == b'1'
+
+def test_search_views_have_a_timeout(client, doctor_user, patient_user, settings):
+    assert settings.STATEMENT_TIMEOUTS['search']
+    client.force_login(doctor_user)
+    assert client.get('/search', {'query': 'cough'}).status_code == 200
@@ -234,7 +234,8 @@ def test_delete_doctor_from_hospital_view(client, admin_user, doctor_user):
     assert response.status_code == 302
     assert response.url == '/admin-view-doctor'
     assert not models.Doctor.objects.filter(id=doctor.id).exists()
-    assert not User.objects.filter(id=doctor_user.id).exists()
+    assert models.Doctor.all_objects.get(id=doctor.id).is_deleted
+    assert not User.objects.get(id=doctor_user.id).is_active
 
 @pytest.mark.django_db
 def test_update_doctor_view_get(client, admin_user, doctor_user):
@@ -343,7 +344,7 @@ def test_admin_approve_doctor_view(client, admin_user):
     assert response.status_code == 200
     assert 'hospital/admin_approve_doctor.html' in [t.name for t in response.templates]
     assert 'doctors' in response.context
-    assert doctor in response.context['doctors'] 
+    assert doctor.id in [d['id'] for d in response.context['doctors']]
 
 @pytest.mark.django_db
 def test_approve_doctor_view(client, admin_user, doctor_user):
@@ -411,7 +412,7 @@ def test_admin_view_patient_view(client, admin_user):
     assert response.status_code == 200
     assert 'hospital/admin_view_patient.html' in [t.name for t in response.templates]
     assert 'patients' in response.context
-    assert patient in response.context['patients']
+    assert patient.id in [p['id'] for p in response.context['patients']]
     
 @pytest.mark.django_db
 def test_delete_patient_from_hospital_view(client, admin_user, patient_user):
@@ -421,7 +422,8 @@ def test_delete_patient_from_hospital_view(client, admin_user, patient_user):
     assert response.status_code == 302
     assert response.url == '/admin-view-patient'
     assert not models.Patient.objects.filter(id=patient.id).exists()
-    assert not User.objects.filter(id=patient_user.id).exists()
+    assert models.Patient.all_objects.get(id=patient.id).is_deleted
+    assert not User.objects.get(id=patient_user.id).is_active
 
 @pytest.mark.django_db
 def test_update_patient_view_get(client, admin_user, patient_user):
@@ -492,7 +494,7 @@ def test_admin_approve_patient_view(client, admin_user, patient_user):
     assert response.status_code == 200
     assert 'hospital/admin_approve_patient.html' in [t.name for t in response.templates]
     assert 'patients' in response.context
-    assert patient in response.context['patients']
+    assert patient.id in [p['id'] for p in response.context['patients']]
 
 @pytest.mark.django_db
 def test_admin_approve_patient_view(client, admin_user):
@@ -554,7 +556,7 @@ def test_admin_discharge_patient_view(client, admin_user, patient_user):
     assert response.status_code == 200
     assert 'hospital/admin_discharge_patient.html' in [t.name for t in response.templates]
     assert 'patients' in response.context
-    assert patient in response.context['patients']
+    assert patient.id in [p['id'] for p in response.context['patients']]
 
 @pytest.mark.django_db
 def test_discharge_patient_view_get(client, admin_user, patient_user, doctor_user):
@@ -769,6 +771,7 @@ def test_search_view(client, doctor_user, patient_user):
     assert response.status_code == 200
     assert 'hospital/doctor_view_patient.html' in [t.name for t in response.templates]
     assert 'patients' in response.context
+    assert b'<td>456</td>' in response.content
 
 
 @pytest.mark.django_db
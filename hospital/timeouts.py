@@ -0,0 +1,102 @@
+"""
+Per-view database statement timeouts.
+
+``@statement_timeout('search')`` gives every statement the view runs at most
+``STATEMENT_TIMEOUTS['search']`` seconds, so one pathological query cannot
+hold a connection (and a worker) for long:
+
+* on PostgreSQL the view runs in a transaction that starts with
+  ``SET LOCAL statement_timeout``, which the server enforces and the commit or
+  rollback undoes;
+* on SQLite a progress handler interrupts a statement once it has run past its
+  deadline, checked every ``PROGRESS_STEPS`` virtual machine instructions.
+
+A statement that times out ends the view with a friendly 503 page and counts
+in ``hospital_statement_timeouts_total``. Other database errors propagate.
+"""
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, connections, router, transaction
+from django.shortcuts import render
+
+from . import metrics
+
+
+#psycopg2's QueryCanceled
+QUERY_CANCELED = '57014'
+PROGRESS_STEPS = 1000
+
+
+@contextmanager
+def postgres_timeout(alias, seconds):
+    with transaction.atomic(using=alias):
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SET LOCAL statement_timeout = %s', [max(1, int(seconds*1000))])
+        yield
+
+
+@contextmanager
+def sqlite_timeout(alias, seconds):
+    connection=connections[alias]
+    connection.ensure_connection()
+    deadline=[None]
+
+    def start_statement(execute, sql, params, many, context):
+        deadline[0]=time.monotonic()+seconds
+        return execute(sql, params, many, context)
+
+    def interrupt():
+        return deadline[0] is not None and time.monotonic() > deadline[0]
+
+    raw=connection.connection
+    raw.set_progress_handler(interrupt, PROGRESS_STEPS)
+    try:
+        with connection.execute_wrapper(start_statement):
+            yield
+    finally:
+        raw.set_progress_handler(None, 0)
+
+
+@contextmanager
+def limited(alias, seconds):
+    vendor=connections[alias].vendor
+    if vendor == 'postgresql':
+        with postgres_timeout(alias, seconds):
+            yield
+    elif vendor == 'sqlite':
+        with sqlite_timeout(alias, seconds):
+            yield
+    else:
+        yield
+
+
+def is_timeout(error):
+    return getattr(error.__cause__, 'pgcode', None) == QUERY_CANCELED or str(error) == 'interrupted'
+
+
+def timed_out(request):
+    metrics.inc('hospital_statement_timeouts_total', (metrics.view_label(request),))
+    return render(request, 'hospital/query_timeout.html', status=503)
+
+
+def statement_timeout(group):
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapped(request, *args, **kwargs):
+            seconds=settings.STATEMENT_TIMEOUTS.get(group)
+            if not seconds:
+                return view_func(request, *args, **kwargs)
+            #the database this request reads from (the replica for most GETs)
+            alias=router.db_for_read(None)
+            try:
+                with limited(alias, seconds):
+                    return view_func(request, *args, **kwargs)
+            except OperationalError as e:
+                if not is_timeout(e):
+                    raise
+                return timed_out(request)
+        return wrapped
+    return decorator
@@ -8,6 +8,16 @@ from django.contrib.auth.decorators import login_required,user_passes_test
 from datetime import datetime,timedelta,date
 from django.conf import settings
 from django.db.models import Q
+from .conditional import data_versioned
+from .directory import get_directory,search_directory,invalidate_directory
+from .events import queue_changed
+from . import audit, metrics
+from .ratelimit import ratelimit
+from .sessions import own_profile
+from .streaming import render_rows,stream_table
+from .timeouts import statement_timeout
+from django.db import transaction
+from django.utils import timezone
 
 # Create your views here.
 def home_view(request):
@@ -39,14 +49,13 @@ def patientclick_view(request):
 
 
 
+@ratelimit('signup')
 def admin_signup_view(request):
     form=forms.AdminSigupForm()
     if request.method=='POST':
         form=forms.AdminSigupForm(request.POST)
         if form.is_valid():
             user=form.save()
-            user.set_password(user.password)
-            user.save()
             my_admin_group = Group.objects.get_or_create(name='ADMIN')
             my_admin_group[0].user_set.add(user)
             return HttpResponseRedirect('adminlogin')
@@ -55,6 +64,7 @@ def admin_signup_view(request):
 
 
 
+@ratelimit('signup')
 def doctor_signup_view(request):
     userForm=forms.DoctorUserForm()
     doctorForm=forms.DoctorForm()
@@ -64,8 +74,6 @@ def doctor_signup_view(request):
         doctorForm=forms.DoctorForm(request.POST,request.FILES)
         if userForm.is_valid() and doctorForm.is_valid():
             user=userForm.save()
-            user.set_password(user.password)
-            user.save()
             doctor=doctorForm.save(commit=False)
             doctor.user=user
             doctor=doctor.save()
@@ -75,6 +83,7 @@ def doctor_signup_view(request):
     return render(request,'hospital/doctorsignup.html',context=mydict)
 
 
+@ratelimit('signup')
 def patient_signup_view(request):
     userForm=forms.PatientUserForm()
     patientForm=forms.PatientForm()
@@ -84,8 +93,6 @@ def patient_signup_view(request):
         patientForm=forms.PatientForm(request.POST,request.FILES)
         if userForm.is_valid() and patientForm.is_valid():
             user=userForm.save()
-            user.set_password(user.password)
-            user.save()
             patient=patientForm.save(commit=False)
             patient.user=user
             patient.assignedDoctorId=request.POST.get('assignedDoctorId')
@@ -101,12 +108,18 @@ def patient_signup_view(request):
 
 
 #-----------for checking user is doctor , patient or admin(by sumit)
+#the role saved in the session at login (SessionRoleMiddleware) saves the group query
+def has_role(user,role):
+    session_role=getattr(user,'hospital_role',None)
+    if session_role:
+        return session_role==role
+    return user.groups.filter(name=role).exists()
 def is_admin(user):
-    return user.groups.filter(name='ADMIN').exists()
+    return has_role(user,'ADMIN')
 def is_doctor(user):
-    return user.groups.filter(name='DOCTOR').exists()
+    return has_role(user,'DOCTOR')
 def is_patient(user):
-    return user.groups.filter(name='PATIENT').exists()
+    return has_role(user,'PATIENT')
 
 
 #---------AFTER ENTERING CREDENTIALS WE CHECK WHETHER USERNAME AND PASSWORD IS OF ADMIN,DOCTOR OR PATIENT
@@ -136,12 +149,51 @@ def afterlogin_view(request):
 #---------------------------------------------------------------------------------
 #------------------------ ADMIN RELATED VIEWS START ------------------------------
 #---------------------------------------------------------------------------------
+#-----------BULK APPROVE/REJECT FOR THE APPROVAL QUEUES
+def selected_ids(request):
+    return [int(pk) for pk in request.POST.getlist('selected') if pk.isdigit()]
+
+
+def bulk_approve(model,ids):
+    #one UPDATE ... WHERE id IN (...), update() skips auto_now so set it here
+    pending=list(model.objects.filter(id__in=ids,status=False).values_list('id',flat=True))
+    count=model.objects.filter(id__in=pending).update(status=True,updated_at=timezone.now())
+    audit.record_ids('approve',model,pending)
+    #update() sends no signals
+    queue_changed()
+    return count
+
+
+def bulk_reject_users(model,ids):
+    #deleting the users cascades to their doctor/patient rows in batches
+    pending=list(model.objects.filter(id__in=ids,status=False).values_list('id','user_id'))
+    #as for a single rejection: 'reject' here, 'delete' from the post_delete signal
+    audit.record_ids('reject',model,[pk for pk,_ in pending])
+    return models.User.objects.filter(id__in=[user_id for _,user_id in pending]).delete()
+
+
+#-----------SOFT DELETE OF DOCTORS AND PATIENTS
+def soft_delete(profile):
+    #hide the profile and lock the account, no cascade runs on the request
+    now=timezone.now()
+    type(profile).objects.filter(id=profile.id).update(is_deleted=True,deleted_at=now,updated_at=now)
+    models.User.objects.filter(id=profile.user_id).update(is_active=False)
+    audit.record('delete',profile)
+    queue_changed()
+
+
+#-----------querysets each page is built from, their version is the page ETag
+def admin_dashboard_scopes(request):
+    return [models.Doctor.objects.all(),models.Patient.objects.all(),models.Appointment.objects.all()]
+
+
 @login_required(login_url='adminlogin')
 @user_passes_test(is_admin)
+@data_versioned(admin_dashboard_scopes)
 def admin_dashboard_view(request):
     #for both table in admin dashboard
-    doctors=models.Doctor.objects.all().order_by('-id')
-    patients=models.Patient.objects.all().order_by('-id')
+    doctors=models.Doctor.objects.all().order_by('-id').rows('department','mobile','status')
+    patients=models.Patient.objects.all().order_by('-id').rows('address','mobile','symptoms','status')
     #for three cards
     doctorcount=models.Doctor.objects.all().filter(status=True).count()
     pendingdoctorcount=models.Doctor.objects.all().filter(status=False).count()
@@ -175,18 +227,19 @@ def admin_doctor_view(request):
 @login_required(login_url='adminlogin')
 @user_passes_test(is_admin)
 def admin_view_doctor_view(request):
-    doctors=models.Doctor.objects.all().filter(status=True)
-    return render(request,'hospital/admin_view_doctor.html',{'doctors':doctors})
+    doctors=models.Doctor.objects.all().filter(status=True).rows('id','profile_pic','address','mobile','department')
+    doctor_rows=render_rows(request,'hospital/admin_view_doctor_rows.html','doctors',doctors)
+    return render(request,'hospital/admin_view_doctor.html',{'doctors':doctors,'doctor_rows':doctor_rows})
 
 
 
 @login_required(login_url='adminlogin')
 @user_passes_test(is_admin)
 def delete_doctor_from_hospital_view(request,pk):
+    #soft delete, the archive_deleted command moves the rows out later
     doctor=models.Doctor.objects.get(id=pk)
-    user=models.User.objects.get(id=doctor.user_id)
-    user.delete()
-    doctor.delete()
+    soft_delete(doctor)
+    invalidate_directory()
     return redirect('admin-view-doctor')
 
 
@@ -205,11 +258,10 @@ def update_doctor_view(request,pk):
         doctorForm=forms.DoctorForm(request.POST,request.FILES,instance=doctor)
         if userForm.is_valid() and doctorForm.is_valid():
             user=userForm.save()
-            user.set_password(user.password)
-            user.save()
             doctor=doctorForm.save(commit=False)
             doctor.status=True
             doctor.save()
+            audit.record('update',doctor,','.join(userForm.changed_data+doctorForm.changed_data))
             return redirect('admin-view-doctor')
     return render(request,'hospital/admin_update_doctor.html',context=mydict)
 
@@ -227,8 +279,6 @@ def admin_add_doctor_view(request):
         doctorForm=forms.DoctorForm(request.POST, request.FILES)
         if userForm.is_valid() and doctorForm.is_valid():
             user=userForm.save()
-            user.set_password(user.password)
-            user.save()
 
             doctor=doctorForm.save(commit=False)
             doctor.user=user
@@ -247,8 +297,17 @@ def admin_add_doctor_view(request):
 @login_required(login_url='adminlogin')
 @user_passes_test(is_admin)
 def admin_approve_doctor_view(request):
+    if request.method=='POST':
+        ids=selected_ids(request)
+        with transaction.atomic():
+            if request.POST.get('action')=='approve':
+                bulk_approve(models.Doctor,ids)
+            elif request.POST.get('action')=='reject':
+                bulk_reject_users(models.Doctor,ids)
+        invalidate_directory()
+        return redirect('admin-approve-doctor')
     #those whose approval are needed
-    doctors=models.Doctor.objects.all().filter(status=False)
+    doctors=models.Doctor.objects.all().filter(status=False).rows('id','profile_pic','address','mobile','department')
     return render(request,'hospital/admin_approve_doctor.html',{'doctors':doctors})
 
 
@@ -258,6 +317,7 @@ def approve_doctor_view(request,pk):
     doctor=models.Doctor.objects.get(id=pk)
     doctor.status=True
     doctor.save()
+    audit.record('approve',doctor)
     return redirect(reverse('admin-approve-doctor'))
 
 
@@ -265,6 +325,7 @@ def approve_doctor_view(request,pk):
 @user_passes_test(is_admin)
 def reject_doctor_view(request,pk):
     doctor=models.Doctor.objects.get(id=pk)
+    audit.record('reject',doctor)
     user=models.User.objects.get(id=doctor.user_id)
     user.delete()
     doctor.delete()
@@ -275,7 +336,7 @@ def reject_doctor_view(request,pk):
 @login_required(login_url='adminlogin')
 @user_passes_test(is_admin)
 def admin_view_doctor_specialisation_view(request):
-    doctors=models.Doctor.objects.all().filter(status=True)
+    doctors=models.Doctor.objects.all().filter(status=True).rows('department','mobile')
     return render(request,'hospital/admin_view_doctor_specialisation.html',{'doctors':doctors})
 
 
@@ -290,18 +351,18 @@ def admin_patient_view(request):
 @login_required(login_url='adminlogin')
 @user_passes_test(is_admin)
 def admin_view_patient_view(request):
-    patients=models.Patient.objects.all().filter(status=True)
-    return render(request,'hospital/admin_view_patient.html',{'patients':patients})
+    patients=models.Patient.objects.all().filter(status=True).rows('id','profile_pic','address','mobile','symptoms')
+    patient_rows=render_rows(request,'hospital/admin_view_patient_rows.html','patients',patients)
+    return render(request,'hospital/admin_view_patient.html',{'patients':patients,'patient_rows':patient_rows})
 
 
 
 @login_required(login_url='adminlogin')
 @user_passes_test(is_admin)
 def delete_patient_from_hospital_view(request,pk):
+    #soft delete, the archive_deleted command moves the rows out later
     patient=models.Patient.objects.get(id=pk)
-    user=models.User.objects.get(id=patient.user_id)
-    user.delete()
-    patient.delete()
+    soft_delete(patient)
     return redirect('admin-view-patient')
 
 
@@ -320,12 +381,11 @@ def update_patient_view(request,pk):
         patientForm=forms.PatientForm(request.POST,request.FILES,instance=patient)
         if userForm.is_valid() and patientForm.is_valid():
             user=userForm.save()
-            user.set_password(user.password)
-            user.save()
             patient=patientForm.save(commit=False)
             patient.status=True
             patient.assignedDoctorId=request.POST.get('assignedDoctorId')
             patient.save()
+            audit.record('update',patient,','.join(userForm.changed_data+patientForm.changed_data))
             return redirect('admin-view-patient')
     return render(request,'hospital/admin_update_patient.html',context=mydict)
 
@@ -344,8 +404,6 @@ def admin_add_patient_view(request):
         patientForm=forms.PatientForm(request.POST,request.FILES)
         if userForm.is_valid() and patientForm.is_valid():
             user=userForm.save()
-            user.set_password(user.password)
-            user.save()
 
             patient=patientForm.save(commit=False)
             patient.user=user
@@ -365,8 +423,16 @@ def admin_add_patient_view(request):
 @login_required(login_url='adminlogin')
 @user_passes_test(is_admin)
 def admin_approve_patient_view(request):
+    if request.method=='POST':
+        ids=selected_ids(request)
+        with transaction.atomic():
+            if request.POST.get('action')=='approve':
+                bulk_approve(models.Patient,ids)
+            elif request.POST.get('action')=='reject':
+                bulk_reject_users(models.Patient,ids)
+        return redirect('admin-approve-patient')
     #those whose approval are needed
-    patients=models.Patient.objects.all().filter(status=False)
+    patients=models.Patient.objects.all().filter(status=False).rows('id','profile_pic','address','mobile','symptoms')
     return render(request,'hospital/admin_approve_patient.html',{'patients':patients})
 
 
@@ -377,6 +443,7 @@ def approve_patient_view(request,pk):
     patient=models.Patient.objects.get(id=pk)
     patient.status=True
     patient.save()
+    audit.record('approve',patient)
     return redirect(reverse('admin-approve-patient'))
 
 
@@ -385,6 +452,7 @@ def approve_patient_view(request,pk):
 @user_passes_test(is_admin)
 def reject_patient_view(request,pk):
     patient=models.Patient.objects.get(id=pk)
+    audit.record('reject',patient)
     user=models.User.objects.get(id=patient.user_id)
     user.delete()
     patient.delete()
@@ -396,7 +464,7 @@ def reject_patient_view(request,pk):
 @login_required(login_url='adminlogin')
 @user_passes_test(is_admin)
 def admin_discharge_patient_view(request):
-    patients=models.Patient.objects.all().filter(status=True)
+    patients=models.Patient.objects.all().filter(status=True).rows('id','mobile','symptoms')
     return render(request,'hospital/admin_discharge_patient.html',{'patients':patients})
 
 
@@ -445,6 +513,7 @@ def discharge_patient_view(request,pk):
         pDD.OtherCharge=int(request.POST['OtherCharge'])
         pDD.total=(int(request.POST['roomCharge'])*int(d))+int(request.POST['doctorFee'])+int(request.POST['medicineCost'])+int(request.POST['OtherCharge'])
         pDD.save()
+        audit.record('discharge',patient,'bill %s, total %s' % (pDD.id,pDD.total))
         return render(request,'hospital/patient_final_bill.html',context=patientDict)
     return render(request,'hospital/patient_generate_bill.html',context=patientDict)
 
@@ -452,13 +521,15 @@ def discharge_patient_view(request,pk):
 
 #--------------for discharge patient bill (pdf) download and printing
 import io
-from xhtml2pdf import pisa
 from django.template.loader import get_template
 from django.template import Context
 from django.http import HttpResponse
 
 
+@metrics.timed('hospital_pdf_render_seconds')
 def render_to_pdf(template_src, context_dict):
+    #xhtml2pdf pulls in reportlab and friends, only load it when a bill is downloaded
+    from xhtml2pdf import pisa
     template = get_template(template_src)
     html  = template.render(context_dict)
     result = io.BytesIO()
@@ -470,7 +541,7 @@ def render_to_pdf(template_src, context_dict):
 
 
 def download_pdf_view(request,pk):
-    dischargeDetails=models.PatientDischargeDetails.objects.all().filter(patientId=pk).order_by('-id')[:1]
+    dischargeDetails=models.PatientDischargeDetails.objects.latest_for_patient(pk)
     dict={
         'patientName':dischargeDetails[0].patientName,
         'assignedDoctorName':dischargeDetails[0].assignedDoctorName,
@@ -498,11 +569,16 @@ def admin_appointment_view(request):
 
 
 
+def admin_view_appointment_scopes(request):
+    return [models.Appointment.objects.all().filter(status=True)]
+
+
 @login_required(login_url='adminlogin')
 @user_passes_test(is_admin)
+@data_versioned(admin_view_appointment_scopes)
 def admin_view_appointment_view(request):
-    appointments=models.Appointment.objects.all().filter(status=True)
-    return render(request,'hospital/admin_view_appointment.html',{'appointments':appointments})
+    appointments=models.Appointment.objects.all().filter(status=True).order_by('id').values('doctorName','patientName','description','appointmentDate')
+    return stream_table(request,'hospital/admin_view_appointment.html',{},'appointments',appointments,'hospital/admin_view_appointment_rows.html')
 
 
 
@@ -529,6 +605,17 @@ def admin_add_appointment_view(request):
 @login_required(login_url='adminlogin')
 @user_passes_test(is_admin)
 def admin_approve_appointment_view(request):
+    if request.method=='POST':
+        ids=selected_ids(request)
+        with transaction.atomic():
+            if request.POST.get('action')=='approve':
+                bulk_approve(models.Appointment,ids)
+            elif request.POST.get('action')=='reject':
+                #approved ones in a stale or forged POST are neither deleted nor logged
+                pending=list(models.Appointment.objects.filter(id__in=ids,status=False).values_list('id',flat=True))
+                audit.record_ids('reject',models.Appointment,pending)
+                models.Appointment.objects.filter(id__in=pending).delete()
+        return redirect('admin-approve-appointment')
     #those whose approval are needed
     appointments=models.Appointment.objects.all().filter(status=False)
     return render(request,'hospital/admin_approve_appointment.html',{'appointments':appointments})
@@ -541,6 +628,7 @@ def approve_appointment_view(request,pk):
     appointment=models.Appointment.objects.get(id=pk)
     appointment.status=True
     appointment.save()
+    audit.record('approve',appointment)
     return redirect(reverse('admin-approve-appointment'))
 
 
@@ -549,6 +637,7 @@ def approve_appointment_view(request,pk):
 @user_passes_test(is_admin)
 def reject_appointment_view(request,pk):
     appointment=models.Appointment.objects.get(id=pk)
+    audit.record('reject',appointment)
     appointment.delete()
     return redirect('admin-approve-appointment')
 #---------------------------------------------------------------------------------
@@ -563,8 +652,19 @@ def reject_appointment_view(request,pk):
 #---------------------------------------------------------------------------------
 #------------------------ DOCTOR RELATED VIEWS START ------------------------------
 #---------------------------------------------------------------------------------
+def doctor_dashboard_scopes(request):
+    appointments=models.Appointment.objects.all().filter(doctorId=request.user.id)
+    return [
+        models.Doctor.objects.all().filter(user_id=request.user.id),
+        models.Patient.objects.all().filter(Q(assignedDoctorId=request.user.id)|Q(user_id__in=appointments.values('patientId'))),
+        appointments,
+        models.PatientDischargeDetails.objects.all().filter(assignedDoctorName=request.user.first_name),
+    ]
+
+
 @login_required(login_url='doctorlogin')
 @user_passes_test(is_doctor)
+@data_versioned(doctor_dashboard_scopes)
 def doctor_dashboard_view(request):
     #for three cards
     patientcount=models.Patient.objects.all().filter(status=True,assignedDoctorId=request.user.id).count()
@@ -583,7 +683,7 @@ def doctor_dashboard_view(request):
     'appointmentcount':appointmentcount,
     'patientdischarged':patientdischarged,
     'appointments':appointments,
-    'doctor':models.Doctor.objects.get(user_id=request.user.id), #for profile picture of doctor in sidebar
+    'doctor':own_profile(request,models.Doctor), #for profile picture of doctor in sidebar
     }
     return render(request,'hospital/doctor_dashboard.html',context=mydict)
 
@@ -593,7 +693,7 @@ def doctor_dashboard_view(request):
 @user_passes_test(is_doctor)
 def doctor_patient_view(request):
     mydict={
-    'doctor':models.Doctor.objects.get(user_id=request.user.id), #for profile picture of doctor in sidebar
+    'doctor':own_profile(request,models.Doctor), #for profile picture of doctor in sidebar
     }
     return render(request,'hospital/doctor_patient.html',context=mydict)
 
@@ -601,22 +701,34 @@ def doctor_patient_view(request):
 
 
 
+def doctor_view_patient_scopes(request):
+    return [
+        models.Doctor.objects.all().filter(user_id=request.user.id),
+        models.Patient.objects.all().filter(status=True,assignedDoctorId=request.user.id),
+    ]
+
+
 @login_required(login_url='doctorlogin')
 @user_passes_test(is_doctor)
+@data_versioned(doctor_view_patient_scopes)
 def doctor_view_patient_view(request):
-    patients=models.Patient.objects.all().filter(status=True,assignedDoctorId=request.user.id)
-    doctor=models.Doctor.objects.get(user_id=request.user.id) #for profile picture of doctor in sidebar
-    return render(request,'hospital/doctor_view_patient.html',{'patients':patients,'doctor':doctor})
+    patients=models.Patient.objects.all().filter(status=True,assignedDoctorId=request.user.id).rows('profile_pic','symptoms','mobile','address')
+    doctor=own_profile(request,models.Doctor) #for profile picture of doctor in sidebar
+    patient_rows=render_rows(request,'hospital/doctor_view_patient_rows.html','patients',patients)
+    return render(request,'hospital/doctor_view_patient.html',{'patients':patients,'patient_rows':patient_rows,'doctor':doctor})
 
 
+@ratelimit('search')
 @login_required(login_url='doctorlogin')
 @user_passes_test(is_doctor)
+@statement_timeout('search')
 def search_view(request):
-    doctor=models.Doctor.objects.get(user_id=request.user.id) #for profile picture of doctor in sidebar
+    doctor=own_profile(request,models.Doctor) #for profile picture of doctor in sidebar
     # whatever user write in search box we get in query
     query = request.GET['query']
-    patients=models.Patient.objects.all().filter(status=True,assignedDoctorId=request.user.id).filter(Q(symptoms__icontains=query)|Q(user__first_name__icontains=query))
-    return render(request,'hospital/doctor_view_patient.html',{'patients':patients,'doctor':doctor})
+    patients=models.Patient.objects.all().filter(status=True,assignedDoctorId=request.user.id).filter(Q(symptoms__icontains=query)|Q(user__first_name__icontains=query)).rows('profile_pic','symptoms','mobile','address')
+    patient_rows=render_rows(request,'hospital/doctor_view_patient_rows.html','patients',patients)
+    return render(request,'hospital/doctor_view_patient.html',{'patients':patients,'patient_rows':patient_rows,'doctor':doctor})
 
 
 
@@ -624,7 +736,7 @@ def search_view(request):
 @user_passes_test(is_doctor)
 def doctor_view_discharge_patient_view(request):
     dischargedpatients=models.PatientDischargeDetails.objects.all().distinct().filter(assignedDoctorName=request.user.first_name)
-    doctor=models.Doctor.objects.get(user_id=request.user.id) #for profile picture of doctor in sidebar
+    doctor=own_profile(request,models.Doctor) #for profile picture of doctor in sidebar
     return render(request,'hospital/doctor_view_discharge_patient.html',{'dischargedpatients':dischargedpatients,'doctor':doctor})
 
 
@@ -632,7 +744,7 @@ def doctor_view_discharge_patient_view(request):
 @login_required(login_url='doctorlogin')
 @user_passes_test(is_doctor)
 def doctor_appointment_view(request):
-    doctor=models.Doctor.objects.get(user_id=request.user.id) #for profile picture of doctor in sidebar
+    doctor=own_profile(request,models.Doctor) #for profile picture of doctor in sidebar
     return render(request,'hospital/doctor_appointment.html',{'doctor':doctor})
 
 
@@ -640,7 +752,7 @@ def doctor_appointment_view(request):
 @login_required(login_url='doctorlogin')
 @user_passes_test(is_doctor)
 def doctor_view_appointment_view(request):
-    doctor=models.Doctor.objects.get(user_id=request.user.id) #for profile picture of doctor in sidebar
+    doctor=own_profile(request,models.Doctor) #for profile picture of doctor in sidebar
     appointments=models.Appointment.objects.all().filter(status=True,doctorId=request.user.id)
     patientid=[]
     for a in appointments:
@@ -654,7 +766,7 @@ def doctor_view_appointment_view(request):
 @login_required(login_url='doctorlogin')
 @user_passes_test(is_doctor)
 def doctor_delete_appointment_view(request):
-    doctor=models.Doctor.objects.get(user_id=request.user.id) #for profile picture of doctor in sidebar
+    doctor=own_profile(request,models.Doctor) #for profile picture of doctor in sidebar
     appointments=models.Appointment.objects.all().filter(status=True,doctorId=request.user.id)
     patientid=[]
     for a in appointments:
@@ -670,7 +782,7 @@ def doctor_delete_appointment_view(request):
 def delete_appointment_view(request,pk):
     appointment=models.Appointment.objects.get(id=pk)
     appointment.delete()
-    doctor=models.Doctor.objects.get(user_id=request.user.id) #for profile picture of doctor in sidebar
+    doctor=own_profile(request,models.Doctor) #for profile picture of doctor in sidebar
     appointments=models.Appointment.objects.all().filter(status=True,doctorId=request.user.id)
     patientid=[]
     for a in appointments:
@@ -693,10 +805,16 @@ def delete_appointment_view(request,pk):
 #---------------------------------------------------------------------------------
 #------------------------ PATIENT RELATED VIEWS START ------------------------------
 #---------------------------------------------------------------------------------
+def patient_dashboard_scopes(request):
+    patients=models.Patient.objects.all().filter(user_id=request.user.id)
+    return [patients,models.Doctor.objects.all().filter(user_id__in=patients.values('assignedDoctorId'))]
+
+
 @login_required(login_url='patientlogin')
 @user_passes_test(is_patient)
+@data_versioned(patient_dashboard_scopes)
 def patient_dashboard_view(request):
-    patient=models.Patient.objects.get(user_id=request.user.id)
+    patient=own_profile(request,models.Patient)
     doctor=models.Doctor.objects.get(user_id=patient.assignedDoctorId)
     mydict={
     'patient':patient,
@@ -714,7 +832,7 @@ def patient_dashboard_view(request):
 @login_required(login_url='patientlogin')
 @user_passes_test(is_patient)
 def patient_appointment_view(request):
-    patient=models.Patient.objects.get(user_id=request.user.id) #for profile picture of patient in sidebar
+    patient=own_profile(request,models.Patient) #for profile picture of patient in sidebar
     return render(request,'hospital/patient_appointment.html',{'patient':patient})
 
 
@@ -723,7 +841,7 @@ def patient_appointment_view(request):
 @user_passes_test(is_patient)
 def patient_book_appointment_view(request):
     appointmentForm=forms.PatientAppointmentForm()
-    patient=models.Patient.objects.get(user_id=request.user.id) #for profile picture of patient in sidebar
+    patient=own_profile(request,models.Patient) #for profile picture of patient in sidebar
     message=None
     mydict={'appointmentForm':appointmentForm,'patient':patient,'message':message}
     if request.method=='POST':
@@ -747,18 +865,20 @@ def patient_book_appointment_view(request):
 
 
 def patient_view_doctor_view(request):
-    doctors=models.Doctor.objects.all().filter(status=True)
-    patient=models.Patient.objects.get(user_id=request.user.id) #for profile picture of patient in sidebar
+    doctors=get_directory()
+    patient=own_profile(request,models.Patient) #for profile picture of patient in sidebar
     return render(request,'hospital/patient_view_doctor.html',{'patient':patient,'doctors':doctors})
 
 
 
+@ratelimit('search')
+@statement_timeout('search')
 def search_doctor_view(request):
-    patient=models.Patient.objects.get(user_id=request.user.id) #for profile picture of patient in sidebar
+    patient=own_profile(request,models.Patient) #for profile picture of patient in sidebar
     
     # whatever user write in search box we get in query
     query = request.GET['query']
-    doctors=models.Doctor.objects.all().filter(status=True).filter(Q(department__icontains=query)| Q(user__first_name__icontains=query))
+    doctors=search_directory(query)
     return render(request,'hospital/patient_view_doctor.html',{'patient':patient,'doctors':doctors})
 
 
@@ -767,7 +887,7 @@ def search_doctor_view(request):
 @login_required(login_url='patientlogin')
 @user_passes_test(is_patient)
 def patient_view_appointment_view(request):
-    patient=models.Patient.objects.get(user_id=request.user.id) #for profile picture of patient in sidebar
+    patient=own_profile(request,models.Patient) #for profile picture of patient in sidebar
     appointments=models.Appointment.objects.all().filter(patientId=request.user.id)
     return render(request,'hospital/patient_view_appointment.html',{'appointments':appointments,'patient':patient})
 
@@ -776,8 +896,8 @@ def patient_view_appointment_view(request):
 @login_required(login_url='patientlogin')
 @user_passes_test(is_patient)
 def patient_discharge_view(request):
-    patient=models.Patient.objects.get(user_id=request.user.id) #for profile picture of patient in sidebar
-    dischargeDetails=models.PatientDischargeDetails.objects.all().filter(patientId=patient.id).order_by('-id')[:1]
+    patient=own_profile(request,models.Patient) #for profile picture of patient in sidebar
+    dischargeDetails=models.PatientDischargeDetails.objects.latest_for_patient(patient.id)
     patientDict=None
     if dischargeDetails:
         patientDict ={
@@ -824,6 +944,7 @@ def patient_discharge_view(request):
 def aboutus_view(request):
     return render(request,'hospital/aboutus.html')
 
+@ratelimit('contact')
 def contactus_view(request):
     sub = forms.ContactusForm()
     if request.method == 'POST':
@@ -0,0 +1,74 @@
+"""
+Work a worker would otherwise do on its first requests, done once in the
+server's master process before it forks (see ``manage.py serve``):
+
+* URL resolvers: the URLconf and every view module imported, reverse
+  lookups populated;
+* templates: every project template compiled - kept by the cached loader
+  when ``DEBUG`` is off - and the Jinja2 bytecode cache filled;
+* the doctor directory cache built.
+
+Forked workers share the result copy-on-write. Database connections opened
+here are closed again so no worker inherits a socket.
+"""
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateSyntaxError, engines
+from django.urls import get_resolver
+
+from .directory import get_directory
+
+
+logger = logging.getLogger(__name__)
+
+
+def warm_urls():
+    resolver=get_resolver()
+    resolver.url_patterns
+    return len(resolver.reverse_dict)
+
+
+def project_templates(engine):
+    for directory in engine.template_dirs:
+        if not str(directory).startswith(settings.BASE_DIR):
+            continue
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if name.endswith('.html'):
+                    yield os.path.relpath(os.path.join(root, name), directory).replace(os.sep, '/')
+
+
+def warm_templates():
+    count=0
+    for engine in engines.all():
+        if engine.name == 'jinja2':
+            from .jinja import precompile
+            precompile()
+            count+=len(engine.env.list_templates())
+            continue
+        for name in project_templates(engine):
+            try:
+                engine.get_template(name)
+                count+=1
+            except TemplateSyntaxError:
+                #a fragment that only works included, it still fails at request time if broken
+                logger.warning('Could not precompile template %s', name, exc_info=True)
+    return count
+
+
+def warm():
+    """Run every step; return {step: (items, seconds)}."""
+    timings={}
+    for step, func in (('urls', warm_urls), ('templates', warm_templates), ('directory', lambda: len(get_directory()))):
+        started=time.perf_counter()
+        try:
+            timings[step]=(func(), time.perf_counter()-started)
+        except Exception:
+            #a cold cache is slower, not fatal
+            logger.exception('Warmup step %s failed', step)
+    connections.close_all()
+    return timings
@@ -13,4 +13,9 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'hospitalmanagement.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Server-sent approval queue events are answered before Django's request handling
+from hospital.events import EventStreamRouter  # noqa: E402
+
+application = EventStreamRouter(django_application)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -29,6 +30,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# Identifies the deployed code; part of page ETags so a release invalidates them
+RELEASE_ID = os.environ.get('RELEASE_ID', '')
+
 
 # Application definition
 
@@ -44,11 +48,18 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'hospital.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'hospital.storage.PrecompressedStaticMiddleware',
+    'hospital.profiling.ProfilingMiddleware',
+    'hospital.metrics.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'hospital.sessions.SessionRoleMiddleware',
+    'hospital.admission.AdmissionMiddleware',
+    'hospital.audit.AuditMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -57,7 +68,9 @@ ROOT_URLCONF = 'hospitalmanagement.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates timing each render for /metrics
+        'BACKEND': 'hospital.metrics.InstrumentedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATE_DIR,],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -71,22 +84,38 @@ TEMPLATES = [
     },
 ]
 
+# The row loops of the largest tables (templates/hospital/*_rows.html) have
+# Jinja2 twins in hospital/jinja2/ that render faster (benchmarks/bench_templates.py).
+# The URL names in JINJA2_VIEWS (comma separated, empty for none) use them;
+# compiled templates are cached in JINJA2_BYTECODE_DIR.
+JINJA2_VIEWS=frozenset(filter(None,os.environ.get('JINJA2_VIEWS','doctor-view-patient,admin-view-doctor,admin-view-patient,admin-view-appointment').split(',')))
+JINJA2_BYTECODE_DIR=os.environ.get('JINJA2_BYTECODE_DIR',os.path.join(tempfile.gettempdir(),'hospitalmanagement-jinja2'))
+TEMPLATES.append({
+    'BACKEND': 'hospital.jinja.InstrumentedJinja2',
+    'NAME': 'jinja2',
+    'APP_DIRS': True,
+    'OPTIONS': {'environment': 'hospital.jinja.environment'},
+})
+
 WSGI_APPLICATION = 'hospitalmanagement.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# SQLite profile for small sites (hospital/backends/sqlite3): every connection gets
+# SQLITE_PRAGMAS (WAL, synchronous=NORMAL, mmap, page cache, busy timeout) and
+# transactions take the write lock up front (BEGIN IMMEDIATE), so several workers
+# can write without "database is locked". SQLITE_WRITE_LOCK=1 also queues writers
+# on a lock file. SQLITE_TUNED=0 falls back to Django's stock backend.
 if os.environ.get("GITHUB_WORKFLOW") or os.environ.get("USE_SQLITE") == "1":
-    print("=== Using SQLite Database ===")
     DATABASES = {
         "default": {
-            "ENGINE": "django.db.backends.sqlite3",
-            "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+            "ENGINE": "hospital.backends.sqlite3" if os.environ.get("SQLITE_TUNED", "1") == "1" else "django.db.backends.sqlite3",
+            "NAME": os.environ.get("SQLITE_PATH", os.path.join(BASE_DIR, "db.sqlite3")),
         }
     }
 else:
-    print("=== Using PostgreSQL Database ===")
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.postgresql',
@@ -103,6 +132,86 @@ else:
         }
     }
 
+# Read replica: read-only requests are routed to the 'replica' alias when one
+# is configured (see hospital/routers.py). DB_REPLICA_HOST adds a PostgreSQL
+# replica; USE_SQLITE_REPLICA=1 adds a second alias on the SQLite file so the
+# routing can be exercised locally.
+if os.environ.get("DB_REPLICA_HOST") and DATABASES['default']['ENGINE'].endswith('postgresql'):
+    DATABASES['replica'] = dict(DATABASES['default'], HOST=os.environ["DB_REPLICA_HOST"], TEST={'MIRROR': 'default'})
+elif os.environ.get("USE_SQLITE_REPLICA") == "1" and DATABASES['default']['ENGINE'].endswith('sqlite3'):
+    DATABASES['replica'] = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    # negative: KiB rather than pages
+    'cache_size': -int(os.environ.get("SQLITE_CACHE_KIB", 20000)),
+    'busy_timeout': int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 10000)),
+    'temp_store': 'MEMORY',
+}
+SQLITE_IMMEDIATE = os.environ.get("SQLITE_IMMEDIATE", "1") == "1"
+SQLITE_WRITE_LOCK = os.environ.get("SQLITE_WRITE_LOCK") == "1"
+
+DATABASE_ROUTERS = ['hospital.routers.PrimaryReplicaRouter']
+DATABASE_REPLICA_ALIAS = 'replica' if 'replica' in DATABASES else None
+REPLICA_STICKY_SECONDS = int(os.environ.get("REPLICA_STICKY_SECONDS", 5))
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get("REPLICA_MAX_LAG_SECONDS", 2))
+REPLICA_LAG_CHECK_SECONDS = float(os.environ.get("REPLICA_LAG_CHECK_SECONDS", 1))
+
+
+# Caches
+# The doctor directory cache must be shared by every worker on the host, so
+# that an invalidation in one worker is seen by all of them.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'directory': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DIRECTORY_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'hospitalmanagement-directory')),
+    },
+    # rate limit windows for hospital.ratelimit.CacheBackend; point it at memcached
+    # (RATELIMIT_CACHE_BACKEND/RATELIMIT_CACHE_LOCATION) for atomic counts across hosts.
+    # Culling would reset live windows, so it only starts far above the expected count.
+    'ratelimit': {
+        'BACKEND': os.environ.get('RATELIMIT_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('RATELIMIT_CACHE_LOCATION', 'ratelimit'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('RATELIMIT_CACHE_MAX_ENTRIES', '1000000')),
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+
+
+# Sessions
+# SESSION_MODE picks the backend: 'db' (Django's default), 'cached_db' (a
+# cache in front of the session table, 'locmem' or 'file' per
+# SESSION_CACHE_BACKEND) or 'signed_cookies' (no server-side storage at all,
+# see hospital/sessions.py for key rotation).
+SESSION_MODE = os.environ.get('SESSION_MODE', 'db')
+SESSION_SIGNING_KEY = os.environ.get('SESSION_SIGNING_KEY', SECRET_KEY)
+SESSION_SIGNING_FALLBACK_KEYS = [k for k in os.environ.get('SESSION_SIGNING_FALLBACK_KEYS', '').split(',') if k]
+SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE') == '1'
+
+if SESSION_MODE == 'cached_db':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'sessions'
+    if os.environ.get('SESSION_CACHE_BACKEND', 'locmem') == 'file':
+        CACHES['sessions'] = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.path.join(tempfile.gettempdir(), 'hospitalmanagement-sessions'),
+        }
+    else:
+        CACHES['sessions'] = {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sessions',
+        }
+elif SESSION_MODE == 'signed_cookies':
+    SESSION_ENGINE = 'hospital.sessions'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.0/ref/settings/#auth-password-validators
@@ -147,7 +256,138 @@ STATICFILES_DIRS=[STATIC_DIR,]
 # STATIC_ROOT is the directory where collectstatic will gather all static files for production (and for Docker builds).
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles') # added this line
 
-MEDIA_ROOT=os.path.join(BASE_DIR,'static')
+# STATIC_PIPELINE=1 makes collectstatic write content-hashed names plus .gz/.br
+# copies (brotli needs the optional brotli package), served from STATIC_ROOT by
+# hospital.storage.PrecompressedStaticMiddleware. Unhashed names get STATIC_MAX_AGE.
+if os.environ.get('STATIC_PIPELINE') == '1':
+    STATICFILES_STORAGE = 'hospital.storage.CompressedManifestStaticFilesStorage'
+STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', '60'))
+
+# Prometheus metrics at /metrics (hospital/metrics.py). Every process writes its
+# numbers to METRICS_DIR at most every METRICS_WRITE_INTERVAL seconds and a scrape
+# adds them up, folding exited workers into one archive file; empty the directory
+# on deploy. /metrics answers 403 until METRICS_TOKEN is set, then requires
+# "Authorization: Bearer <token>".
+METRICS_ENABLE=os.environ.get('METRICS_ENABLE','1')=='1'
+METRICS_DIR=os.environ.get('METRICS_DIR',os.path.join(tempfile.gettempdir(),'hospitalmanagement-metrics'))
+METRICS_WRITE_INTERVAL=float(os.environ.get('METRICS_WRITE_INTERVAL','1'))
+METRICS_TOKEN=os.environ.get('METRICS_TOKEN','')
+
+PASSWORD_HASHERS = [
+    # PBKDF2 (Django's default) timed for /metrics, the rest verify older hashes
+    'hospital.hashers.TimedPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+# PBKDF2 work factor; hashes with another count are redone at the user's next
+# login. Hashing runs on PASSWORD_HASH_WORKERS threads per process
+# (hospital/credentials.py) with at most PASSWORD_HASH_QUEUE more waiting, a
+# login or signup beyond that gets a 503.
+PASSWORD_ITERATIONS=int(os.environ.get('PASSWORD_ITERATIONS','180000'))
+PASSWORD_HASH_WORKERS=int(os.environ.get('PASSWORD_HASH_WORKERS','2'))
+PASSWORD_HASH_QUEUE=int(os.environ.get('PASSWORD_HASH_QUEUE','32'))
+
+# Slow query log (hospital/slowqueries.py, browse it in the Django admin). Queries
+# of SLOW_QUERY_MS or more are stored with their call site, a SLOW_QUERY_EXPLAIN_RATE
+# sample of the SELECTs with their plan (EXPLAIN ANALYZE re-runs the query on
+# PostgreSQL). A background thread does the EXPLAIN and the INSERT; past
+# SLOW_QUERY_QUEUE waiting queries more are dropped. Set SLOW_QUERY_MS to an
+# empty string to turn it off.
+SLOW_QUERY_MS=os.environ.get('SLOW_QUERY_MS','200')
+SLOW_QUERY_MS=float(SLOW_QUERY_MS) if SLOW_QUERY_MS else None
+SLOW_QUERY_EXPLAIN_RATE=float(os.environ.get('SLOW_QUERY_EXPLAIN_RATE','0.1'))
+SLOW_QUERY_KEEP=int(os.environ.get('SLOW_QUERY_KEEP','1000'))
+SLOW_QUERY_QUEUE=int(os.environ.get('SLOW_QUERY_QUEUE','100'))
+
+# Request profiling (hospital/profiling.py): off unless PROFILE_SAMPLE_RATE > 0 or a
+# request carries an X-Profile-Token from `manage.py profile_token`. PROFILE_MODE is
+# 'cprofile' (.prof files) or 'sampler' (collapsed stacks for flame graphs).
+PROFILE_SAMPLE_RATE=float(os.environ.get('PROFILE_SAMPLE_RATE','0'))
+PROFILE_MODE=os.environ.get('PROFILE_MODE','cprofile')
+PROFILE_SAMPLE_INTERVAL=float(os.environ.get('PROFILE_SAMPLE_INTERVAL','0.005'))
+PROFILE_TOKEN_MAX_AGE=int(os.environ.get('PROFILE_TOKEN_MAX_AGE','3600'))
+PROFILE_DIR=os.environ.get('PROFILE_DIR',os.path.join(tempfile.gettempdir(),'hospitalmanagement-profiles'))
+PROFILE_KEEP=int(os.environ.get('PROFILE_KEEP','200'))
+
+# Rate limits (hospital/ratelimit.py): token buckets per policy, keyed by client
+# address and/or user. hospital.ratelimit.LocalBackend keeps them in each process,
+# giving every one of the WEB_CONCURRENCY workers (set by manage.py serve) its share
+# of the rate. With several hosts use hospital.ratelimit.CacheBackend and point
+# RATELIMIT_CACHE at a memcached every host shares.
+# Behind a proxy set RATELIMIT_IP_META to the META key holding the client address.
+RATELIMIT_ENABLE=os.environ.get('RATELIMIT_ENABLE','1')=='1'
+RATELIMIT_BACKEND=os.environ.get('RATELIMIT_BACKEND','hospital.ratelimit.LocalBackend')
+RATELIMIT_CACHE=os.environ.get('RATELIMIT_CACHE','ratelimit')
+RATELIMIT_IP_META=os.environ.get('RATELIMIT_IP_META','REMOTE_ADDR')
+RATE_LIMITS={
+    # password hashing on every attempt
+    'login': {'rate':'10/m','burst':10,'methods':['POST'],'keys':['ip','user']},
+    'signup': {'rate':'10/h','burst':5,'methods':['POST'],'keys':['ip']},
+    # LIKE scans over patients and the doctor directory
+    'search': {'rate':'60/m','burst':20,'methods':['GET'],'keys':['ip','user']},
+    'contact': {'rate':'5/h','burst':3,'methods':['POST'],'keys':['ip']},
+}
+
+# Admission control (hospital/admission.py): per worker process, at most this many
+# requests of each listed role run at once; the rest wait ADMISSION_QUEUE_SECONDS
+# and then get a 503. Unlisted roles (admins, doctors) and the ADMISSION_ALWAYS
+# views are never held back. Limits shrink while the average request takes longer
+# than ADMISSION_TARGET_LATENCY seconds and grow back once it is below.
+ADMISSION_ENABLE=os.environ.get('ADMISSION_ENABLE','1')=='1'
+ADMISSION_LIMITS={
+    'PATIENT': int(os.environ.get('ADMISSION_PATIENT_LIMIT','8')),
+    'ANONYMOUS': int(os.environ.get('ADMISSION_ANONYMOUS_LIMIT','4')),
+}
+ADMISSION_ALWAYS=('doctor-dashboard','discharge-patient','admin-discharge-patient','doctorlogin','adminlogin')
+ADMISSION_QUEUE_SECONDS=float(os.environ.get('ADMISSION_QUEUE_SECONDS','2'))
+ADMISSION_TARGET_LATENCY=float(os.environ.get('ADMISSION_TARGET_LATENCY','0.5'))
+ADMISSION_ADJUST_SECONDS=float(os.environ.get('ADMISSION_ADJUST_SECONDS','1'))
+ADMISSION_RETRY_AFTER=int(os.environ.get('ADMISSION_RETRY_AFTER','5'))
+
+# Longest a single database statement may run, in seconds, in the views of each
+# group (hospital/timeouts.py); a timed out view shows an error page instead.
+STATEMENT_TIMEOUTS={
+    # LIKE scans over patients and the doctor directory
+    'search': float(os.environ.get('SEARCH_STATEMENT_TIMEOUT','2')),
+}
+
+# manage.py serve (gunicorn): WEB_CONCURRENCY worker processes, by default two per
+# available core plus one (one per core with --asgi), each with SERVE_THREADS
+# threads. The app is loaded and warmed (hospital/warmup.py) once before forking.
+SERVE_BIND=os.environ.get('SERVE_BIND','0.0.0.0:8000')
+SERVE_WORKERS=int(os.environ.get('WEB_CONCURRENCY','0'))
+SERVE_MAX_WORKERS=int(os.environ.get('SERVE_MAX_WORKERS','16'))
+SERVE_THREADS=int(os.environ.get('SERVE_THREADS','2'))
+SERVE_TIMEOUT=int(os.environ.get('SERVE_TIMEOUT','30'))
+
+# Audit log (hospital/audit.py): events are buffered per process and written with
+# one bulk INSERT once AUDIT_FLUSH_SIZE are waiting, or after a request once the
+# oldest is AUDIT_FLUSH_SECONDS old. At most AUDIT_MAX_BUFFER are kept while the
+# database is unavailable.
+AUDIT_FLUSH_SIZE=int(os.environ.get('AUDIT_FLUSH_SIZE','100'))
+AUDIT_FLUSH_SECONDS=float(os.environ.get('AUDIT_FLUSH_SECONDS','5'))
+AUDIT_MAX_BUFFER=int(os.environ.get('AUDIT_MAX_BUFFER','10000'))
+
+# Approval queue events (hospital/events.py, served by the ASGI app). LocalChannel
+# only reaches clients of the same process; use hospital.events.PostgresChannel
+# when running several workers on PostgreSQL. Either way nothing is counted or
+# sent while no admin has the approval pages open.
+APPROVAL_EVENTS_CHANNEL=os.environ.get('APPROVAL_EVENTS_CHANNEL','hospital.events.LocalChannel')
+APPROVAL_EVENTS_HEARTBEAT=int(os.environ.get('APPROVAL_EVENTS_HEARTBEAT','20'))
+
+# Uploads live outside the static sources and are served by hospital.media.serve_media,
+# which checks who may see each file. With MEDIA_SENDFILE='x-accel-redirect' nginx
+# sends the bytes from an internal location at MEDIA_ACCEL_PREFIX aliased to
+# MEDIA_ROOT; 'x-sendfile' does the same for Apache/lighttpd.
+MEDIA_ROOT=os.environ.get('MEDIA_ROOT',os.path.join(BASE_DIR,'media'))
+MEDIA_URL='/media/'
+MEDIA_SENDFILE=os.environ.get('MEDIA_SENDFILE','')
+MEDIA_ACCEL_PREFIX=os.environ.get('MEDIA_ACCEL_PREFIX','/protected-media/')
+
+# Very large tables (hospital.streaming) are sent in batches of this many rows,
+# read through a server-side cursor on PostgreSQL.
+STREAM_BATCH_SIZE=int(os.environ.get('STREAM_BATCH_SIZE','500'))
 
 
 
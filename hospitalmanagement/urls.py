@@ -12,7 +12,8 @@ Youtube :youtube.com/lazycoders
 
 from django.contrib import admin
 from django.urls import path
-from hospital import views
+from hospital import views,api,media,events,profiling,metrics
+from hospital.ratelimit import ratelimit
 from django.contrib.auth.views import LoginView,LogoutView
 
 
@@ -34,9 +35,9 @@ urlpatterns = [
     path('doctorsignup', views.doctor_signup_view,name='doctorsignup'),
     path('patientsignup', views.patient_signup_view),
     
-    path('adminlogin', LoginView.as_view(template_name='hospital/adminlogin.html')),
-    path('doctorlogin', LoginView.as_view(template_name='hospital/doctorlogin.html')),
-    path('patientlogin', LoginView.as_view(template_name='hospital/patientlogin.html')),
+    path('adminlogin', ratelimit('login')(LoginView.as_view(template_name='hospital/adminlogin.html'))),
+    path('doctorlogin', ratelimit('login')(LoginView.as_view(template_name='hospital/doctorlogin.html'))),
+    path('patientlogin', ratelimit('login')(LoginView.as_view(template_name='hospital/patientlogin.html'))),
 
 
     path('afterlogin', views.afterlogin_view,name='afterlogin'),
@@ -109,6 +110,40 @@ urlpatterns +=[
 
 ]
 
+
+#---------READ-ONLY JSON API-------------------------------------
+urlpatterns +=[
+    path('api/v1/doctors', api.list_view,{'resource':'doctors'},name='api-doctors'),
+    path('api/v1/patients', api.list_view,{'resource':'patients'},name='api-patients'),
+    path('api/v1/appointments', api.list_view,{'resource':'appointments'},name='api-appointments'),
+    path('api/v1/discharges', api.list_view,{'resource':'discharges'},name='api-discharges'),
+]
+
+
+#---------APPROVAL QUEUE EVENTS, streamed by hospital.events.EventStreamRouter under ASGI
+urlpatterns +=[
+    path('admin-approval-events', events.events_unavailable,name='admin-approval-events'),
+]
+
+
+#---------PROMETHEUS SCRAPE ENDPOINT
+urlpatterns +=[
+    path('metrics', metrics.metrics_view,name='metrics'),
+]
+
+
+#---------CAPTURED REQUEST PROFILES
+urlpatterns +=[
+    path('admin-profiles', profiling.admin_profiles_view,name='admin-profiles'),
+    path('admin-profiles/<str:capture_id>', profiling.admin_profile_download_view,name='admin-profile-download'),
+]
+
+
+#---------UPLOADED FILES, ACCESS CHECKED-------------------------------------
+urlpatterns +=[
+    path('media/<path:path>', media.serve_media,name='media'),
+]
+
 #Developed By : sumit kumar
 #facebook : fb.com/sumit.luv
 #Youtube :youtube.com/lazycoders
@@ -1,39 +1,58 @@
 # patch_utc_check.py
 """
 This patch fixes the UTC timezone check error in Django completely
+
+Nothing is patched on import, call apply() (run_with_patch.py does) or run
+this file directly. Importing the PostgreSQL backend loads psycopg2, so the
+imports stay inside apply().
 """
-import django.db.backends.postgresql.utils as postgresql_utils
-import django.db.utils as db_utils
-import django.db.backends.postgresql.base as postgresql_base
-
-# Store the original functions
-_original_utc_tzinfo_factory = postgresql_utils.utc_tzinfo_factory
-_original_get_new_connection = postgresql_base.DatabaseWrapper.get_new_connection
-
-def _patched_utc_tzinfo_factory(offset):
-    """Patched version that doesn't crash on non-UTC timezone"""
-    try:
-        return _original_utc_tzinfo_factory(offset)
-    except AssertionError:
-        # If UTC check fails, return a UTC timezone anyway
-        import pytz
-        return pytz.UTC
-
-def _patched_get_new_connection(self, conn_params):
-    """Patched version to ensure UTC timezone"""
-    conn = _original_get_new_connection(self, conn_params)
-    
-    # Force UTC timezone on the connection
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute("SET TIME ZONE 'UTC'")
-    except:
-        pass  # Silently fail if we can't set timezone
-    
-    return conn
-
-# Monkey patch the functions
-postgresql_utils.utc_tzinfo_factory = _patched_utc_tzinfo_factory
-postgresql_base.DatabaseWrapper.get_new_connection = _patched_get_new_connection
-
-print("Comprehensive UTC timezone patch applied successfully")
\ No newline at end of file
+_applied = False
+
+
+def apply():
+    """Monkey patch the PostgreSQL backend, safe to call more than once"""
+    global _applied
+    if _applied:
+        return
+    import django.db.backends.postgresql.utils as postgresql_utils
+    import django.db.backends.postgresql.base as postgresql_base
+
+    # Store the original functions
+    _original_utc_tzinfo_factory = postgresql_utils.utc_tzinfo_factory
+    _original_get_new_connection = postgresql_base.DatabaseWrapper.get_new_connection
+
+    def _patched_utc_tzinfo_factory(offset):
+        """Patched version that doesn't crash on non-UTC timezone"""
+        try:
+            return _original_utc_tzinfo_factory(offset)
+        except AssertionError:
+            # If UTC check fails, return a UTC timezone anyway
+            import pytz
+            return pytz.UTC
+
+    def _patched_get_new_connection(self, conn_params):
+        """Patched version to ensure UTC timezone"""
+        conn = _original_get_new_connection(self, conn_params)
+
+        # Force UTC timezone on the connection
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SET TIME ZONE 'UTC'")
+            # don't leave a transaction open, Django switches autocommit next
+            conn.commit()
+        except Exception:
+            pass  # Silently fail if we can't set timezone
+
+        return conn
+
+    # Monkey patch the functions
+    postgresql_utils.utc_tzinfo_factory = _patched_utc_tzinfo_factory
+    # base.py imported the factory by name, so patch its reference too
+    postgresql_base.utc_tzinfo_factory = _patched_utc_tzinfo_factory
+    postgresql_base.DatabaseWrapper.get_new_connection = _patched_get_new_connection
+    _applied = True
+
+
+if __name__ == "__main__":
+    apply()
+    print("Comprehensive UTC timezone patch applied successfully")
@@ -8,6 +8,7 @@ import sys
 
 # Apply the patch first
 import patch_utc_check
+patch_utc_check.apply()
 
 # Now run the Django command
 if __name__ == "__main__":